@@ -0,0 +1,130 @@
+"""Measure endpoint latency with and without the query indexes.
+
+Seeds a dedicated SQLite database (BENCH_DB, default bench.sqlite3), then
+times each endpoint twice: with the composite query indexes swapped for the
+plain foreign-key indexes they replaced (0008/0009), and with the current
+schema. Only the indexes change, so the current code runs against both.
+
+    python benchmarks/bench_indexes.py --expenses 1000000 --users 10000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, models  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.seed import seed_database  # noqa: E402
+from expenses.models import Balance, Expense, ExpenseParticipant  # noqa: E402
+
+# Indexes that replaced single-column foreign-key indexes, by model.
+QUERY_INDEXES = {
+    Balance: ['balance_from_to_idx', 'balance_to_from_idx'],
+    Expense: ['expense_payer_created_id_idx', 'expense_created_id_idx'],
+    ExpenseParticipant: ['participant_user_expense_idx'],
+}
+# What Django created for those foreign keys before they were db_index=False.
+FOREIGN_KEY_INDEXES = {
+    Balance: [models.Index(fields=['from_user'], name='bench_balance_from_idx'),
+              models.Index(fields=['to_user'], name='bench_balance_to_idx')],
+    Expense: [models.Index(fields=['payer'], name='bench_expense_payer_idx')],
+    ExpenseParticipant: [models.Index(fields=['expense'], name='bench_participant_expense_idx'),
+                         models.Index(fields=['user'], name='bench_participant_user_idx')],
+}
+
+ENDPOINTS = {
+    'get-balance': lambda ids: reverse('get-balance', kwargs={'user_id': ids['user']}),
+    'user-expenses': lambda ids: reverse('user-expenses', kwargs={'user_id': ids['user']}),
+    'overall-expenses': lambda ids: reverse('overall-expenses'),
+    'expense-split': lambda ids: reverse('expense-split', kwargs={'expense_id': ids['expense']}),
+    'settlement-plan': lambda ids: reverse('settlement-plan'),
+}
+
+
+def measure(client, user_ids, expense_ids, names, requests, rng):
+    results = {}
+    for name in names:
+        client.get(ENDPOINTS[name]({'user': user_ids[0], 'expense': expense_ids[0]}))
+        timings = []
+        for _ in range(requests):
+            url = ENDPOINTS[name]({'user': rng.choice(user_ids), 'expense': rng.choice(expense_ids)})
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - started) * 1000)
+        cuts = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        results[name] = (cuts[49], cuts[98])
+    return results
+
+
+def query_indexes(model):
+    return [index for index in model._meta.indexes if index.name in QUERY_INDEXES[model]]
+
+
+def use_foreign_key_indexes():
+    with connection.schema_editor() as editor:
+        for model in QUERY_INDEXES:
+            for index in query_indexes(model):
+                editor.remove_index(model, index)
+            for index in FOREIGN_KEY_INDEXES[model]:
+                editor.add_index(model, index)
+
+
+def restore_query_indexes():
+    with connection.schema_editor() as editor:
+        for model in QUERY_INDEXES:
+            for index in FOREIGN_KEY_INDEXES[model]:
+                editor.remove_index(model, index)
+            for index in query_indexes(model):
+                editor.add_index(model, index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--expenses', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=50, help="requests per endpoint")
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument('--reseed', action='store_true', help="drop and reseed the benchmark database")
+    args = parser.parse_args()
+
+    db_path = Path(connection.settings_dict['NAME'])
+    if args.reseed and db_path.exists():
+        connection.close()
+        db_path.unlink()
+    call_command('migrate', verbosity=0)
+    if not Expense.objects.exists():
+        seed_database(args.users, args.expenses, stdout=sys.stdout)
+
+    user_ids = list(Expense.objects.values_list('payer_id', flat=True).distinct()[:1000])
+    expense_ids = list(Expense.objects.values_list('id', flat=True)[:1000])
+    client = Client()
+
+    use_foreign_key_indexes()
+    try:
+        before = measure(client, user_ids, expense_ids, args.endpoints, args.requests, random.Random(1))
+    finally:
+        restore_query_indexes()
+    after = measure(client, user_ids, expense_ids, args.endpoints, args.requests, random.Random(1))
+
+    print(f"{'endpoint':<20}{'before p50':>12}{'before p99':>12}{'after p50':>12}{'after p99':>12}  (ms)")
+    for name in args.endpoints:
+        print(f"{name:<20}{before[name][0]:>12.2f}{before[name][1]:>12.2f}{after[name][0]:>12.2f}{after[name][1]:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
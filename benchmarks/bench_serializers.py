@@ -0,0 +1,79 @@
+"""Measure CPU time per call of expense validation and list rendering.
+
+Validation is timed for growing participant counts together with its query
+count. Rendering a page of expenses is timed through ExpenseSerializer and
+through the lean expense_rows() that the list endpoints use.
+
+    python benchmarks/bench_serializers.py --page-size 100 --repeat 200
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from benchmarks.seed import seed_database, REALISTIC_MIX  # noqa: E402
+from expenses.middleware import QueryRecorder  # noqa: E402
+from expenses.models import User, Expense  # noqa: E402
+from expenses.serializers import ExpenseSerializer, expense_rows  # noqa: E402
+from expenses.views import expense_list_queryset  # noqa: E402
+
+
+def cpu_per_call(function, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def exact_payload(user_ids):
+    cents = [10000 // len(user_ids)] * len(user_ids)
+    cents[0] += 10000 - sum(cents)
+    return {"payer": user_ids[0], "participants": user_ids, "amount": 100, "split_method": "exact",
+            "exact_splits": {str(user_id): share / 100 for user_id, share in zip(user_ids, cents)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--participants', type=int, nargs='+', default=[2, 5, 20, 50])
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    call_command('migrate', verbosity=0)
+    if not Expense.objects.exists():
+        seed_database(1000, 10000, split_mix=REALISTIC_MIX, power_law=True, stdout=sys.stdout)
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True)[:max(args.participants)])
+
+    print(f"{'participants':<14}{'queries':>9}{'CPU ms/call':>13}")
+    for count in args.participants:
+        payload = exact_payload(user_ids[:count])
+        queries = QueryRecorder()
+        with connection.execute_wrapper(queries):
+            serializer = ExpenseSerializer(data=payload)
+            if not serializer.is_valid():
+                parser.error(f"benchmark payload rejected: {serializer.errors}")
+        elapsed = cpu_per_call(lambda: ExpenseSerializer(data=payload).is_valid(), args.repeat)
+        print(f"{count:<14}{queries.count:>9}{elapsed:>13.3f}")
+
+    page = list(expense_list_queryset().order_by('-id')[:args.page_size])
+    drf = cpu_per_call(lambda: ExpenseSerializer(page, many=True).data, args.repeat)
+    lean = cpu_per_call(lambda: expense_rows(page), args.repeat)
+    print(f"\nrender {len(page)} expenses: ExpenseSerializer {drf:.3f} ms, expense_rows {lean:.3f} ms "
+          f"({drf / lean:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark the settlement planner on synthetic net positions.
+
+    python benchmarks/bench_settlement.py --users 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_sharing.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from expenses.settlements import settlement_plan  # noqa: E402
+
+
+def synthetic_positions(user_count, seed):
+    rng = random.Random(seed)
+    user_ids = array('q', range(1, user_count + 1))
+    nets = array('q', (rng.randint(-50000, 50000) for _ in range(user_count)))
+    # Net positions across a closed ledger always sum to zero.
+    nets[-1] -= sum(nets)
+    return user_ids, nets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    user_ids, nets = synthetic_positions(args.users, args.seed)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    transfer_count = sum(1 for _ in settlement_plan(user_ids, nets))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"users={args.users} transfers={transfer_count} "
+          f"time={elapsed:.3f}s peak_memory={peak / 1024 / 1024:.1f}MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Compare read throughput and tail latency of the WSGI and ASGI deployments.
+
+Start both servers against the same seeded database (see benchmarks/seed.py),
+for example
+
+    BENCH_DB=bench.sqlite3 DJANGO_SETTINGS_MODULE=benchmarks.settings \\
+        gunicorn expense_sharing.wsgi -w 4 --threads 8 -b 127.0.0.1:8001
+    BENCH_DB=bench.sqlite3 DJANGO_SETTINGS_MODULE=benchmarks.settings \\
+        uvicorn expense_sharing.asgi:application --workers 4 --port 8002
+
+then run
+
+    python benchmarks/loadtest.py --wsgi http://127.0.0.1:8001 --asgi http://127.0.0.1:8002 \\
+        --connections 1000 --duration 30
+
+Each target is hit with the same mix of endpoints from N keep-alive
+connections; WSGI requests go to the APIView routes and ASGI requests to the
+async/ routes. Raise the open file limit (ulimit -n) above the connection
+count first. The client is plain asyncio so it adds no dependencies.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = {
+    'get-balance': ('/api/balances/{user}/', '/api/async/balances/{user}/'),
+    'user-expenses': ('/api/users/{user}/expenses/', '/api/async/users/{user}/expenses/'),
+    'overall-expenses': ('/api/expenses/overall/', '/api/async/expenses/overall/'),
+    'expense-list': ('/api/expenses/', '/api/async/expenses/'),
+}
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; return (status, keep_alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def connection_worker(base_url, paths, deadline, rng, timings, errors):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        request = f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: keep-alive\r\n\r\n".encode()
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors['connection'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_target(base_url, paths, connections, duration, seed):
+    timings = []
+    errors = {'connection': 0}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        connection_worker(base_url, paths, deadline, random.Random(seed + index), timings, errors)
+        for index in range(connections)
+    ))
+    elapsed = time.perf_counter() - started
+    return timings, errors, elapsed
+
+
+def summarize(label, timings, errors, elapsed):
+    if len(timings) > 1:
+        cuts = statistics.quantiles(timings, n=1000)
+        p50, p99, p999 = cuts[499], cuts[989], cuts[998]
+    else:
+        p50 = p99 = p999 = timings[0] if timings else float('nan')
+    failed = sum(errors.values())
+    print(f"{label:<6}{len(timings) / elapsed:>10.1f}{p50:>10.1f}{p99:>10.1f}{p999:>10.1f}{failed:>10}")
+
+
+def build_paths(endpoints, asgi, user_ids):
+    index = 1 if asgi else 0
+    return [ENDPOINTS[name][index].format(user=user_id) for name in endpoints for user_id in user_ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi', help="base URL of the WSGI server")
+    parser.add_argument('--asgi', help="base URL of the ASGI server")
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30, help="seconds per target")
+    parser.add_argument('--users', type=int, default=1000, help="user ids 1..N to spread reads over")
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if not (args.wsgi or args.asgi):
+        parser.error("pass --wsgi, --asgi or both")
+
+    user_ids = range(1, args.users + 1)
+    print(f"{'server':<6}{'req/s':>10}{'p50':>10}{'p99':>10}{'p99.9':>10}{'errors':>10}  (ms)")
+    for label, base_url in (('wsgi', args.wsgi), ('asgi', args.asgi)):
+        if base_url:
+            paths = build_paths(args.endpoints, label == 'asgi', user_ids)
+            timings, errors, elapsed = asyncio.run(
+                run_target(base_url, paths, args.connections, args.duration, args.seed))
+            summarize(label, timings, errors, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Seed a benchmark database with synthetic users, groups and expenses.
+
+By default every expense is an equal split between 2-5 uniformly chosen
+users. Pass ``split_mix`` for exact and percentage splits, ``power_law`` for
+a heavy-tailed participant count and a few very active users, and
+``group_count`` to put ``group_fraction`` of the expenses into groups.
+"""
+import itertools
+import random
+from collections import defaultdict
+
+from django.db import transaction
+
+from expenses.balances import apply_balance_deltas
+from expenses.edits import new_ledger_entry
+from expenses.ledger import record_expense_totals
+from expenses.models import User, Group, GroupMembership, Expense, ExpenseParticipant
+from expenses.money import from_cents
+from expenses.rollups import record_rollups
+from expenses.splits import compute_shares, compute_deltas
+
+BATCH_SIZE = 5000
+EQUAL_ONLY = {'equal': 1.0}
+REALISTIC_MIX = {'equal': 0.6, 'exact': 0.25, 'percentage': 0.15}
+# Pareto shape for participant counts and Zipf exponent for user popularity.
+PARTICIPANT_ALPHA = 1.6
+POPULARITY_EXPONENT = 1.1
+
+
+class _Participants:
+    """Draws distinct participant lists, uniformly or with Zipf-weighted popularity."""
+
+    def __init__(self, rng, user_ids, power_law, max_participants):
+        self.rng = rng
+        self.user_ids = user_ids
+        self.power_law = power_law
+        self.max_participants = min(max_participants, len(user_ids))
+        if power_law:
+            # Ranks are shuffled so the popular users are not just the lowest ids.
+            ranked = rng.sample(user_ids, len(user_ids))
+            self.ranked = ranked
+            self.cum_weights = list(itertools.accumulate(
+                1 / rank ** POPULARITY_EXPONENT for rank in range(1, len(ranked) + 1)))
+
+    def count(self):
+        if not self.power_law:
+            return self.rng.randint(2, min(5, self.max_participants))
+        return min(self.max_participants, 1 + int(self.rng.paretovariate(PARTICIPANT_ALPHA)))
+
+    def draw(self, count, pool=None):
+        if pool is not None:
+            return self.rng.sample(pool, min(count, len(pool)))
+        if not self.power_law:
+            return self.rng.sample(self.user_ids, count)
+        chosen = set()
+        for _ in range(4):
+            chosen.update(self.rng.choices(self.ranked, cum_weights=self.cum_weights, k=count - len(chosen)))
+            if len(chosen) == count:
+                break
+        while len(chosen) < count:
+            chosen.add(self.rng.choice(self.user_ids))
+        return list(chosen)
+
+
+def _splits(rng, split_method, amount, participants):
+    """Return (exact_splits, percentage_splits) in the form the API stores."""
+    if split_method == 'exact':
+        cuts = sorted(rng.randint(0, amount) for _ in range(len(participants) - 1))
+        cents = [high - low for low, high in zip([0, *cuts], [*cuts, amount])]
+        return {str(user_id): str(from_cents(share)) for user_id, share in zip(participants, cents)}, None
+    if split_method == 'percentage':
+        cuts = sorted(rng.randint(0, 10000) for _ in range(len(participants) - 1))
+        basis_points = [high - low for low, high in zip([0, *cuts], [*cuts, 10000])]
+        return None, {str(user_id): str(from_cents(points)) for user_id, points in zip(participants, basis_points)}
+    return None, None
+
+
+def seed_groups(rng, participants, group_count):
+    """Create group_count groups of 3-12 members; returns {group_id: member_ids}."""
+    groups = Group.objects.bulk_create([Group(name=f"Group {i}") for i in range(group_count)])
+    members = {group.id: participants.draw(rng.randint(3, min(12, len(participants.user_ids))))
+               for group in groups}
+    GroupMembership.objects.bulk_create([
+        GroupMembership(group_id=group_id, user_id=user_id)
+        for group_id, user_ids in members.items()
+        for user_id in user_ids
+    ], batch_size=BATCH_SIZE)
+    return members
+
+
+def seed_database(user_count, expense_count, seed=42, stdout=None, split_mix=EQUAL_ONLY, power_law=False,
+                  max_participants=20, group_count=0, group_fraction=0.2):
+    rng = random.Random(seed)
+    User.objects.bulk_create([
+        User(name=f"User {i}", email=f"user{i}@bench.example", mobile=f"{i:012d}")
+        for i in range(user_count)
+    ], batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.values_list('id', flat=True))
+    participants = _Participants(rng, user_ids, power_law, max_participants)
+    group_members = seed_groups(rng, participants, group_count) if group_count else {}
+    group_ids = list(group_members)
+    split_methods, split_weights = zip(*split_mix.items())
+
+    for start in range(0, expense_count, BATCH_SIZE):
+        rows = []
+        for _ in range(min(BATCH_SIZE, expense_count - start)):
+            group_id = rng.choice(group_ids) if group_ids and rng.random() < group_fraction else None
+            chosen = participants.draw(participants.count(), group_members.get(group_id))
+            split_method = rng.choices(split_methods, split_weights)[0] if len(split_methods) > 1 else split_methods[0]
+            amount = rng.randint(100, 100000)
+            exact_splits, percentage_splits = _splits(rng, split_method, amount, chosen)
+            rows.append((group_id, rng.choice(chosen), amount, split_method, exact_splits, percentage_splits,
+                         chosen))
+
+        with transaction.atomic():
+            expenses = Expense.objects.bulk_create([
+                Expense(group_id=group_id, payer_id=payer_id, amount=amount, split_method=split_method,
+                        exact_splits=exact_splits, percentage_splits=percentage_splits)
+                for group_id, payer_id, amount, split_method, exact_splits, percentage_splits, _ in rows
+            ])
+            ExpenseParticipant.objects.bulk_create([
+                ExpenseParticipant(expense_id=expense.id, user_id=user_id)
+                for expense, row in zip(expenses, rows)
+                for user_id in row[-1]
+            ])
+            deltas = defaultdict(list)
+            entries = []
+            for expense, (group_id, payer_id, amount, split_method, exact_splits, percentage_splits,
+                          chosen) in zip(expenses, rows):
+                shares = compute_shares(split_method, amount, chosen, exact_splits, percentage_splits)
+                expense_deltas = compute_deltas(payer_id, shares)
+                deltas[group_id].extend(expense_deltas)
+                entries.append(new_ledger_entry(expense, chosen, expense_deltas))
+            for group_id, group_deltas in deltas.items():
+                apply_balance_deltas(group_deltas, group_id=group_id)
+            record_expense_totals((payer_id, amount, chosen) for _, payer_id, amount, *_, chosen in rows)
+            record_rollups(entries)
+
+        if stdout:
+            stdout.write(f"seeded {start + len(rows)}/{expense_count} expenses\n")
+    return user_ids
@@ -0,0 +1,14 @@
+import os
+
+from expense_sharing.settings import *  # noqa: F401,F403
+
+ALLOWED_HOSTS = ['*']
+DEBUG = False
+
+DATABASES['default']['NAME'] = os.environ.get('BENCH_DB', BASE_DIR / 'bench.sqlite3')  # noqa: F405
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'root': {'level': 'WARNING'},
+}
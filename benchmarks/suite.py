@@ -0,0 +1,284 @@
+"""Drive every route in expenses/urls.py against a seeded database.
+
+Seeds a dedicated SQLite database (BENCH_DB, default bench.sqlite3) with a
+reproducible mix of equal, exact and percentage splits, power-law participant
+counts and grouped expenses. Each endpoint is then requested through the Django
+test client. The suite records throughput, p50/p95/p99 latency, queries per
+request and peak traced memory per request. Writes run in a transaction that
+is rolled back, so every run sees the same data.
+
+    python benchmarks/suite.py --users 5000 --expenses 200000 --output results.json
+    python benchmarks/suite.py --baseline baseline.json   # exits 1 on a regression
+
+A route without a scenario below fails the run, so new endpoints get measured.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.seed import seed_database, REALISTIC_MIX  # noqa: E402
+from expenses import urls as expense_urls  # noqa: E402
+from expenses.middleware import QueryRecorder  # noqa: E402
+from expenses.jobs import claim_job, run_job, submit_job  # noqa: E402
+from expenses.models import User, Expense, GroupMembership, ReportJob  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def _expense(ids, rng):
+    payer, *others = rng.sample(ids['users'], 4)
+    return {"payer": payer, "participants": [payer, *others], "amount": rng.randint(1, 50000) / 100,
+            "split_method": "equal"}
+
+
+def _group_user(ids, rng):
+    group_id, user_id = rng.choice(ids['memberships'])
+    return {'group_id': group_id, 'user_id': user_id}
+
+
+# name: (url name, method, kwargs(ids, rng), body(ids, rng) or None, query string)
+SCENARIOS = {
+    'user-create': ('user-create', 'post', None, lambda ids, rng: {
+        "name": "Bench User", "email": f"bench{rng.random()}@bench.example",
+        "mobile": f"{rng.randint(0, 10 ** 12):012d}"}, ''),
+    'user-detail': ('user-detail', 'get', lambda ids, rng: {'pk': rng.choice(ids['users'])}, None, ''),
+    'expense-create': ('expense-create', 'post', None, _expense, ''),
+    'expense-bulk-create': ('expense-bulk-create', 'post', None,
+                            lambda ids, rng: {"expenses": [_expense(ids, rng) for _ in range(50)]}, ''),
+    'expense-detail': ('expense-detail', 'get', None, None, '?limit=50'),
+    'expense-item:get': ('expense-item', 'get', lambda ids, rng: {'expense_id': rng.choice(ids['expenses'])},
+                         None, ''),
+    'expense-item:patch': ('expense-item', 'patch', lambda ids, rng: {'expense_id': rng.choice(ids['equal'])},
+                           lambda ids, rng: {"amount": rng.randint(1, 50000) / 100}, ''),
+    'expense-item:delete': ('expense-item', 'delete',
+                            lambda ids, rng: {'expense_id': rng.choice(ids['expenses'])}, None, ''),
+    'expense-split': ('expense-split', 'get', lambda ids, rng: {'expense_id': rng.choice(ids['expenses'])},
+                      None, ''),
+    'get-balance': ('get-balance', 'get', lambda ids, rng: {'user_id': rng.choice(ids['users'])}, None, ''),
+    'balance-as-of': ('balance-as-of', 'get', lambda ids, rng: {'user_id': rng.choice(ids['users'])}, None,
+                      f'?as_of={datetime.date.today().isoformat()}'),
+    'user-expenses': ('user-expenses', 'get', lambda ids, rng: {'user_id': rng.choice(ids['users'])}, None, ''),
+    'user-statement': ('user-statement', 'get', lambda ids, rng: {'user_id': rng.choice(ids['users'])}, None,
+                       '?granularity=week'),
+    'overall-expenses': ('overall-expenses', 'get', None, None, ''),
+    'download-balance-sheet': ('download-balance-sheet', 'get', None, None, ''),
+    'settlement-create': ('settlement-create', 'post', None, lambda ids, rng: dict(zip(
+        ('payer', 'payee'), rng.sample(ids['users'], 2)), amount=rng.randint(1, 500)), ''),
+    'settlement-plan': ('settlement-plan', 'get', None, None, ''),
+    'cache-stats': ('cache-stats', 'get', None, None, ''),
+    'group-create': ('group-create', 'post', None, lambda ids, rng: {
+        "name": "Bench Group", "members": rng.sample(ids['users'], 5)}, ''),
+    'group-detail': ('group-detail', 'get', lambda ids, rng: {'pk': rng.choice(ids['groups'])}, None, ''),
+    'group-members': ('group-members', 'post', lambda ids, rng: {'group_id': rng.choice(ids['groups'])},
+                      lambda ids, rng: {"members": rng.sample(ids['users'], 3)}, ''),
+    'group-overall': ('group-overall', 'get', lambda ids, rng: {'group_id': rng.choice(ids['groups'])}, None, ''),
+    'group-balance': ('group-balance', 'get', _group_user, None, ''),
+    'group-balance-sheet': ('group-balance-sheet', 'get', lambda ids, rng: {'group_id': rng.choice(ids['groups'])},
+                            None, ''),
+    'group-settlement-plan': ('group-settlement-plan', 'get',
+                              lambda ids, rng: {'group_id': rng.choice(ids['groups'])}, None, ''),
+    'report-create': ('report-create', 'post', None, lambda ids, rng: {
+        "kind": "user_statement", "params": {"user_id": rng.choice(ids['users'])}}, ''),
+    'report-detail': ('report-detail', 'get', lambda ids, rng: {'pk': ids['report']}, None, ''),
+    'report-download': ('report-download', 'get', lambda ids, rng: {'pk': ids['report']}, None, ''),
+    'parquet-export:expenses': ('parquet-export', 'get', lambda ids, rng: {'table': 'expenses'}, None, ''),
+    'parquet-export:balances': ('parquet-export', 'get', lambda ids, rng: {'table': 'balances'}, None, ''),
+    'async-get-balance': ('async-get-balance', 'get', lambda ids, rng: {'user_id': rng.choice(ids['users'])},
+                          None, ''),
+    'async-user-expenses': ('async-user-expenses', 'get', lambda ids, rng: {'user_id': rng.choice(ids['users'])},
+                            None, ''),
+    'async-overall-expenses': ('async-overall-expenses', 'get', None, None, ''),
+    'async-expense-list': ('async-expense-list', 'get', None, None, '?limit=50'),
+}
+
+
+def finished_report():
+    """Return the id of a finished balance sheet job, running one inline if needed."""
+    for job in ReportJob.objects.filter(kind=ReportJob.BALANCE_SHEET, status=ReportJob.DONE).order_by('-id'):
+        if Path(job.result_path).exists():
+            return job.id
+    submit_job(ReportJob.BALANCE_SHEET)
+    job_id = claim_job()
+    run_job(job_id)
+    return job_id
+
+
+def missing_scenarios():
+    covered = {url_name for url_name, *_ in SCENARIOS.values()}
+    return sorted(pattern.name for pattern in expense_urls.urlpatterns if pattern.name not in covered)
+
+
+def request(client, scenario, ids, rng):
+    url_name, method, kwargs, body, query = scenario
+    url = reverse(url_name, kwargs=kwargs(ids, rng) if kwargs else None) + query
+    data = body(ids, rng) if body else None
+    if method == 'get':
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+    try:
+        with transaction.atomic():
+            response = getattr(client, method)(url, data, content_type='application/json')
+            raise Rollback
+    except Rollback:
+        return response
+
+
+def measure(client, name, ids, requests, cold, seed):
+    scenario = SCENARIOS[name]
+    # One stream per endpoint, so running a subset requests the same ids.
+    rng = random.Random(f"{seed}:{name}")
+    request(client, scenario, ids, rng)
+
+    # Queries and memory are taken on separate passes: both hooks slow requests
+    # down. Queries are counted on a cold cache so the count is stable.
+    cache.clear()
+    queries = QueryRecorder()
+    with connection.execute_wrapper(queries):
+        request(client, scenario, ids, rng)
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    request(client, scenario, ids, rng)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = []
+    errors = 0
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = request(client, scenario, ids, rng)
+        timings.append((time.perf_counter() - started) * 1000)
+        errors += response.status_code >= 400
+    cuts = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    return {
+        'method': scenario[1].upper(),
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / (sum(timings) / 1000), 1),
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'queries': queries.count,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, noise_ms):
+    """Return a line per endpoint that got slower than the baseline allows or runs more queries.
+
+    Only the median is compared; tail percentiles of a few hundred in-process
+    requests move too much between runs to gate on.
+    """
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        allowed = max(previous['p50_ms'] * (1 + tolerance), previous['p50_ms'] + noise_ms)
+        if current['p50_ms'] > allowed:
+            regressions.append(f"{name}: p50_ms {previous['p50_ms']} -> {current['p50_ms']}")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+        if current['errors'] > previous['errors']:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--expenses', type=int, default=50000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=100, help="timed requests per endpoint")
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument('--cold', action='store_true', help="clear the cache before every request")
+    parser.add_argument('--reseed', action='store_true', help="drop and reseed the benchmark database")
+    parser.add_argument('--output', type=Path, help="write the results as JSON")
+    parser.add_argument('--baseline', type=Path, help="compare against a previous --output and fail on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p50 latency growth, as a fraction")
+    parser.add_argument('--noise-ms', type=float, default=0.5, help="latency changes below this are ignored")
+    args = parser.parse_args()
+
+    missing = missing_scenarios()
+    if missing:
+        parser.error(f"no benchmark scenario for: {', '.join(missing)}")
+
+    db_path = Path(connection.settings_dict['NAME'])
+    if args.reseed and db_path.exists():
+        connection.close()
+        db_path.unlink()
+    call_command('migrate', verbosity=0)
+    if not Expense.objects.exists():
+        seed_database(args.users, args.expenses, seed=args.seed, stdout=sys.stdout, split_mix=REALISTIC_MIX,
+                      power_law=True, group_count=args.groups)
+
+    memberships = list(GroupMembership.objects.order_by('group_id', 'user_id').values_list('group_id', 'user_id'))
+    ids = {
+        'users': list(Expense.objects.order_by('payer_id').values_list('payer_id', flat=True).distinct()[:1000]),
+        'expenses': list(Expense.objects.order_by('id').values_list('id', flat=True)[:1000]),
+        'equal': list(Expense.objects.filter(split_method='equal').order_by('id').values_list('id', flat=True)[:1000]),
+        'memberships': memberships,
+        'groups': sorted({group_id for group_id, _ in memberships}),
+        'report': finished_report(),
+    }
+    client = Client()
+
+    results = {
+        'meta': {
+            'users': User.objects.count(), 'expenses': Expense.objects.count(), 'seed': args.seed,
+            'requests': args.requests, 'cold': args.cold, 'python': platform.python_version(),
+            'django': django.get_version(), 'database': connection.vendor,
+            'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        'endpoints': {},
+    }
+    print(f"{'endpoint':<26}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'peak KB':>10}{'errors':>8}")
+    for name in args.endpoints:
+        row = results['endpoints'][name] = measure(client, name, ids, args.requests, args.cold, args.seed)
+        print(f"{name:<26}{row['throughput_rps']:>9}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+              f"{row['p99_ms']:>9.2f}{row['queries']:>9}{row['peak_kb']:>10}{row['errors']:>8}")
+    # ru_maxrss is in kilobytes on Linux.
+    results['meta']['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + '\n')
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance, args.noise_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Test databases reuse primary keys after rollback, so cached entries
+    # from one test must not leak into the next.
+    cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def unsampled_metrics(settings):
+    # A sampled request over the slow thresholds writes a row, which would
+    # make query-count assertions flaky; metrics tests opt back in.
+    settings.METRICS_SAMPLE_RATE = 0
+    yield
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'expenses.middleware.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'expense_sharing.urls'
@@ -88,10 +90,56 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent writers queue on the
+            # busy timeout instead of failing on a lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
+        # An on-disk test database lets multi-threaded tests use real
+        # connections; the in-memory shared cache fails fast on lock waits.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# In-process LRU by default. Point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache when running several workers, e.g.
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        } if 'CACHE_BACKEND' not in os.environ else {},
+    }
+}
+
+EXPENSE_SPLIT_CACHE_TIMEOUT = 300
+LEDGER_CACHE_TIMEOUT = 60
+# Seconds a stored Idempotency-Key response is replayed before prune_idempotency_keys removes it.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Fraction of requests whose SQL is counted and timed by RequestMetricsMiddleware.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '0.05'))
+# Sampled requests at or over either threshold are stored for `manage.py slow_queries`.
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_REQUEST_QUERIES = 50
+
+# Where `manage.py run_workers` writes report files for GET /reports/<id>/download/.
+REPORTS_DIR = os.environ.get('REPORTS_DIR', BASE_DIR / 'reports')
+# Parquet dataset written by `manage.py export_snapshot`.
+EXPORTS_DIR = os.environ.get('EXPORTS_DIR', BASE_DIR / 'exports')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -1,8 +1,44 @@
 from django.contrib import admin
-from .models import Expense
+from django.db import transaction
+from .edits import delete_expense
+from .models import Expense, ExpenseParticipant, Group, GroupMembership
+
+class ExpenseParticipantInline(admin.TabularInline):
+    model = ExpenseParticipant
+    raw_id_fields = ('user',)
+    extra = 1
 
 class ExpenseAdmin(admin.ModelAdmin):
-    list_display = ('payer', 'amount', 'split_method')
-    filter_horizontal = ('participants',)  
+    list_display = ('payer', 'group', 'amount', 'split_method')
+    raw_id_fields = ('payer', 'group')
+    inlines = (ExpenseParticipantInline,)
+
+    # Expenses are created and edited through the API, and deletions here
+    # reverse the expense's balances, so the ledger never drifts from them.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            delete_expense(obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for expense in queryset.select_for_update():
+                delete_expense(expense)
+
+admin.site.register(Expense, ExpenseAdmin)
+
+class GroupMembershipInline(admin.TabularInline):
+    model = GroupMembership
+    raw_id_fields = ('user',)
+    extra = 1
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    inlines = (GroupMembershipInline,)
 
-admin.site.register(Expense, ExpenseAdmin)
\ No newline at end of file
+admin.site.register(Group, GroupAdmin)
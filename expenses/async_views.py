@@ -0,0 +1,139 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import models
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from .cache import acached_read, user_scope, GLOBAL_SCOPE
+from .filters import filter_expenses
+from .models import User, Expense, Balance
+from .money import from_cents
+from .pagination import UserSummaryPagination, ExpenseKeysetPagination
+from .serializers import expense_rows
+from .views import balance_rows, expense_list_queryset
+
+
+def api_response(data, status=200):
+    # DRF's encoder renders Decimal as a number, matching the APIView endpoints.
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def error_response(exc):
+    detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    return api_response(detail, status=exc.status_code)
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+class AsyncGetBalance(View):
+    async def get(self, request, user_id):
+        try:
+            balance_data = await acached_read(
+                'get-balance', user_scope(user_id), request.build_absolute_uri(),
+                lambda: self.get_balance_data(user_id))
+        except User.DoesNotExist:
+            return api_response({"error": "User not found"}, status=404)
+
+        return api_response(balance_data)
+
+    async def get_balance_data(self, user_id):
+        exists, pairs = await asyncio.gather(
+            User.objects.filter(id=user_id).aexists(),
+            _list(Balance.objects.owed_by(user_id))
+        )
+        if not exists:
+            raise User.DoesNotExist
+        return balance_rows(pairs)
+
+
+class AsyncUserExpensesView(View):
+    async def get(self, request, user_id):
+        request = Request(request)
+        try:
+            response_data = await acached_read(
+                'user-expenses', user_scope(user_id), request.build_absolute_uri(),
+                lambda: self.get_expenses_data(request, user_id))
+        except User.DoesNotExist:
+            return api_response({"error": "User not found"}, status=404)
+        except APIException as e:
+            return error_response(e)
+
+        return api_response(response_data)
+
+    async def get_expenses_data(self, request, user_id):
+        expenses = filter_expenses(expense_list_queryset(), request.query_params)
+        paid_pages = ExpenseKeysetPagination(cursor_query_param='paid_cursor')
+        participated_pages = ExpenseKeysetPagination(cursor_query_param='participated_cursor')
+
+        user, paid_expenses, participated_expenses = await asyncio.gather(
+            User.objects.with_expense_totals().aget(id=user_id),
+            paid_pages.apaginate_queryset(expenses.filter(payer_id=user_id), request),
+            participated_pages.apaginate_queryset(expenses.filter(participants=user_id), request)
+        )
+
+        return {
+            "paid_expenses": paid_pages.get_page(expense_rows(paid_expenses)),
+            "participated_expenses": participated_pages.get_page(
+                expense_rows(participated_expenses)),
+            "total_paid": from_cents(user.total_paid),
+            "total_participated": from_cents(user.total_participated)
+        }
+
+
+class AsyncOverallExpensesView(View):
+    async def get(self, request):
+        request = Request(request)
+        try:
+            response_data = await acached_read(
+                'overall-expenses', GLOBAL_SCOPE, request.build_absolute_uri(),
+                lambda: self.get_overall_data(request))
+        except APIException as e:
+            return error_response(e)
+        return api_response(response_data)
+
+    async def get_overall_data(self, request):
+        paginator = UserSummaryPagination()
+        # CursorPagination has no async API, so only the user page runs in a thread.
+        totals, users, recent_expenses = await asyncio.gather(
+            Expense.objects.aaggregate(total_amount=models.Sum('amount'), expense_count=models.Count('id')),
+            sync_to_async(paginator.paginate_queryset)(
+                User.objects.only('id', 'name').with_expense_totals(), request),
+            _list(Expense.objects.prefetch_related('participants').order_by('-id')[:5])
+        )
+
+        return {
+            "total_expenses": from_cents(totals['total_amount'] or 0),
+            "expense_count": totals['expense_count'],
+            "user_summaries": {
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "results": [
+                    {
+                        "user_id": user.id,
+                        "name": user.name,
+                        "total_paid": from_cents(user.total_paid),
+                        "total_participated": from_cents(user.total_participated)
+                    }
+                    for user in users
+                ]
+            },
+            "recent_expenses": expense_rows(recent_expenses)
+        }
+
+
+class AsyncExpenseListView(View):
+    async def get(self, request):
+        request = Request(request)
+        paginator = ExpenseKeysetPagination()
+        try:
+            expenses = await paginator.apaginate_queryset(
+                filter_expenses(expense_list_queryset(), request.query_params), request)
+        except APIException as e:
+            return error_response(e)
+        return api_response(paginator.get_page(expense_rows(expenses)))
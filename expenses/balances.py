@@ -0,0 +1,99 @@
+import logging
+from collections import defaultdict
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Balance, BalanceEvent
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH_SIZE = 500
+EVENT_BATCH_SIZE = 1000
+
+
+def net_pair_deltas(deltas):
+    """Sum (debtor_id, creditor_id, amount) deltas into {(low_id, high_id): net}.
+
+    A positive net means low_id owes high_id, a negative one the reverse.
+    """
+    net = defaultdict(int)
+    for debtor_id, creditor_id, amount in deltas:
+        if debtor_id == creditor_id:
+            continue
+        if debtor_id < creditor_id:
+            net[(debtor_id, creditor_id)] += amount
+        else:
+            net[(creditor_id, debtor_id)] -= amount
+    return {pair: amount for pair, amount in net.items() if amount}
+
+
+def _upsert_sql(row_count, grouped):
+    quote = connection.ops.quote_name
+    table = quote(Balance._meta.db_table)
+    group, from_user, to_user, amount = (quote(Balance._meta.get_field(name).column)
+                                         for name in ('group', 'from_user', 'to_user', 'amount'))
+    values = ', '.join(['(%s, %s, %s, %s)'] * row_count)
+    # The conflict target has to name the partial unique index it hits.
+    if grouped:
+        target = f"({group}, {from_user}, {to_user}) WHERE {group} IS NOT NULL"
+    else:
+        target = f"({from_user}, {to_user}) WHERE {group} IS NULL"
+    return (
+        f"INSERT INTO {table} ({group}, {from_user}, {to_user}, {amount}) VALUES {values} "
+        f"ON CONFLICT {target} DO UPDATE SET {amount} = {table}.{amount} + excluded.{amount}"
+    )
+
+
+def _events(rows, group_id, expense_id, created_at, settlement_id=None):
+    return [
+        BalanceEvent(group_id=group_id, from_user_id=low_id, to_user_id=high_id, amount=amount,
+                     expense_id=expense_id, settlement_id=settlement_id, created_at=created_at)
+        for (low_id, high_id), amount in rows
+    ]
+
+
+def balance_events(deltas, group_id=None, expense_id=None, created_at=None, settlement_id=None):
+    """Build unsaved BalanceEvent rows for the netted canonical pairs of deltas."""
+    return _events(sorted(net_pair_deltas(deltas).items()), group_id, expense_id, created_at or timezone.now(),
+                   settlement_id)
+
+
+def record_balance_events(events):
+    BalanceEvent.objects.bulk_create(events, batch_size=EVENT_BATCH_SIZE)
+
+
+def apply_balance_deltas(deltas, group_id=None, expense_id=None, log_events=True):
+    """Add deltas to one ledger's Balance rows with single-statement atomic upserts.
+
+    The database applies ``amount = amount + delta`` to each canonical pair, so
+    concurrent writers never read rows back, take no explicit locks and need no
+    retries. Pairs are written in key order to keep lock acquisition ordered.
+    ``group_id`` selects the group ledger; None is the ungrouped one.
+
+    Every netted pair change is also appended to BalanceEvent, attributed to
+    expense_id. Callers that attribute events themselves, like bulk uploads
+    spanning many expenses, pass log_events=False and call
+    record_balance_events().
+    """
+    rows = sorted(net_pair_deltas(deltas).items())
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            params = [value for (low_id, high_id), amount in batch for value in (group_id, low_id, high_id, amount)]
+            cursor.execute(_upsert_sql(len(batch), group_id is not None), params)
+    if log_events:
+        record_balance_events(_events(rows, group_id, expense_id, timezone.now()))
+    logger.info(f"Applied balance deltas to {len(rows)} user pairs")
+
+
+def owed_amount(debtor_id, creditor_id, group_id=None):
+    """Return how much debtor_id owes creditor_id; negative if it is the other way round."""
+    low_id, high_id = sorted((debtor_id, creditor_id))
+    amount = Balance.objects.in_group(group_id).filter(
+        from_user_id=low_id, to_user_id=high_id).values_list('amount', flat=True).first()
+    amount = amount or 0
+    return amount if debtor_id == low_id else -amount
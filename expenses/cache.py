@@ -0,0 +1,150 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+SPLIT_PREVIEW_TIMEOUT = getattr(settings, 'EXPENSE_SPLIT_CACHE_TIMEOUT', 300)
+LEDGER_CACHE_TIMEOUT = getattr(settings, 'LEDGER_CACHE_TIMEOUT', 60)
+GLOBAL_SCOPE = 'global'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(name, outcome):
+    with _stats_lock:
+        _stats[(name, outcome)] += 1
+
+
+def cache_stats():
+    """Return {name: {"hits": n, "misses": n}} for this process."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    stats = {}
+    for (name, outcome), count in sorted(snapshot.items()):
+        stats.setdefault(name, {"hits": 0, "misses": 0})[outcome] = count
+    return stats
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def split_preview_key(expense_id):
+    return f"expense-split:{expense_id}"
+
+
+def get_split_preview(expense_id):
+    """Return the cached (etag, data) pair for an expense, or None."""
+    entry = cache.get(split_preview_key(expense_id))
+    _record('expense-split', 'hits' if entry is not None else 'misses')
+    return entry
+
+
+def set_split_preview(expense_id, data):
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    entry = (f'"{digest[:32]}"', data)
+    cache.set(split_preview_key(expense_id), entry, SPLIT_PREVIEW_TIMEOUT)
+    return entry
+
+
+def invalidate_split_previews(expense_ids):
+    cache.delete_many([split_preview_key(expense_id) for expense_id in expense_ids])
+
+
+def invalidate_split_previews_on_commit(expense_ids):
+    """Drop the previews once the current transaction commits.
+
+    Clearing them earlier lets a concurrent read cache the pre-commit rows
+    again for the full timeout.
+    """
+    expense_ids = list(expense_ids)
+    transaction.on_commit(lambda: invalidate_split_previews(expense_ids))
+
+
+def user_scope(user_id):
+    return f"user:{user_id}"
+
+
+def group_scope(group_id):
+    return f"group:{group_id}"
+
+
+def _version_key(scope):
+    return f"ledger-version:{scope}"
+
+
+def scope_version(scope):
+    version = cache.get(_version_key(scope))
+    if version is None:
+        # Seed from the clock so a version evicted from the cache never comes
+        # back with a number an older entry was stored under.
+        cache.add(_version_key(scope), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(scope))
+    return version
+
+
+async def ascope_version(scope):
+    version = await cache.aget(_version_key(scope))
+    if version is None:
+        await cache.aadd(_version_key(scope), time.time_ns(), timeout=None)
+        version = await cache.aget(_version_key(scope))
+    return version
+
+
+def bump_scopes(scopes):
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.add(_version_key(scope), time.time_ns(), timeout=None)
+
+
+def invalidate_ledger_on_commit(user_ids, group_ids=()):
+    """Bump the global, per-user and per-group versions once the current transaction commits."""
+    scopes = [GLOBAL_SCOPE] + [user_scope(user_id) for user_id in set(user_ids)]
+    scopes += [group_scope(group_id) for group_id in set(group_ids) if group_id is not None]
+    transaction.on_commit(lambda: bump_scopes(scopes))
+
+
+def _ledger_key(name, scope, version, params):
+    digest = hashlib.sha256(params.encode()).hexdigest()[:32]
+    return f"ledger:{name}:{scope}:{version}:{digest}"
+
+
+def cached_read(name, scope, params, compute):
+    """Return compute() through the cache under the scope's current version.
+
+    Writes bump the version instead of deleting keys, so every entry written
+    before the bump becomes unreachable at once and simply ages out.
+    """
+    key = _ledger_key(name, scope, scope_version(scope), params)
+    value = cache.get(key)
+    if value is not None:
+        _record(name, 'hits')
+        return value
+
+    _record(name, 'misses')
+    value = compute()
+    cache.set(key, value, LEDGER_CACHE_TIMEOUT)
+    return value
+
+
+async def acached_read(name, scope, params, compute):
+    """Async counterpart of cached_read(); compute is a coroutine function."""
+    key = _ledger_key(name, scope, await ascope_version(scope), params)
+    value = await cache.aget(key)
+    if value is not None:
+        _record(name, 'hits')
+        return value
+
+    _record(name, 'misses')
+    value = await compute()
+    await cache.aset(key, value, LEDGER_CACHE_TIMEOUT)
+    return value
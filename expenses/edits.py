@@ -0,0 +1,63 @@
+import logging
+from collections import defaultdict, namedtuple
+
+from .balances import apply_balance_deltas
+from .cache import invalidate_ledger_on_commit
+from .ledger import record_expense_totals
+from .rollups import record_rollups, rollup_day
+
+logger = logging.getLogger(__name__)
+
+LedgerEntry = namedtuple('LedgerEntry', ['group_id', 'payer_id', 'amount', 'participant_ids', 'deltas',
+                                         'split_method', 'day'])
+
+
+def new_ledger_entry(expense, participant_ids, deltas):
+    """Build the entry of a just-saved expense from what the caller already has in hand."""
+    return LedgerEntry(expense.group_id, expense.payer_id, expense.amount, list(participant_ids), deltas,
+                       expense.split_method, rollup_day(expense.created_at))
+
+
+def ledger_entry(expense):
+    """Capture what an expense currently contributes to balances, totals and rollups."""
+    _, deltas = expense.split_preview()
+    return new_ledger_entry(expense, expense.participants.values_list('id', flat=True), deltas)
+
+
+def apply_expense_change(expense_id, old=None, new=None):
+    """Move balances, ledger totals, daily rollups and caches from entry old to entry new.
+
+    Either side may be None for a created or deleted expense. Balances only
+    receive the netted difference per ledger, so the work is proportional to
+    the participants involved. Must run inside the transaction that writes
+    the expense.
+    """
+    deltas_by_group = defaultdict(list)
+    if old:
+        deltas_by_group[old.group_id].extend(
+            (debtor_id, creditor_id, -amount) for debtor_id, creditor_id, amount in old.deltas)
+    if new:
+        deltas_by_group[new.group_id].extend(new.deltas)
+    for group_id, deltas in deltas_by_group.items():
+        apply_balance_deltas(deltas, group_id=group_id, expense_id=expense_id)
+
+    record_expense_totals(
+        [(new.payer_id, new.amount, new.participant_ids)] if new else [],
+        removed=[(old.payer_id, old.amount, old.participant_ids)] if old else []
+    )
+    record_rollups([new] if new else [], removed=[old] if old else [])
+
+    entries = [entry for entry in (old, new) if entry]
+    invalidate_ledger_on_commit(
+        [user_id for entry in entries
+         for user_id in [entry.payer_id, *entry.participant_ids, *(debtor for debtor, _, _ in entry.deltas)]],
+        deltas_by_group
+    )
+    logger.info(f"Applied change to expense {expense_id} across {len(deltas_by_group)} ledgers")
+
+
+def delete_expense(expense):
+    """Delete an expense and reverse what it contributed. Must run in a transaction."""
+    expense_id = expense.id
+    apply_expense_change(expense_id, old=ledger_entry(expense))
+    expense.delete()
@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.db import models
+from django.utils import timezone
+
+from .models import Expense, ExpenseParticipant, Balance
+from .splits import compute_shares
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Rows per Parquet row group; each group carries its own min/max statistics.
+ROW_GROUP_SIZE = 50000
+COMPRESSION = 'zstd'
+# Expenses younger than this may still be committing with an earlier
+# created_at, so an incremental export stops short of them.
+EXPORT_SETTLE = timedelta(seconds=60)
+
+if pa is not None:
+    TIMESTAMP = pa.timestamp('us', tz='UTC')
+    SCHEMAS = {
+        'expenses': pa.schema([
+            ('id', pa.int64()),
+            ('group_id', pa.int64()),
+            ('payer_id', pa.int64()),
+            ('amount_cents', pa.int64()),
+            ('split_method', pa.dictionary(pa.int8(), pa.string())),
+            ('created_at', TIMESTAMP),
+        ]),
+        'expense_participants': pa.schema([
+            ('expense_id', pa.int64()),
+            ('user_id', pa.int64()),
+            # Null when the expense cannot be split, e.g. legacy bad splits.
+            ('share_cents', pa.int64()),
+            ('expense_created_at', TIMESTAMP),
+        ]),
+        'balances': pa.schema([
+            ('group_id', pa.int64()),
+            ('debtor_id', pa.int64()),
+            ('creditor_id', pa.int64()),
+            ('owed_cents', pa.int64()),
+        ]),
+    }
+else:
+    SCHEMAS = {}
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc)
+
+
+def expense_batches(since=None, until=None, chunk_size=ROW_GROUP_SIZE):
+    """Yield lists of expense rows with since <= created_at < until, walking (created_at, id)."""
+    expenses = Expense.objects.order_by('created_at', 'id')
+    if since is not None:
+        expenses = expenses.filter(created_at__gte=since)
+    if until is not None:
+        expenses = expenses.filter(created_at__lt=until)
+    fields = ('id', 'group_id', 'payer_id', 'amount', 'split_method', 'exact_splits', 'percentage_splits',
+              'created_at')
+    last = None
+    while True:
+        page = expenses
+        if last is not None:
+            page = page.filter(models.Q(created_at__gt=last[0]) | models.Q(created_at=last[0], id__gt=last[1]))
+        rows = list(page.values_list(*fields)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1][-1], rows[-1][0])
+
+
+def expense_table(rows):
+    columns = list(zip(*rows))
+    return pa.table({
+        'id': columns[0],
+        'group_id': columns[1],
+        'payer_id': columns[2],
+        'amount_cents': columns[3],
+        'split_method': columns[4],
+        'created_at': [_utc(moment) for moment in columns[7]],
+    }, schema=SCHEMAS['expenses'])
+
+
+def participant_table(rows):
+    """One row per participant of the given expenses, with the share their split assigns."""
+    participants = defaultdict(list)
+    for expense_id, user_id in ExpenseParticipant.objects.filter(
+            expense_id__in=[row[0] for row in rows]).order_by('expense_id', 'user_id').values_list(
+            'expense_id', 'user_id'):
+        participants[expense_id].append(user_id)
+
+    columns = {'expense_id': [], 'user_id': [], 'share_cents': [], 'expense_created_at': []}
+    for expense_id, _, _, amount, split_method, exact_splits, percentage_splits, created_at in rows:
+        try:
+            shares = compute_shares(split_method, amount, participants[expense_id], exact_splits, percentage_splits)
+        except (ValueError, ArithmeticError):
+            shares = {}
+        for user_id in participants[expense_id]:
+            columns['expense_id'].append(expense_id)
+            columns['user_id'].append(user_id)
+            columns['share_cents'].append(shares.get(user_id))
+            columns['expense_created_at'].append(_utc(created_at))
+    return pa.table(columns, schema=SCHEMAS['expense_participants'])
+
+
+def expense_tables(since=None, until=None, chunk_size=ROW_GROUP_SIZE):
+    return (expense_table(rows) for rows in expense_batches(since, until, chunk_size))
+
+
+def participant_tables(since=None, until=None, chunk_size=ROW_GROUP_SIZE):
+    return (participant_table(rows) for rows in expense_batches(since, until, chunk_size))
+
+
+def balance_tables(group_id=None, chunk_size=ROW_GROUP_SIZE):
+    """Yield Arrow tables of who owes whom, one row per non-zero pair, ordered by ledger and pair."""
+    balances = Balance.objects.exclude(amount=0).order_by('group_id', 'from_user_id', 'to_user_id')
+    if group_id is not None:
+        balances = balances.filter(group_id=group_id)
+    batch = {'group_id': [], 'debtor_id': [], 'creditor_id': [], 'owed_cents': []}
+    for group, from_user_id, to_user_id, amount in balances.values_list(
+            'group_id', 'from_user_id', 'to_user_id', 'amount').iterator(chunk_size=chunk_size):
+        # Positive amounts mean from_user owes to_user.
+        debtor_id, creditor_id = (from_user_id, to_user_id) if amount > 0 else (to_user_id, from_user_id)
+        batch['group_id'].append(group)
+        batch['debtor_id'].append(debtor_id)
+        batch['creditor_id'].append(creditor_id)
+        batch['owed_cents'].append(abs(amount))
+        if len(batch['owed_cents']) >= chunk_size:
+            yield pa.table(batch, schema=SCHEMAS['balances'])
+            batch = {name: [] for name in batch}
+    if batch['owed_cents']:
+        yield pa.table(batch, schema=SCHEMAS['balances'])
+
+
+class _ChunkSink:
+    """A write-only file that hands back what was written since the last drain()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(name, tables):
+    """Encode Arrow tables as one Parquet file, yielding bytes after each row group.
+
+    The footer (schema and row-group statistics) comes last, as the format
+    requires, so nothing but the current row group is held in memory.
+    """
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, SCHEMAS[name], compression=COMPRESSION, write_statistics=True) as writer:
+        for table in tables:
+            writer.write_table(table, row_group_size=len(table) or 1)
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def write_parquet(path, name, tables):
+    """Write tables to path as Parquet; returns the number of rows written."""
+    rows = 0
+    with pq.ParquetWriter(path, SCHEMAS[name], compression=COMPRESSION, write_statistics=True) as writer:
+        for table in tables:
+            writer.write_table(table, row_group_size=len(table) or 1)
+            rows += len(table)
+    return rows
+
+
+def _write_atomically(path, write):
+    partial = path.with_name(path.name + '.part')
+    rows = write(partial)
+    os.replace(partial, path)
+    return rows
+
+
+def export_snapshot(directory, full=False, settle=EXPORT_SETTLE, chunk_size=ROW_GROUP_SIZE):
+    """Append new expenses to a Parquet dataset in directory and refresh the balances file.
+
+    Expenses and their participant rows go to expenses/part-*.parquet and
+    expense_participants/part-*.parquet, one part per run covering
+    [watermark, now - settle). manifest.json keeps the watermark, so the next
+    run only writes newer rows. Edits and deletes of already exported
+    expenses are not picked up; run with full=True to rewrite every part.
+    balances.parquet is always a full snapshot. Returns (manifest, number
+    of expenses written).
+    """
+    directory = Path(directory)
+    manifest_path = directory / 'manifest.json'
+    manifest = {'watermark': None, 'parts': []}
+    if manifest_path.exists() and not full:
+        manifest = json.loads(manifest_path.read_text())
+    for name in ('expenses', 'expense_participants'):
+        (directory / name).mkdir(parents=True, exist_ok=True)
+    if full:
+        for part in directory.glob('expense*/part-*.parquet'):
+            part.unlink()
+
+    since = datetime.fromisoformat(manifest['watermark']) if manifest['watermark'] else None
+    until = timezone.now() - settle
+    exported = 0
+    if since is None or until > since:
+        stamp = until.strftime('%Y%m%dT%H%M%S%fZ')
+        paths = {name: directory / name / f"part-{stamp}.parquet" for name in ('expenses', 'expense_participants')}
+        partials = {name: path.with_name(path.name + '.part') for name, path in paths.items()}
+        rows = dict.fromkeys(paths, 0)
+        writers = {name: pq.ParquetWriter(partials[name], SCHEMAS[name], compression=COMPRESSION)
+                   for name in paths}
+        try:
+            # One pass over the expenses feeds both files.
+            for batch in expense_batches(since, until, chunk_size):
+                for name, table in (('expenses', expense_table(batch)),
+                                    ('expense_participants', participant_table(batch))):
+                    writers[name].write_table(table, row_group_size=len(table) or 1)
+                    rows[name] += len(table)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        for name, path in paths.items():
+            if rows['expenses']:
+                os.replace(partials[name], path)
+            else:
+                partials[name].unlink()
+        if rows['expenses']:
+            manifest['parts'].append({
+                'since': since.isoformat() if since else None, 'until': until.isoformat(),
+                'expenses': rows['expenses'], 'expense_participants': rows['expense_participants'],
+                'files': [str(path.relative_to(directory)) for path in paths.values()],
+            })
+        manifest['watermark'] = until.isoformat()
+        exported = rows['expenses']
+        logger.info(f"Exported {rows['expenses']} expenses created before {until.isoformat()}")
+
+    manifest['balances'] = {
+        'rows': _write_atomically(directory / 'balances.parquet',
+                                  lambda path: write_parquet(path, 'balances', balance_tables(chunk_size=chunk_size))),
+        'as_of': timezone.now().isoformat(),
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2) + '\n')
+    return manifest, exported
@@ -0,0 +1,97 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Expense
+
+SPLIT_METHOD_VALUES = {value for value, _ in Expense.SPLIT_METHODS}
+
+
+def _parse_bound(name, value, end_of_day=False):
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        day = moment = None
+    if day:
+        # A bare date covers the whole day, so an upper bound moves to the next midnight.
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    if moment is None:
+        raise ValidationError({name: "Expected an ISO 8601 date or datetime"})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_as_of(name, value):
+    """Parse an exclusive upper bound; a bare date means the end of that day."""
+    return _parse_bound(name, value, end_of_day=True)
+
+
+def created_range(params):
+    """Return (since, until) from created_after/created_before; either may be None.
+
+    since is inclusive and until exclusive, with a bare created_before date
+    covering that whole day.
+    """
+    since = _parse_bound('created_after', params['created_after']) if params.get('created_after') else None
+    until = (_parse_bound('created_before', params['created_before'], end_of_day=True)
+             if params.get('created_before') else None)
+    return since, until
+
+
+def filter_expenses(queryset, params):
+    """Apply created_after/created_before/group/payer/split_method query parameters.
+
+    Date bounds are turned into plain created_at range comparisons so they
+    stay on the (created_at, id), (group, created_at, id) and
+    (payer, created_at, id) indexes.
+    """
+    since, until = created_range(params)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    if params.get('group'):
+        if not params['group'].isdigit():
+            raise ValidationError({"group": "Expected a group id"})
+        queryset = queryset.filter(group_id=int(params['group']))
+    if params.get('payer'):
+        if not params['payer'].isdigit():
+            raise ValidationError({"payer": "Expected a user id"})
+        queryset = queryset.filter(payer_id=int(params['payer']))
+    if params.get('split_method'):
+        if params['split_method'] not in SPLIT_METHOD_VALUES:
+            raise ValidationError({"split_method": "Invalid split method"})
+        queryset = queryset.filter(split_method=params['split_method'])
+    return queryset
+
+
+def _parse_day(name, value):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: "Expected an ISO 8601 date"})
+    return day
+
+
+def statement_window(params, granularities):
+    """Return (from, to, granularity) for a statement; both days are inclusive.
+
+    to defaults to today and from to the first day of the month a year
+    before it, so the default monthly statement has twelve full periods
+    plus the current one.
+    """
+    end = _parse_day('to', params['to']) if params.get('to') else timezone.localdate()
+    start = (_parse_day('from', params['from']) if params.get('from')
+             else end.replace(year=end.year - 1, day=1))
+    if start > end:
+        raise ValidationError({"from": "Must not be after to"})
+    granularity = params.get('granularity') or 'month'
+    if granularity not in granularities:
+        raise ValidationError({"granularity": f"Expected one of {', '.join(granularities)}"})
+    return start, end, granularity
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """Hash the method, path and parsed body, so a reused key can be told apart."""
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{payload}".encode()).hexdigest()
+
+
+def stored_response(key, fingerprint):
+    """Return the response recorded for key, or None if the key is new.
+
+    A key recorded for a different request gets a 422 instead of a replay.
+    """
+    record = IdempotencyKey.objects.filter(key=key).only(
+        'fingerprint', 'status_code', 'response_body').first()
+    if record is None:
+        return None
+    if record.fingerprint != fingerprint:
+        return HttpResponse(
+            JSONRenderer().render({"error": f"{HEADER} was already used for a different request"}),
+            status=422, content_type='application/json')
+
+    logger.info(f"Replaying stored response for idempotency key {key}")
+    response = HttpResponse(record.response_body, status=record.status_code, content_type='application/json')
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def remember_response(key, fingerprint, status_code, data):
+    """Record the rendered response; must run in the transaction that did the work.
+
+    The unique key makes a concurrent duplicate fail with IntegrityError and
+    roll its own work back.
+    """
+    IdempotencyKey.objects.create(
+        key=key, fingerprint=fingerprint, status_code=status_code,
+        response_body=JSONRenderer().render(data).decode())
+
+
+def prune_expired_keys(ttl=None, batch_size=10000):
+    """Delete keys older than ttl seconds in batches; returns the number deleted."""
+    ttl = settings.IDEMPOTENCY_KEY_TTL if ttl is None else ttl
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+    deleted = 0
+    while True:
+        # Nothing references IdempotencyKey, so each batch is a single DELETE.
+        batch = list(expired.order_by('created_at').values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=batch).delete()[0]
@@ -0,0 +1,165 @@
+import logging
+import os
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ReportJob
+from .recompute import balance_drift, confirm_drift, correct_drift, expected_balances
+from .reports import balance_sheet_rows, user_statement_rows, iter_csv
+
+logger = logging.getLogger(__name__)
+
+# Workers refresh a running job's heartbeat this often; a job whose heartbeat
+# is older than STALE_AFTER is assumed to have lost its worker.
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+STALE_AFTER = timedelta(minutes=5)
+MAX_ATTEMPTS = 3
+
+
+def _write_csv(job, name, rows):
+    directory = Path(settings.REPORTS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{job.id}-{name}.csv"
+    # Write under a temporary name so a half-written file is never served.
+    partial = path.with_suffix('.csv.part')
+    with open(partial, 'wb') as output:
+        for chunk in iter_csv(rows):
+            output.write(chunk)
+    os.replace(partial, path)
+    return str(path), None
+
+
+def run_balance_sheet(job):
+    name = f"balance_sheet_group_{job.params['group']}" if job.params.get('group') else 'balance_sheet'
+    return _write_csv(job, name, balance_sheet_rows(job.params.get('group')))
+
+
+def run_user_statement(job):
+    return _write_csv(job, f"statement_user_{job.params['user_id']}", user_statement_rows(job.params['user_id']))
+
+
+def run_ledger_recompute(job):
+    expected, errors = expected_balances(workers=1)
+    drift = confirm_drift(balance_drift(expected))
+    # correct_drift re-checks every pair in its own transaction, so web
+    # writes that land while the job runs are never reversed.
+    corrected = correct_drift(drift) if drift and job.params.get('fix') else []
+    return '', {
+        "pairs": len(expected),
+        "drifted": len(drift),
+        "corrected": len(corrected),
+        "unsplittable_expenses": [expense_id for expense_id, _ in errors],
+    }
+
+
+# Each runner returns (result_path, result) for a claimed job.
+RUNNERS = {
+    ReportJob.BALANCE_SHEET: run_balance_sheet,
+    ReportJob.USER_STATEMENT: run_user_statement,
+    ReportJob.LEDGER_RECOMPUTE: run_ledger_recompute,
+}
+
+
+def submit_job(kind, params=None):
+    job = ReportJob.objects.create(kind=kind, params=params or {})
+    logger.info(f"Queued {kind} job {job.id}")
+    return job
+
+
+def claim_job():
+    """Mark the oldest pending job as running and return it, or None if the queue is empty.
+
+    The claim is a conditional UPDATE, so two workers racing for one job
+    cannot both win, without needing SELECT ... SKIP LOCKED.
+    """
+    while True:
+        job_id = ReportJob.objects.filter(status=ReportJob.PENDING).order_by('id').values_list(
+            'id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = ReportJob.objects.filter(id=job_id, status=ReportJob.PENDING).update(
+            status=ReportJob.RUNNING, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            return job_id
+
+
+class _Heartbeat(threading.Thread):
+    """Refreshes one attempt's heartbeat_at on its own connection until stopped."""
+
+    def __init__(self, lease, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.lease = lease
+        self.interval = interval.total_seconds()
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    lease_kept = self.lease.update(heartbeat_at=timezone.now())
+                except DatabaseError as e:
+                    logger.warning(f"Could not refresh heartbeat: {str(e)}")
+                    continue
+                if not lease_kept:
+                    return
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job_id):
+    """Run a claimed job and record its outcome; safe to call in a pool process.
+
+    The outcome is only written while this attempt still holds the job, so
+    a job requeued or failed as stale is never overwritten. Returns the
+    outcome, or 'lost' if the lease was gone by the time the job finished.
+    """
+    job = ReportJob.objects.get(id=job_id)
+    lease = ReportJob.objects.filter(id=job.id, status=ReportJob.RUNNING, attempts=job.attempts)
+    heartbeat = _Heartbeat(lease)
+    heartbeat.start()
+    try:
+        result_path, result = RUNNERS[job.kind](job)
+    except Exception as e:
+        logger.exception(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+        outcome = ReportJob.FAILED
+        updates = {'error': f"{type(e).__name__}: {e}"}
+    else:
+        outcome = ReportJob.DONE
+        updates = {'result_path': result_path, 'result': result, 'error': ''}
+    finally:
+        heartbeat.stop()
+
+    if not lease.update(status=outcome, finished_at=timezone.now(), **updates):
+        logger.warning(f"Job {job.id} ({job.kind}) lost its lease before finishing; outcome discarded")
+        return 'lost'
+    logger.info(f"Job {job.id} ({job.kind}) {outcome}")
+    return outcome
+
+
+def requeue_stale_jobs(older_than=STALE_AFTER, exclude_ids=()):
+    """Return jobs whose worker died to the queue; jobs that keep dying are failed.
+
+    A job is stale when its heartbeat is older than older_than. exclude_ids
+    are jobs the caller knows are still running, e.g. in its own pool.
+    Returns (requeued, failed) counts.
+    """
+    cutoff = timezone.now() - older_than
+    # Jobs claimed before heartbeats existed only have started_at.
+    stale = ReportJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff), status=ReportJob.RUNNING
+    ).exclude(id__in=list(exclude_ids))
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ReportJob.FAILED, error=f"Worker lost {MAX_ATTEMPTS} times", finished_at=timezone.now())
+    requeued = stale.update(status=ReportJob.PENDING, started_at=None, heartbeat_at=None)
+    return requeued, failed
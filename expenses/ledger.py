@@ -0,0 +1,101 @@
+import logging
+from collections import defaultdict
+
+from django.db import models
+
+from .models import Expense, UserLedgerSummary
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ['total_paid', 'total_participated', 'expense_count', 'net_balance']
+
+
+def summary_deltas(expenses):
+    """Sum per-user ledger changes for (payer_id, amount, participant_ids) tuples."""
+    deltas = defaultdict(lambda: dict.fromkeys(SUMMARY_FIELDS, 0))
+    for payer_id, amount, participant_ids in expenses:
+        participant_ids = set(participant_ids)
+        deltas[payer_id]['total_paid'] += amount
+        deltas[payer_id]['net_balance'] += amount
+        for participant_id in participant_ids:
+            deltas[participant_id]['total_participated'] += amount
+            deltas[participant_id]['net_balance'] -= amount
+        for user_id in participant_ids | {payer_id}:
+            deltas[user_id]['expense_count'] += 1
+    return deltas
+
+
+def record_expense_totals(expenses, removed=()):
+    """Increment UserLedgerSummary rows for new expenses with F() expressions.
+
+    ``removed`` takes expenses in the same form whose totals are taken back
+    out, so an edit passes the old version there and the new one in expenses;
+    users whose totals come out unchanged are not written.
+    Users whose deltas are identical (every plain participant of one expense)
+    share a single UPDATE, so a single expense costs at most three queries.
+    Must run inside the transaction that writes the expenses.
+    """
+    deltas = summary_deltas(expenses)
+    for user_id, delta in summary_deltas(removed).items():
+        for field in SUMMARY_FIELDS:
+            deltas[user_id][field] -= delta[field]
+    deltas = {user_id: delta for user_id, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+
+    UserLedgerSummary.objects.bulk_create(
+        [UserLedgerSummary(user_id=user_id) for user_id in deltas],
+        ignore_conflicts=True, batch_size=1000
+    )
+    users_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users_by_delta[tuple(delta[field] for field in SUMMARY_FIELDS)].append(user_id)
+    for values, user_ids in users_by_delta.items():
+        UserLedgerSummary.objects.filter(user_id__in=user_ids).update(**{
+            field: models.F(field) + value for field, value in zip(SUMMARY_FIELDS, values)
+        })
+
+
+def expected_summaries():
+    """Recompute every user's ledger totals from Expense with grouped queries."""
+    Participant = Expense.participants.through
+    expected = defaultdict(lambda: dict.fromkeys(SUMMARY_FIELDS, 0))
+
+    paid = Expense.objects.order_by().values('payer_id').annotate(
+        total=models.Sum('amount'), count=models.Count('id'))
+    for row in paid.iterator():
+        summary = expected[row['payer_id']]
+        summary['total_paid'] = row['total']
+        summary['expense_count'] += row['count']
+
+    participated = Participant.objects.order_by().values('user_id').annotate(
+        total=models.Sum('expense__amount'), count=models.Count('expense_id'))
+    for row in participated.iterator():
+        summary = expected[row['user_id']]
+        summary['total_participated'] = row['total']
+        summary['expense_count'] += row['count']
+
+    # Expenses where the payer is also a participant were counted twice above.
+    self_participated = Participant.objects.filter(expense__payer_id=models.F('user_id')).order_by().values(
+        'user_id').annotate(count=models.Count('expense_id'))
+    for row in self_participated.iterator():
+        expected[row['user_id']]['expense_count'] -= row['count']
+
+    for summary in expected.values():
+        summary['net_balance'] = summary['total_paid'] - summary['total_participated']
+    return expected
+
+
+def group_expense_totals(group_id):
+    """Return {user_id: (total_paid, total_participated)} over one group's expenses."""
+    Participant = Expense.participants.through
+    totals = defaultdict(lambda: (0, 0))
+    paid = Expense.objects.filter(group_id=group_id).order_by().values_list('payer_id').annotate(
+        total=models.Sum('amount'))
+    for user_id, total in paid:
+        totals[user_id] = (total, 0)
+    participated = Participant.objects.filter(expense__group_id=group_id).order_by().values_list(
+        'user_id').annotate(total=models.Sum('expense__amount'))
+    for user_id, total in participated:
+        totals[user_id] = (totals[user_id][0], total)
+    return totals
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from expenses.models import DailyUserRollup
+from expenses.rollups import BACKFILL_CHUNK_SIZE, ROLLUP_FIELDS, expected_rollups, write_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild DailyUserRollup from the Expense table, or report drift with --check"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report rollups that drifted")
+        parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE,
+                            help="Expenses read per query")
+
+    def handle(self, *args, **options):
+        errors = []
+        expected = {key: values for key, values in expected_rollups(options['chunk_size'], errors).items()
+                    if any(values)}
+        for expense_id, message in errors:
+            self.stdout.write(f"Skipped expense {expense_id}: {message}")
+
+        if options['check']:
+            drifted = 0
+            for rollup in DailyUserRollup.objects.order_by().iterator(chunk_size=2000):
+                values = [getattr(rollup, field) for field in ROLLUP_FIELDS]
+                wanted = expected.pop((rollup.user_id, rollup.day, rollup.split_method, rollup.counterparty_id),
+                                      [0] * len(ROLLUP_FIELDS))
+                if values != wanted:
+                    drifted += 1
+                    self.stdout.write(f"Drift for user {rollup.user_id} on {rollup.day} ({rollup.split_method}, "
+                                      f"counterparty {rollup.counterparty_id}): expected {wanted}")
+            for key in expected:
+                self.stdout.write(f"Missing rollup {key}")
+            if drifted or expected:
+                raise CommandError(f"{drifted} drifted, {len(expected)} missing")
+            self.stdout.write(self.style.SUCCESS("Daily rollups are consistent"))
+            return
+
+        with transaction.atomic():
+            DailyUserRollup.objects.all().delete()
+            written = write_rollups(expected)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily rollups"))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import exports
+
+class Command(BaseCommand):
+    help = "Export new expenses, their participants and current balances as Parquet; run nightly, e.g. from cron"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=settings.EXPORTS_DIR)
+        parser.add_argument('--full', action='store_true',
+                            help="Ignore the watermark and rewrite every part, picking up edits and deletes")
+        parser.add_argument('--settle-seconds', type=int, default=int(exports.EXPORT_SETTLE.total_seconds()),
+                            help="Leave expenses younger than this for the next run")
+        parser.add_argument('--row-group-size', type=int, default=exports.ROW_GROUP_SIZE)
+
+    def handle(self, *args, **options):
+        if exports.pa is None:
+            raise CommandError("Parquet export requires pyarrow (pip install pyarrow)")
+        manifest, exported = exports.export_snapshot(
+            options['output_dir'], full=options['full'],
+            settle=timedelta(seconds=options['settle_seconds']), chunk_size=options['row_group_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {exported} new expenses up to {manifest['watermark']} "
+            f"and {manifest['balances']['rows']} balance pairs to {options['output_dir']}"))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from expenses.idempotency import prune_expired_keys
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses past their TTL; run periodically, e.g. from cron"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=float, default=settings.IDEMPOTENCY_KEY_TTL / 3600,
+                            help="Delete keys older than this (defaults to IDEMPOTENCY_KEY_TTL)")
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_keys(ttl=options['older_than_hours'] * 3600, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} idempotency keys"))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from expenses.ledger import SUMMARY_FIELDS, expected_summaries
+from expenses.models import UserLedgerSummary
+
+class Command(BaseCommand):
+    help = "Rebuild UserLedgerSummary from the Expense table, or report drift with --check"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report rows that drifted")
+
+    def handle(self, *args, **options):
+        expected = expected_summaries()
+
+        drifted = []
+        stored_ids = set()
+        for summary in UserLedgerSummary.objects.iterator(chunk_size=2000):
+            stored_ids.add(summary.user_id)
+            wanted = expected.get(summary.user_id, dict.fromkeys(SUMMARY_FIELDS, 0))
+            if any(getattr(summary, field) != wanted[field] for field in SUMMARY_FIELDS):
+                drifted.append(summary.user_id)
+        missing = [user_id for user_id in expected if user_id not in stored_ids]
+
+        for user_id in drifted:
+            self.stdout.write(f"Drift for user {user_id}: expected {expected.get(user_id)}")
+        for user_id in missing:
+            self.stdout.write(f"Missing summary for user {user_id}")
+
+        if options['check']:
+            if drifted or missing:
+                raise CommandError(f"{len(drifted)} drifted, {len(missing)} missing")
+            self.stdout.write(self.style.SUCCESS("Ledger summaries are consistent"))
+            return
+
+        with transaction.atomic():
+            UserLedgerSummary.objects.all().delete()
+            UserLedgerSummary.objects.bulk_create(
+                [UserLedgerSummary(user_id=user_id, **totals) for user_id, totals in expected.items()],
+                batch_size=1000
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(expected)} ledger summaries"))
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from expenses.jobs import STALE_AFTER, claim_job, requeue_stale_jobs, run_job
+
+
+def _ready():
+    return True
+
+
+class Command(BaseCommand):
+    help = "Run queued report jobs (POST /reports/) on a local process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help="Jobs run at once; 1 runs them in this process")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between queue polls when idle")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--stale-minutes', type=float, default=STALE_AFTER.total_seconds() / 60,
+                            help="Requeue running jobs whose heartbeat is older than this")
+
+    def handle(self, *args, **options):
+        self.stale_after = timedelta(minutes=options['stale_minutes'])
+        if options['processes'] <= 1:
+            self.run_inline(options)
+            return
+
+        # Fork every worker before this process opens a database connection
+        # again; a forked child must not share the parent's connection.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['processes'], mp_context=get_context('fork')) as pool:
+            pool.submit(_ready).result()
+            self.run_pool(pool, options)
+
+    def report(self, job_id, outcome):
+        style = self.style.SUCCESS if outcome == 'done' else self.style.ERROR
+        self.stdout.write(style(f"Job {job_id}: {outcome}"))
+
+    def requeue(self, running=()):
+        requeued, failed = requeue_stale_jobs(self.stale_after, exclude_ids=running)
+        if requeued or failed:
+            self.stdout.write(f"Requeued {requeued} stale jobs, failed {failed}")
+
+    def run_inline(self, options):
+        while True:
+            self.requeue()
+            job_id = claim_job()
+            if job_id is not None:
+                self.report(job_id, run_job(job_id))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['poll_interval'])
+
+    def run_pool(self, pool, options):
+        running = {}
+        last_requeue = 0.0
+        while True:
+            if time.monotonic() - last_requeue > 60:
+                # Our own jobs keep heartbeating, but never requeue them under us.
+                self.requeue(running.values())
+                last_requeue = time.monotonic()
+            while len(running) < options['processes']:
+                job_id = claim_job()
+                if job_id is None:
+                    break
+                running[pool.submit(run_job, job_id)] = job_id
+
+            if not running:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id = running.pop(future)
+                try:
+                    self.report(job_id, future.result())
+                except BrokenProcessPool:
+                    # Running jobs go back to the queue once they are stale.
+                    raise CommandError(f"A worker process died while running job {job_id}; restart run_workers")
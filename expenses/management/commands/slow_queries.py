@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from expenses.models import SlowRequest
+
+ORDERINGS = {
+    'duration': '-max_duration_ms',
+    'queries': '-max_queries',
+    'count': '-requests',
+}
+
+
+def _truncate(sql, width=160):
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= width else sql[:width - 3] + '...'
+
+
+class Command(BaseCommand):
+    help = "List the routes with the slowest or most query-heavy sampled requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help="Only consider requests from the last N hours")
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--order-by', choices=sorted(ORDERINGS), default='duration')
+        parser.add_argument('--prune-days', type=float,
+                            help="Delete stored requests older than N days before reporting")
+
+    def handle(self, *args, **options):
+        if options['prune_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['prune_days'])
+            deleted, _ = SlowRequest.objects.filter(created_at__lt=cutoff).delete()
+            self.stdout.write(f"Pruned {deleted} stored requests")
+
+        recent = SlowRequest.objects.filter(created_at__gte=timezone.now() - timedelta(hours=options['hours']))
+        routes = list(recent.values('route', 'method').annotate(
+            requests=models.Count('id'),
+            avg_duration_ms=models.Avg('duration_ms'),
+            max_duration_ms=models.Max('duration_ms'),
+            avg_sql_ms=models.Avg('sql_ms'),
+            avg_queries=models.Avg('query_count'),
+            max_queries=models.Max('query_count'),
+        ).order_by(ORDERINGS[options['order_by']], 'route', 'method')[:options['limit']])
+        if not routes:
+            self.stdout.write("No slow requests recorded")
+            return
+
+        for row in routes:
+            self.stdout.write(self.style.WARNING(
+                f"{row['method']} /{row['route']}: {row['requests']} slow requests, "
+                f"view avg {row['avg_duration_ms']:.0f} ms / max {row['max_duration_ms']:.0f} ms, "
+                f"SQL avg {row['avg_sql_ms']:.0f} ms, "
+                f"queries avg {row['avg_queries']:.0f} / max {row['max_queries']}"))
+            worst = recent.filter(route=row['route'], method=row['method'])
+            repeated = worst.order_by('-repeated_sql_count').values_list(
+                'repeated_sql', 'repeated_sql_count').first()
+            if repeated and repeated[1] > 1:
+                self.stdout.write(f"    repeated {repeated[1]}x: {_truncate(repeated[0])}")
+            slowest = worst.order_by('-slowest_sql_ms').values_list('slowest_sql', 'slowest_sql_ms').first()
+            if slowest and slowest[0]:
+                self.stdout.write(f"    slowest {slowest[1]:.1f} ms: {_truncate(slowest[0])}")
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from expenses.history import SNAPSHOT_SETTLE, take_snapshot
+from expenses.models import BalanceSnapshot
+
+class Command(BaseCommand):
+    help = "Compact the balance event log into a new snapshot; run periodically, e.g. from cron"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=0,
+                            help="Delete all but the newest N snapshots afterwards (0 keeps every snapshot)")
+        parser.add_argument('--settle-seconds', type=int, default=int(SNAPSHOT_SETTLE.total_seconds()),
+                            help="Leave events younger than this for the next snapshot")
+
+    def handle(self, *args, **options):
+        snapshot = take_snapshot(settle=timedelta(seconds=options['settle_seconds']))
+        if snapshot is None:
+            self.stdout.write("No new balance events since the last snapshot")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Snapshot {snapshot.id} covers events through {snapshot.last_event_id} "
+                f"({snapshot.rows.count()} pairs)"))
+
+        if options['keep'] > 0:
+            stale_ids = BalanceSnapshot.objects.order_by('-last_event_id').values_list(
+                'id', flat=True)[options['keep']:]
+            deleted, _ = BalanceSnapshot.objects.filter(id__in=list(stale_ids)).delete()
+            if deleted:
+                self.stdout.write(f"Pruned old snapshots ({deleted} rows)")
@@ -0,0 +1,75 @@
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+# Upper bounds of the histogram buckets; +Inf is implied.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+HISTOGRAMS = {
+    'expense_http_request_duration_seconds': ("Time spent in the view", DURATION_BUCKETS),
+    'expense_http_request_sql_seconds': ("SQL time per sampled request", DURATION_BUCKETS),
+    'expense_http_request_queries': ("Database queries per sampled request", QUERY_COUNT_BUCKETS),
+    'expense_http_response_size_bytes': ("Response body size", SIZE_BUCKETS),
+}
+REQUESTS_TOTAL = 'expense_http_requests_total'
+
+_histograms = {}
+_requests = Counter()
+_metrics_lock = threading.Lock()
+
+
+def observe(name, labels, value):
+    """Add value to the histogram name{labels}; labels is a tuple of (label, value) pairs."""
+    buckets = HISTOGRAMS[name][1]
+    with _metrics_lock:
+        counts = _histograms.get((name, labels))
+        if counts is None:
+            # One slot per bucket plus +Inf, then the running sum.
+            counts = _histograms[(name, labels)] = [0] * (len(buckets) + 1) + [0]
+        counts[bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+
+def count_request(labels):
+    with _metrics_lock:
+        _requests[labels] += 1
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _histograms.clear()
+        _requests.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}' if pairs else ''
+
+
+def render_prometheus():
+    """Render every metric of this process in the Prometheus text exposition format."""
+    with _metrics_lock:
+        histograms = {key: list(counts) for key, counts in _histograms.items()}
+        requests = dict(_requests)
+
+    lines = [f"# HELP {REQUESTS_TOTAL} Requests served", f"# TYPE {REQUESTS_TOTAL} counter"]
+    lines.extend(f"{REQUESTS_TOTAL}{_labels(labels)} {count}" for labels, count in sorted(requests.items()))
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} histogram"])
+        for (metric, labels), counts in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {counts[-1]}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,175 @@
+import logging
+import random
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection, DatabaseError
+
+from .metrics import observe, count_request
+from .models import SlowRequest
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """An execute_wrapper that counts queries and times them, per SQL statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.statement_seconds = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            # Statements are parameterised, so repeats of one string are an N+1.
+            self.statements[sql] += 1
+            self.statement_seconds[sql] += elapsed
+
+
+class RequestMetricsMiddleware:
+    """Record view time, response size and, for a sample of requests, SQL cost.
+
+    Every request updates the per-route histograms served at /metrics and gets
+    a Server-Timing header. Only a METRICS_SAMPLE_RATE fraction installs the
+    query recorder, which is where the per-query overhead is. Sampled requests
+    over the METRICS_SLOW_REQUEST_* thresholds are stored for `slow_queries`.
+    Keep it last in MIDDLEWARE so the timing covers the view alone. It runs
+    natively under ASGI, so async views are not pushed onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = self._sample()
+        self._start(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self._stop(recorder)
+            raise
+        if response.streaming:
+            return self._wrap_stream(request, response, start, recorder)
+        return self._complete(request, response, time.perf_counter() - start, recorder)
+
+    async def __acall__(self, request):
+        # Under ASGI, ORM calls run in the request's thread-sensitive executor
+        # thread, so the recorder is installed on that thread's connection.
+        # Unsampled requests never touch the database here and stay on the loop.
+        recorder = self._sample()
+        if recorder is not None:
+            await sync_to_async(self._start)(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            if recorder is not None:
+                await sync_to_async(self._stop)(recorder)
+            raise
+        if response.streaming:
+            return self._wrap_stream(request, response, start, recorder)
+        elapsed = time.perf_counter() - start
+        if recorder is None:
+            return self._complete(request, response, elapsed, recorder)
+        return await sync_to_async(self._complete)(request, response, elapsed, recorder)
+
+    @staticmethod
+    def _sample():
+        return QueryRecorder() if random.random() < settings.METRICS_SAMPLE_RATE else None
+
+    @staticmethod
+    def _start(recorder):
+        if recorder is not None:
+            connection.execute_wrappers.append(recorder)
+
+    @staticmethod
+    def _stop(recorder):
+        if recorder is not None and recorder in connection.execute_wrappers:
+            connection.execute_wrappers.remove(recorder)
+
+    def _complete(self, request, response, elapsed, recorder):
+        self._stop(recorder)
+        timing = [f"view;dur={elapsed * 1000:.1f}"]
+        if recorder is not None:
+            timing.append(f'db;dur={recorder.seconds * 1000:.1f};desc="{recorder.count} queries"')
+        response['Server-Timing'] = ', '.join(timing)
+        self._record(request, response, elapsed, len(response.content), recorder)
+        return response
+
+    def _wrap_stream(self, request, response, start, recorder):
+        # The body (and its queries) is produced after we return.
+        measure = self._ameasure_stream if response.is_async else self._measure_stream
+        response.streaming_content = measure(request, response, response.streaming_content, start, recorder)
+        response['Server-Timing'] = f"view;dur={(time.perf_counter() - start) * 1000:.1f}"
+        return response
+
+    def _measure_stream(self, request, response, chunks, start, recorder):
+        size = 0
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            self._stop(recorder)
+            self._record(request, response, time.perf_counter() - start, size, recorder)
+
+    async def _ameasure_stream(self, request, response, chunks, start, recorder):
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            elapsed = time.perf_counter() - start
+            if recorder is None:
+                self._record(request, response, elapsed, size, recorder)
+            else:
+                await sync_to_async(self._stop)(recorder)
+                await sync_to_async(self._record)(request, response, elapsed, size, recorder)
+
+    def _record(self, request, response, elapsed, size, recorder):
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        labels = (('route', route), ('method', request.method))
+        count_request((*labels, ('status', response.status_code)))
+        observe('expense_http_request_duration_seconds', labels, elapsed)
+        observe('expense_http_response_size_bytes', labels, size)
+        if recorder is None:
+            return
+
+        observe('expense_http_request_sql_seconds', labels, recorder.seconds)
+        observe('expense_http_request_queries', labels, recorder.count)
+        if (elapsed * 1000 < settings.METRICS_SLOW_REQUEST_MS
+                and recorder.count < settings.METRICS_SLOW_REQUEST_QUERIES):
+            return
+
+        repeated_sql, repeats = recorder.statements.most_common(1)[0] if recorder.count else ('', 0)
+        slowest_sql, slowest = (recorder.statement_seconds.most_common(1)[0]
+                                if recorder.count else ('', 0.0))
+        try:
+            SlowRequest.objects.create(
+                route=route, method=request.method, status_code=response.status_code,
+                duration_ms=elapsed * 1000, sql_ms=recorder.seconds * 1000, query_count=recorder.count,
+                response_bytes=size, slowest_sql=slowest_sql, slowest_sql_ms=slowest * 1000,
+                repeated_sql=repeated_sql, repeated_sql_count=repeats,
+            )
+        except DatabaseError as e:
+            logger.warning(f"Could not store slow request for {route}: {str(e)}")
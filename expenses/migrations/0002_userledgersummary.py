@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:25
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    # The same aggregation as ledger.expected_summaries, on this migration's schema.
+    Expense = apps.get_model('expenses', 'Expense')
+    UserLedgerSummary = apps.get_model('expenses', 'UserLedgerSummary')
+    Participant = Expense.participants.through
+    totals = defaultdict(lambda: {'total_paid': 0, 'total_participated': 0, 'expense_count': 0})
+
+    paid = Expense.objects.order_by().values('payer_id').annotate(
+        total=models.Sum('amount'), count=models.Count('id'))
+    for row in paid.iterator():
+        totals[row['payer_id']]['total_paid'] = row['total']
+        totals[row['payer_id']]['expense_count'] += row['count']
+
+    participated = Participant.objects.order_by().values('user_id').annotate(
+        total=models.Sum('expense__amount'), count=models.Count('expense_id'))
+    for row in participated.iterator():
+        totals[row['user_id']]['total_participated'] = row['total']
+        totals[row['user_id']]['expense_count'] += row['count']
+
+    self_participated = Participant.objects.filter(expense__payer_id=models.F('user_id')).order_by().values(
+        'user_id').annotate(count=models.Count('expense_id'))
+    for row in self_participated.iterator():
+        totals[row['user_id']]['expense_count'] -= row['count']
+
+    UserLedgerSummary.objects.bulk_create([
+        UserLedgerSummary(user_id=user_id, net_balance=summary['total_paid'] - summary['total_participated'],
+                          **summary)
+        for user_id, summary in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserLedgerSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger_summary', serialize=False, to='expenses.user')),
+                ('total_paid', models.FloatField(default=0)),
+                ('total_participated', models.FloatField(default=0)),
+                ('expense_count', models.IntegerField(default=0)),
+                ('net_balance', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+
+AMOUNT_FIELDS = {
+    'Expense': ['amount'],
+    'Balance': ['amount'],
+    'UserLedgerSummary': ['total_paid', 'total_participated', 'net_balance'],
+}
+
+
+def scale_amounts(apps, factor):
+    for model_name, fields in AMOUNT_FIELDS.items():
+        model = apps.get_model('expenses', model_name)
+        if factor > 1:
+            updates = {field: Round(F(field) * factor) for field in fields}
+        else:
+            updates = {field: F(field) * factor for field in fields}
+        model.objects.update(**updates)
+
+
+def to_cents(apps, schema_editor):
+    scale_amounts(apps, 100)
+
+
+def to_major_units(apps, schema_editor):
+    scale_amounts(apps, 0.01)
+
+
+class Migration(migrations.Migration):
+    # Runs while the columns are still floats; 0004 then changes their type.
+
+    dependencies = [
+        ('expenses', '0002_userledgersummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_cents, to_major_units),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_convert_amounts_to_cents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balance',
+            name='amount',
+            field=models.BigIntegerField(help_text='Amount in cents'),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=models.BigIntegerField(help_text='Amount in cents'),
+        ),
+        migrations.AlterField(
+            model_name='userledgersummary',
+            name='net_balance',
+            field=models.BigIntegerField(default=0, help_text='Amount in cents'),
+        ),
+        migrations.AlterField(
+            model_name='userledgersummary',
+            name='total_paid',
+            field=models.BigIntegerField(default=0, help_text='Amount in cents'),
+        ),
+        migrations.AlterField(
+            model_name='userledgersummary',
+            name='total_participated',
+            field=models.BigIntegerField(default=0, help_text='Amount in cents'),
+        ),
+    ]
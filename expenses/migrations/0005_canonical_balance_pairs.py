@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def to_canonical_pairs(apps, schema_editor):
+    Balance = apps.get_model('expenses', 'Balance')
+    net = defaultdict(int)
+    for from_user_id, to_user_id, amount in Balance.objects.values_list(
+            'from_user_id', 'to_user_id', 'amount').iterator(chunk_size=10000):
+        if from_user_id < to_user_id:
+            net[(from_user_id, to_user_id)] += amount
+        elif from_user_id > to_user_id:
+            net[(to_user_id, from_user_id)] -= amount
+
+    Balance.objects.all().delete()
+    Balance.objects.bulk_create(
+        [Balance(from_user_id=low, to_user_id=high, amount=amount) for (low, high), amount in net.items()],
+        batch_size=1000
+    )
+
+
+def to_directed_pairs(apps, schema_editor):
+    Balance = apps.get_model('expenses', 'Balance')
+    for balance in Balance.objects.filter(amount__lt=0).iterator(chunk_size=10000):
+        Balance.objects.filter(pk=balance.pk).update(
+            from_user_id=balance.to_user_id, to_user_id=balance.from_user_id, amount=-balance.amount)
+
+
+class Migration(migrations.Migration):
+    # Collapses both directions of every pair into one signed row before
+    # 0006 adds the unique and ordering constraints.
+
+    dependencies = [
+        ('expenses', '0004_amounts_in_cents'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_canonical_pairs, to_directed_pairs),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0005_canonical_balance_pairs'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='balance',
+            constraint=models.UniqueConstraint(fields=('from_user', 'to_user'), name='unique_balance_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='balance',
+            constraint=models.CheckConstraint(condition=models.Q(('from_user__lt', models.F('to_user'))), name='balance_pair_ordered'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # State-only: the table already exists as the auto-created M2M table.
+
+    dependencies = [
+        ('expenses', '0006_balance_pair_constraints'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ExpenseParticipant',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('expense', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='expenses.expense')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='expenses.user')),
+                    ],
+                    options={
+                        'db_table': 'expenses_expense_participants',
+                        'unique_together': {('expense', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='expense',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='shared_expenses', through='expenses.ExpenseParticipant', to='expenses.user'),
+                ),
+            ],
+        ),
+    ]
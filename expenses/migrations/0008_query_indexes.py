@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_expenseparticipant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balance',
+            name='from_user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='balance_from', to='expenses.user'),
+        ),
+        migrations.AlterField(
+            model_name='balance',
+            name='to_user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='balance_to', to='expenses.user'),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='payer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='expenses_paid', to='expenses.user'),
+        ),
+        migrations.AlterField(
+            model_name='expenseparticipant',
+            name='expense',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='expenses.expense'),
+        ),
+        migrations.AlterField(
+            model_name='expenseparticipant',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='expenses.user'),
+        ),
+        migrations.AddIndex(
+            model_name='balance',
+            index=models.Index(fields=['to_user', 'from_user'], name='balance_to_from_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['payer', 'created_at'], name='expense_payer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['created_at'], name='expense_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenseparticipant',
+            index=models.Index(fields=['user', 'expense'], name='participant_user_expense_idx'),
+        ),
+    ]
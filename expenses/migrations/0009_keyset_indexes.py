@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expense_payer_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expense_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['payer', 'created_at', 'id'], name='expense_payer_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['created_at', 'id'], name='expense_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Group',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GroupMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='balance',
+            name='unique_balance_pair',
+        ),
+        migrations.AddField(
+            model_name='balance',
+            name='group',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='expenses.group'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='group',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='expenses', to='expenses.group'),
+        ),
+        migrations.AddIndex(
+            model_name='balance',
+            index=models.Index(fields=['group', 'to_user', 'from_user'], name='balance_group_to_from_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['group', 'created_at', 'id'], name='expense_group_created_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='balance',
+            constraint=models.UniqueConstraint(condition=models.Q(('group__isnull', True)), fields=('from_user', 'to_user'), name='unique_balance_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='balance',
+            constraint=models.UniqueConstraint(condition=models.Q(('group__isnull', False)), fields=('group', 'from_user', 'to_user'), name='unique_group_balance_pair'),
+        ),
+        migrations.AddField(
+            model_name='groupmembership',
+            name='group',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='expenses.group'),
+        ),
+        migrations.AddField(
+            model_name='groupmembership',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='group_memberships', to='expenses.user'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='members',
+            field=models.ManyToManyField(related_name='expense_groups', through='expenses.GroupMembership', to='expenses.user'),
+        ),
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(fields=['user', 'group'], name='membership_user_group_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='groupmembership',
+            unique_together={('group', 'user')},
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_groups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(unique=True)),
+                ('as_of', models.DateTimeField(db_index=True)),
+                ('taken_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BalanceEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.BigIntegerField(help_text='Signed change in cents')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expense', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='balance_events', to='expenses.expense')),
+                ('from_user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.user')),
+                ('group', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='expenses.group')),
+                ('to_user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.user')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['from_user', 'to_user', 'id'], name='event_from_to_id_idx'), models.Index(fields=['to_user', 'id'], name='event_to_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshotRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.BigIntegerField(help_text='Amount in cents')),
+                ('from_user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.user')),
+                ('group', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='expenses.group')),
+                ('snapshot', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='expenses.balancesnapshot')),
+                ('to_user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.user')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['snapshot', 'from_user', 'to_user'], name='snapshot_row_from_to_idx'), models.Index(fields=['snapshot', 'to_user'], name='snapshot_row_to_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def open_event_log(apps, schema_editor):
+    Balance = apps.get_model('expenses', 'Balance')
+    BalanceEvent = apps.get_model('expenses', 'BalanceEvent')
+    opened_at = timezone.now()
+    events = []
+    for group_id, from_user_id, to_user_id, amount in Balance.objects.exclude(amount=0).values_list(
+            'group_id', 'from_user_id', 'to_user_id', 'amount').iterator(chunk_size=10000):
+        events.append(BalanceEvent(group_id=group_id, from_user_id=from_user_id, to_user_id=to_user_id,
+                                   amount=amount, created_at=opened_at))
+        if len(events) >= 10000:
+            BalanceEvent.objects.bulk_create(events)
+            events = []
+    BalanceEvent.objects.bulk_create(events)
+
+
+class Migration(migrations.Migration):
+    # Balances that predate the event log get one opening event each, so a
+    # replay of the log reproduces the Balance table from here on.
+
+    dependencies = [
+        ('expenses', '0011_balance_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(open_event_log, migrations.RunPython.noop),
+    ]
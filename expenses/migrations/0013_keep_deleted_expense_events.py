@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_seed_balance_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balanceevent',
+            name='expense',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='balance_events', to='expenses.expense'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0014_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route', models.CharField(max_length=255)),
+                ('method', models.CharField(max_length=10)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('sql_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField()),
+                ('response_bytes', models.BigIntegerField()),
+                ('slowest_sql', models.TextField(blank=True)),
+                ('slowest_sql_ms', models.FloatField(default=0)),
+                ('repeated_sql', models.TextField(blank=True, help_text='The statement run most often, usually an N+1')),
+                ('repeated_sql_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0016_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUserRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('split_method', models.CharField(max_length=20)),
+                ('paid', models.BigIntegerField(default=0, help_text='Amount in cents')),
+                ('share', models.BigIntegerField(default=0, help_text='Amount in cents')),
+                ('lent', models.BigIntegerField(default=0, help_text='Amount in cents')),
+                ('borrowed', models.BigIntegerField(default=0, help_text='Amount in cents')),
+                ('expense_count', models.IntegerField(default=0)),
+                ('counterparty', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.user')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='expenses.user')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('counterparty__isnull', True)), fields=('user', 'day', 'split_method'), name='unique_user_rollup'), models.UniqueConstraint(condition=models.Q(('counterparty__isnull', False)), fields=('user', 'day', 'split_method', 'counterparty'), name='unique_counterparty_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0017_daily_user_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Settlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.BigIntegerField(help_text='Amount in cents')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('group', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='settlements', to='expenses.group')),
+                ('payee', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='settlements_received', to='expenses.user')),
+                ('payer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='settlements_paid', to='expenses.user')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='balanceevent',
+            name='settlement',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='balance_events', to='expenses.settlement'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['payer', 'created_at'], name='settlement_payer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['payee', 'created_at'], name='settlement_payee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['group', 'created_at'], name='settlement_group_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='settlement',
+            constraint=models.CheckConstraint(condition=models.Q(('amount__gt', 0)), name='settlement_amount_positive'),
+        ),
+        migrations.AddConstraint(
+            model_name='settlement',
+            constraint=models.CheckConstraint(condition=models.Q(('payer', models.F('payee')), _negated=True), name='settlement_distinct_users'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0018_settlements'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='balance',
+            index=models.Index(fields=['from_user', 'to_user'], name='balance_from_to_idx'),
+        ),
+    ]
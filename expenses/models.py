@@ -1,23 +1,223 @@
 from django.db import models
+from django.db.models.functions import Abs, Coalesce
 import logging
 from django.db import transaction  
+from django.utils import timezone
+from .money import from_cents
+from .splits import compute_shares, compute_deltas
+
+class UserQuerySet(models.QuerySet):
+    def with_expense_totals(self):
+        return self.annotate(
+            total_paid=Coalesce(models.F('ledger_summary__total_paid'), models.Value(0)),
+            total_participated=Coalesce(models.F('ledger_summary__total_participated'), models.Value(0)),
+        )
+
 
 class User(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     mobile = models.CharField(max_length=15, unique=True)
 
+    objects = UserQuerySet.as_manager()
+
     def __str__(self):
         return self.name 
     
+class Group(models.Model):
+    """An independent ledger, e.g. one trip or household."""
+    name = models.CharField(max_length=100)
+    members = models.ManyToManyField(User, related_name="expense_groups", through='GroupMembership')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class GroupMembership(models.Model):
+    group = models.ForeignKey(Group, related_name="memberships", on_delete=models.CASCADE, db_index=False)
+    user = models.ForeignKey(User, related_name="group_memberships", on_delete=models.CASCADE, db_index=False)
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [('group', 'user')]
+        indexes = [
+            models.Index(fields=['user', 'group'], name='membership_user_group_idx'),
+        ]
+
+
+class BalanceQuerySet(models.QuerySet):
+    def in_group(self, group_id):
+        """Rows of one group's ledger, or of the ungrouped ledger for None."""
+        return self.filter(group__isnull=True) if group_id is None else self.filter(group_id=group_id)
+
+    def net_pairs(self):
+        """Sum rows per user pair across ledgers, as dicts with debtor and creditor.
+
+        Each dict carries debtor_id, creditor_id, debtor_name, creditor_name and
+        the non-negative amount owed; pairs that net to zero are dropped.
+        """
+        from_debtor = models.Q(net__gt=0)
+        return self.order_by().values(
+            'from_user_id', 'to_user_id', 'from_user__name', 'to_user__name'
+        ).annotate(net=models.Sum('amount')).exclude(net=0).annotate(
+            debtor_id=models.Case(models.When(from_debtor, then=models.F('from_user_id')),
+                                  default=models.F('to_user_id')),
+            creditor_id=models.Case(models.When(from_debtor, then=models.F('to_user_id')),
+                                    default=models.F('from_user_id')),
+            debtor_name=models.Case(models.When(from_debtor, then=models.F('from_user__name')),
+                                    default=models.F('to_user__name')),
+            creditor_name=models.Case(models.When(from_debtor, then=models.F('to_user__name')),
+                                      default=models.F('from_user__name')),
+            owed=Abs('net'),
+        )
+
+    def owed_by(self, user_id):
+        return self.filter(models.Q(from_user_id=user_id) | models.Q(to_user_id=user_id)).net_pairs().filter(
+            debtor_id=user_id).order_by('creditor_id')
+
+
 class Balance(models.Model):
-    from_user = models.ForeignKey(User, related_name="balance_from", on_delete=models.CASCADE)
-    to_user = models.ForeignKey(User, related_name="balance_to", on_delete=models.CASCADE)
-    amount = models.FloatField()
+    """One row per user pair and group, stored with from_user_id < to_user_id.
+
+    A positive amount means from_user owes to_user, a negative one the reverse.
+    Expenses outside any group share the rows whose group is null.
+    """
+    # All FKs are served by the composite indexes below.
+    group = models.ForeignKey(Group, null=True, blank=True, related_name="balances", on_delete=models.CASCADE,
+                              db_index=False)
+    from_user = models.ForeignKey(User, related_name="balance_from", on_delete=models.CASCADE, db_index=False)
+    to_user = models.ForeignKey(User, related_name="balance_to", on_delete=models.CASCADE, db_index=False)
+    amount = models.BigIntegerField(help_text="Amount in cents")
+
+    objects = BalanceQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['from_user', 'to_user'], condition=models.Q(group__isnull=True),
+                                    name='unique_balance_pair'),
+            # Also the group-leading index every group-scoped balance read uses.
+            models.UniqueConstraint(fields=['group', 'from_user', 'to_user'],
+                                    condition=models.Q(group__isnull=False), name='unique_group_balance_pair'),
+            models.CheckConstraint(condition=models.Q(from_user__lt=models.F('to_user')), name='balance_pair_ordered'),
+        ]
+        indexes = [
+            # owed_by() seeks both user columns across every ledger, so each needs a
+            # non-partial index; net_positions() also reads from the to_user side.
+            models.Index(fields=['from_user', 'to_user'], name='balance_from_to_idx'),
+            models.Index(fields=['to_user', 'from_user'], name='balance_to_from_idx'),
+            models.Index(fields=['group', 'to_user', 'from_user'], name='balance_group_to_from_idx'),
+        ]
+
+    def directed(self):
+        """Return (debtor, creditor, amount) with a non-negative amount."""
+        if self.amount >= 0:
+            return self.from_user, self.to_user, self.amount
+        return self.to_user, self.from_user, -self.amount
 
     def __str__(self):
-        return f"{self.from_user.name} owes {self.to_user.name} {self.amount}" 
+        debtor, creditor, amount = self.directed()
+        return f"{debtor.name} owes {creditor.name} {from_cents(amount)}" 
     
+
+class BalanceEvent(models.Model):
+    """Append-only record of one change to a canonical Balance pair.
+
+    Summing a pair's events reproduces its Balance row; rows are only ever
+    inserted, in the same transaction as the balance change they describe.
+    """
+    group = models.ForeignKey(Group, null=True, blank=True, on_delete=models.CASCADE, db_index=False)
+    from_user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE, db_index=False)
+    to_user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE, db_index=False)
+    amount = models.BigIntegerField(help_text="Signed change in cents")
+    # No constraint, so events keep pointing at an expense after it is deleted.
+    expense = models.ForeignKey('Expense', null=True, blank=True, related_name="balance_events",
+                                on_delete=models.DO_NOTHING, db_constraint=False)
+    settlement = models.ForeignKey('Settlement', null=True, blank=True, related_name="balance_events",
+                                   on_delete=models.DO_NOTHING, db_constraint=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Replay streams events after a snapshot's watermark, for everyone,
+            # for one user from either side, or for one pair.
+            models.Index(fields=['from_user', 'to_user', 'id'], name='event_from_to_id_idx'),
+            models.Index(fields=['to_user', 'id'], name='event_to_id_idx'),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    """Compacted balances after every event up to last_event_id.
+
+    as_of is the newest created_at among those events, so the snapshot can
+    seed a replay to any moment at or after it.
+    """
+    last_event_id = models.BigIntegerField(unique=True)
+    as_of = models.DateTimeField(db_index=True)
+    taken_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Snapshot through event {self.last_event_id} ({self.as_of:%Y-%m-%d %H:%M})"
+
+
+class BalanceSnapshotRow(models.Model):
+    snapshot = models.ForeignKey(BalanceSnapshot, related_name="rows", on_delete=models.CASCADE, db_index=False)
+    group = models.ForeignKey(Group, null=True, blank=True, on_delete=models.CASCADE, db_index=False)
+    from_user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE, db_index=False)
+    to_user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE, db_index=False)
+    amount = models.BigIntegerField(help_text="Amount in cents")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['snapshot', 'from_user', 'to_user'], name='snapshot_row_from_to_idx'),
+            models.Index(fields=['snapshot', 'to_user'], name='snapshot_row_to_idx'),
+        ]
+
+
+class UserLedgerSummary(models.Model):
+    user = models.OneToOneField(User, primary_key=True, related_name="ledger_summary", on_delete=models.CASCADE)
+    total_paid = models.BigIntegerField(default=0, help_text="Amount in cents")
+    total_participated = models.BigIntegerField(default=0, help_text="Amount in cents")
+    expense_count = models.IntegerField(default=0)
+    net_balance = models.BigIntegerField(default=0, help_text="Amount in cents")
+
+    def __str__(self):
+        return f"{self.user_id}: paid {from_cents(self.total_paid)}, participated {from_cents(self.total_participated)}"
+
+
+class DailyUserRollup(models.Model):
+    """One user's expense activity for one day and split method.
+
+    The row with no counterparty holds the user's own totals; rows with a
+    counterparty hold what the two lent each other on expenses one of them
+    paid. Maintained on expense writes by expenses.rollups.
+    """
+    # All FKs are served by the composite unique indexes below.
+    user = models.ForeignKey(User, related_name="daily_rollups", on_delete=models.CASCADE, db_index=False)
+    day = models.DateField()
+    split_method = models.CharField(max_length=20)
+    counterparty = models.ForeignKey(User, null=True, blank=True, related_name="+", on_delete=models.CASCADE,
+                                     db_index=False)
+    paid = models.BigIntegerField(default=0, help_text="Amount in cents")
+    share = models.BigIntegerField(default=0, help_text="Amount in cents")
+    lent = models.BigIntegerField(default=0, help_text="Amount in cents")
+    borrowed = models.BigIntegerField(default=0, help_text="Amount in cents")
+    expense_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Statements read one user's days in order from these indexes.
+            models.UniqueConstraint(fields=['user', 'day', 'split_method'],
+                                    condition=models.Q(counterparty__isnull=True), name='unique_user_rollup'),
+            models.UniqueConstraint(fields=['user', 'day', 'split_method', 'counterparty'],
+                                    condition=models.Q(counterparty__isnull=False),
+                                    name='unique_counterparty_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.day} ({self.split_method}): paid {from_cents(self.paid)}"
+
+
 logger = logging.getLogger(__name__)
 
 class Expense(models.Model):
@@ -27,93 +227,170 @@ class Expense(models.Model):
         ('percentage', 'Percentage'),
     ]
 
-    payer = models.ForeignKey(User, related_name="expenses_paid", on_delete=models.CASCADE)
-    participants = models.ManyToManyField(User, related_name="shared_expenses")
-    amount = models.FloatField()
+    payer = models.ForeignKey(User, related_name="expenses_paid", on_delete=models.CASCADE, db_index=False)
+    group = models.ForeignKey(Group, null=True, blank=True, related_name="expenses", on_delete=models.CASCADE,
+                              db_index=False)
+    participants = models.ManyToManyField(User, related_name="shared_expenses", through='ExpenseParticipant')
+    amount = models.BigIntegerField(help_text="Amount in cents")
     split_method = models.CharField(max_length=20, choices=SPLIT_METHODS)
     exact_splits = models.JSONField(null=True, blank=True)
     percentage_splits = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination walks (created_at, id), optionally within one payer.
+            models.Index(fields=['payer', 'created_at', 'id'], name='expense_payer_created_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='expense_created_id_idx'),
+            models.Index(fields=['group', 'created_at', 'id'], name='expense_group_created_id_idx'),
+        ]
+
     def split_expense(self):
+        from .balances import apply_balance_deltas
+
         logger.info(f"Starting to split expense {self.id}")
         try:
-            if self.split_method == 'equal':
-                participant_count = self.participants.count()
-                if participant_count == 0:
-                    raise ValueError("No participants found for the expense")
-                
-                per_person = self.amount / participant_count
-                logger.info(f"Equal split: {per_person} per person among {participant_count} participants")
-                
-                for participant in self.participants.all():
-                    self.update_balance(participant, per_person)
-
-            elif self.split_method == 'exact':
-                if not self.exact_splits:
-                    raise ValueError("Exact splits data is required")
-                
-                for participant_id, exact_amount in self.exact_splits.items():
-                    try:
-                        participant = User.objects.get(id=participant_id)
-                        self.update_balance(participant, float(exact_amount))
-                    except User.DoesNotExist:
-                        raise ValueError(f"User with ID {participant_id} not found")
-
-            elif self.split_method == 'percentage':
-                if not self.percentage_splits:
-                    raise ValueError("Percentage splits data is required")
-                
-                for participant_id, percentage in self.percentage_splits.items():
-                    try:
-                        participant = User.objects.get(id=participant_id)
-                        owed_amount = (self.amount * float(percentage) / 100)
-                        self.update_balance(participant, owed_amount)
-                    except User.DoesNotExist:
-                        raise ValueError(f"User with ID {participant_id} not found")
-
+            _, deltas = self.split_preview()
+            with transaction.atomic():
+                apply_balance_deltas(deltas, group_id=self.group_id, expense_id=self.id)
+            logger.info(f"Expense {self.id} split into {len(deltas)} balance deltas")
+            return deltas
         except Exception as e:
             logger.error(f"Error in split_expense: {str(e)}")
             raise
 
-    def update_balance(self, participant, amount):
-        logger.info(f"Updating balance: {participant.id} owes {amount} to {self.payer.id}")
-        
-        if participant == self.payer:
-            logger.info("Skipping balance update for payer")
-            return
+    def split_preview(self):
+        """Return (shares, deltas) for this expense without writing anything."""
+        shares = self.compute_shares()
+        return shares, compute_deltas(self.payer_id, shares)
 
-        try:
-            with transaction.atomic():
-                balance, created = Balance.objects.get_or_create(
-                    from_user=participant,
-                    to_user=self.payer,
-                    defaults={'amount': amount}
-                )
-
-                if not created:
-                    balance.amount += amount
-                    balance.save()
-
-                logger.info(f"Balance updated successfully: {balance.amount}")
-
-                reverse_balance, created = Balance.objects.get_or_create(
-                    from_user=self.payer,
-                    to_user=participant,
-                    defaults={'amount': 0}
-                )
-
-                if reverse_balance.amount > 0:
-                    if reverse_balance.amount >= amount:
-                        reverse_balance.amount -= amount
-                        reverse_balance.save()
-                    else:
-                        amount -= reverse_balance.amount
-                        reverse_balance.amount = 0
-                        reverse_balance.save()
-                        balance.amount = amount
-                        balance.save()
+    def compute_shares(self):
+        if self.split_method == 'equal':
+            participant_ids = list(self.participants.values_list('id', flat=True))
+        else:
+            splits = self.exact_splits if self.split_method == 'exact' else self.percentage_splits
+            participant_ids = [int(participant_id) for participant_id in (splits or {})]
+            found_ids = set(User.objects.filter(id__in=participant_ids).values_list('id', flat=True))
+            for participant_id in participant_ids:
+                if participant_id not in found_ids:
+                    raise ValueError(f"User with ID {participant_id} not found")
 
-        except Exception as e:
-            logger.error(f"Error in update_balance: {str(e)}")
-            raise
+        return compute_shares(
+            self.split_method, self.amount, participant_ids,
+            self.exact_splits, self.percentage_splits
+        )
+
+
+class ExpenseParticipant(models.Model):
+    # Explicit through model for Expense.participants, kept on the table the
+    # auto-created one used so it can carry its own indexes.
+    expense = models.ForeignKey(Expense, on_delete=models.CASCADE, db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        db_table = 'expenses_expense_participants'
+        unique_together = [('expense', 'user')]
+        indexes = [
+            # Covers participants=user lookups without touching the table.
+            models.Index(fields=['user', 'expense'], name='participant_user_expense_idx'),
+        ]
+
+
+class Settlement(models.Model):
+    """A repayment: payer handed payee amount, outside any expense.
+
+    Settlements only move Balance pairs; expense totals, ledger summaries
+    and rollups never see them.
+    """
+    payer = models.ForeignKey(User, related_name="settlements_paid", on_delete=models.CASCADE, db_index=False)
+    payee = models.ForeignKey(User, related_name="settlements_received", on_delete=models.CASCADE,
+                              db_index=False)
+    group = models.ForeignKey(Group, null=True, blank=True, related_name="settlements", on_delete=models.CASCADE,
+                              db_index=False)
+    amount = models.BigIntegerField(help_text="Amount in cents")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['payer', 'created_at'], name='settlement_payer_created_idx'),
+            models.Index(fields=['payee', 'created_at'], name='settlement_payee_created_idx'),
+            models.Index(fields=['group', 'created_at'], name='settlement_group_created_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(amount__gt=0), name='settlement_amount_positive'),
+            models.CheckConstraint(condition=~models.Q(payer=models.F('payee')), name='settlement_distinct_users'),
+        ]
+
+    def __str__(self):
+        return f"{self.payer_id} paid {self.payee_id} {from_cents(self.amount)}"
+
+
+class IdempotencyKey(models.Model):
+    """The response a client-supplied Idempotency-Key produced, replayed on retries."""
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of the method, path and body")
+    status_code = models.PositiveSmallIntegerField()
+    response_body = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class SlowRequest(models.Model):
+    """A sampled request over the slow thresholds, kept for the slow_queries report."""
+    route = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    sql_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    response_bytes = models.BigIntegerField()
+    slowest_sql = models.TextField(blank=True)
+    slowest_sql_ms = models.FloatField(default=0)
+    repeated_sql = models.TextField(blank=True, help_text="The statement run most often, usually an N+1")
+    repeated_sql_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.method} {self.route} ({self.duration_ms:.0f} ms, {self.query_count} queries)"
+
+
+class ReportJob(models.Model):
+    """A report or recompute run by `manage.py run_workers` instead of a web worker."""
+    BALANCE_SHEET = 'balance_sheet'
+    USER_STATEMENT = 'user_statement'
+    LEDGER_RECOMPUTE = 'ledger_recompute'
+    KINDS = [
+        (BALANCE_SHEET, 'Balance sheet'),
+        (USER_STATEMENT, 'User statement'),
+        (LEDGER_RECOMPUTE, 'Ledger recompute'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=32, choices=KINDS)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    result_path = models.CharField(max_length=500, blank=True)
+    result = models.JSONField(null=True, blank=True, help_text="Summary for jobs without a file, e.g. drift counts")
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while it runs the job; a stale one means the worker is gone.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest pending job.
+            models.Index(fields=['status', 'id'], name='reportjob_status_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
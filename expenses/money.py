@@ -0,0 +1,19 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value):
+    """Convert a major-unit amount (int, str, float or Decimal) to integer cents.
+
+    Raises InvalidOperation for anything that is not a finite number.
+    """
+    amount = Decimal(str(value))
+    if not amount.is_finite():
+        raise InvalidOperation(f"{value!r} is not a finite amount")
+    return int(amount.quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents):
+    """Convert integer cents back to a two-place Decimal in major units."""
+    return (Decimal(cents) / 100).quantize(CENT)
@@ -0,0 +1,86 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class UserSummaryPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+
+class ExpenseKeysetPagination(BasePagination):
+    """Newest-first keyset pagination on (created_at, id).
+
+    Each page is one indexed range scan of page_size + 1 rows, however deep the
+    client has paged. Only a next link is offered.
+    """
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+
+    def __init__(self, cursor_query_param=None):
+        if cursor_query_param:
+            self.cursor_query_param = cursor_query_param
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, expense_id = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            expense_id = int(expense_id)
+        except (TypeError, ValueError):
+            created_at = None
+        if created_at is None:
+            raise NotFound("Invalid cursor")
+        return created_at, expense_id
+
+    def encode_cursor(self, expense):
+        return urlsafe_b64encode(f"{expense.created_at.isoformat()}|{expense.id}".encode()).decode()
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if cursor:
+            created_at, expense_id = cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=expense_id))
+        return queryset.order_by('-created_at', '-id')[:self.current_page_size + 1]
+
+    def trim_page(self, page):
+        page_size = self.current_page_size
+        self.next_cursor = self.encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+        return page[:page_size]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.trim_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.trim_page([expense async for expense in self.page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_page(self, data):
+        return {"next": self.get_next_link(), "results": data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_page(data))
@@ -0,0 +1,256 @@
+import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.db import connections, models, transaction
+from django.db.models.functions import Coalesce
+
+from .balances import apply_balance_deltas
+from .cache import invalidate_ledger_on_commit
+from .models import Expense, ExpenseParticipant, Balance, Settlement
+from .splits import compute_shares, compute_deltas
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 100000
+# Ungrouped balances are keyed by ledger 0 here; group ids start at 1.
+UNGROUPED = 0
+
+
+def expense_id_ranges(chunk_size=CHUNK_SIZE):
+    """Split the expense id space into half-open [start, end) ranges."""
+    bounds = Expense.objects.aggregate(low=models.Min('id'), high=models.Max('id'))
+    if bounds['low'] is None:
+        return []
+    return [(start, start + chunk_size) for start in range(bounds['low'], bounds['high'] + 1, chunk_size)]
+
+
+def _add_deltas(totals, ledger, deltas):
+    for debtor_id, creditor_id, amount in deltas:
+        if debtor_id < creditor_id:
+            totals[(ledger, debtor_id, creditor_id)] += amount
+        else:
+            totals[(ledger, creditor_id, debtor_id)] -= amount
+
+
+def _other_splits(expenses, totals, errors):
+    for expense_id, ledger, payer_id, amount, split_method, exact_splits, percentage_splits in expenses:
+        try:
+            shares = compute_shares(split_method, amount, [], exact_splits, percentage_splits)
+        except (ValueError, ArithmeticError) as e:
+            errors.append((expense_id, str(e)))
+            continue
+        _add_deltas(totals, ledger, compute_deltas(payer_id, shares))
+
+
+def _equal_splits_python(expenses, participants, totals, errors):
+    by_expense = defaultdict(list)
+    for expense_id, user_id in participants:
+        by_expense[expense_id].append(user_id)
+    for expense_id, ledger, payer_id, amount in expenses:
+        try:
+            shares = compute_shares('equal', amount, by_expense[expense_id])
+        except ValueError as e:
+            errors.append((expense_id, str(e)))
+            continue
+        _add_deltas(totals, ledger, compute_deltas(payer_id, shares))
+
+
+def _equal_splits_numpy(expenses, participants, totals, errors):
+    """Vectorised equal split matching splits.compute_shares('equal', ...) to the cent."""
+    if not expenses:
+        return
+    expense_ids, ledgers, payers, amounts = np.array(expenses, dtype=np.int64).T
+    rows = np.array(participants, dtype=np.int64).reshape(-1, 2)
+    rows = rows[np.isin(rows[:, 0], expense_ids)]
+    index = np.searchsorted(expense_ids, rows[:, 0])
+    users = rows[:, 1]
+
+    counts = np.bincount(index, minlength=len(expense_ids))
+    for expense_id in expense_ids[counts == 0]:
+        errors.append((int(expense_id), "No participants found for the expense"))
+    if not len(users):
+        return
+
+    # Rows arrive ordered by (expense, user), so a row's rank within its
+    # expense decides whether it gets one of the leftover cents.
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(len(users)) - starts[index]
+    share, remainder = np.divmod(amounts[index], counts[index])
+    cents = share + (rank < remainder)
+
+    payer = payers[index]
+    owing = (users != payer) & (cents != 0)
+    users, payer, cents, ledger = users[owing], payer[owing], cents[owing], ledgers[index][owing]
+    low, high = np.minimum(users, payer), np.maximum(users, payer)
+    signed = np.where(users < payer, cents, -cents)
+    if not len(signed):
+        return
+
+    # Pack (ledger, low, high) into one int64 so grouping is a 1-D sort.
+    base = int(high.max()) + 1
+    if (int(ledger.max()) + 1) * base * base >= 2 ** 63:
+        keys, inverse = np.unique(np.stack([ledger, low, high], axis=1), axis=0, return_inverse=True)
+        sums = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(sums, inverse.ravel(), signed)
+    else:
+        codes = (ledger * base + low) * base + high
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+        sums = np.add.reduceat(signed[order], starts)
+        codes = codes[starts]
+        keys = np.stack([codes // (base * base), codes // base % base, codes % base], axis=1)
+    for (ledger, low_id, high_id), amount in zip(keys.tolist(), sums.tolist()):
+        totals[(ledger, low_id, high_id)] += amount
+
+
+def chunk_balances(bounds, vectorised=True):
+    """Return ({(ledger, low_id, high_id): cents}, errors) for expenses with ids in [start, end)."""
+    start, end = bounds
+    in_range = Expense.objects.filter(id__gte=start, id__lt=end).order_by('id')
+    ledger = Coalesce('group_id', models.Value(UNGROUPED))
+    totals = defaultdict(int)
+    errors = []
+
+    equal = list(in_range.filter(split_method='equal').values_list('id', ledger, 'payer_id', 'amount'))
+    participants = list(ExpenseParticipant.objects.filter(
+        expense_id__gte=start, expense_id__lt=end).order_by('expense_id', 'user_id').values_list(
+        'expense_id', 'user_id').iterator(chunk_size=CHUNK_SIZE))
+    if vectorised and np is not None:
+        _equal_splits_numpy(equal, participants, totals, errors)
+    else:
+        _equal_splits_python(equal, participants, totals, errors)
+
+    _other_splits(in_range.exclude(split_method='equal').values_list(
+        'id', ledger, 'payer_id', 'amount', 'split_method', 'exact_splits', 'percentage_splits'
+    ).iterator(chunk_size=CHUNK_SIZE), totals, errors)
+    return dict(totals), errors
+
+
+def settlement_balances():
+    """Return {(ledger, low_id, high_id): cents} moved by settlements, summed per pair in the database."""
+    totals = defaultdict(int)
+    repaid = Settlement.objects.values_list(
+        Coalesce('group_id', models.Value(UNGROUPED)), 'payer_id', 'payee_id').annotate(
+        total=models.Sum('amount')).order_by()
+    for ledger, payer_id, payee_id, total in repaid.iterator(chunk_size=CHUNK_SIZE):
+        _add_deltas(totals, ledger, [(payee_id, payer_id, total)])
+    return totals
+
+
+def expected_balances(workers=1, chunk_size=CHUNK_SIZE, vectorised=True):
+    """Recompute every ledger's balances from the expense and settlement history.
+
+    Returns ({(ledger, low_id, high_id): cents}, errors) where errors lists
+    (expense_id, message) for expenses that cannot be split. Chunks run in a
+    process pool when workers > 1.
+    """
+    ranges = expense_id_ranges(chunk_size)
+    expected = defaultdict(int)
+    errors = []
+
+    def merge(results):
+        for totals, chunk_errors in results:
+            for key, amount in totals.items():
+                expected[key] += amount
+            errors.extend(chunk_errors)
+
+    if workers > 1 and len(ranges) > 1:
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('fork')) as pool:
+            merge(pool.map(chunk_balances, ranges, [vectorised] * len(ranges)))
+    else:
+        merge(chunk_balances(bounds, vectorised) for bounds in ranges)
+    merge([(settlement_balances(), [])])
+
+    return {key: amount for key, amount in expected.items() if amount}, errors
+
+
+def balance_drift(expected):
+    """Return [(ledger, low_id, high_id, stored, expected)] for every pair that disagrees."""
+    drift = []
+    missing = dict(expected)
+    stored_rows = Balance.objects.values_list(
+        Coalesce('group_id', models.Value(UNGROUPED)), 'from_user_id', 'to_user_id', 'amount')
+    for ledger, low_id, high_id, amount in stored_rows.iterator(chunk_size=CHUNK_SIZE):
+        wanted = missing.pop((ledger, low_id, high_id), 0)
+        if amount != wanted:
+            drift.append((ledger, low_id, high_id, amount, wanted))
+    drift.extend((*key, 0, amount) for key, amount in missing.items())
+    return sorted(drift)
+
+
+def pair_balance(ledger, low_id, high_id):
+    """Recompute one pair's cents from the expenses and settlements between the two users."""
+    group_id = None if ledger == UNGROUPED else ledger
+    pair = (low_id, high_id)
+    expenses = list(Expense.objects.filter(group_id=group_id, payer_id__in=pair, participants__in=pair).distinct(
+        ).values_list('id', 'payer_id', 'amount', 'split_method', 'exact_splits', 'percentage_splits'))
+    participants = defaultdict(list)
+    for expense_id, user_id in ExpenseParticipant.objects.filter(
+            expense_id__in=[row[0] for row in expenses]).values_list('expense_id', 'user_id'):
+        participants[expense_id].append(user_id)
+
+    totals = defaultdict(int)
+    for expense_id, payer_id, amount, split_method, exact_splits, percentage_splits in expenses:
+        try:
+            shares = compute_shares(split_method, amount, participants[expense_id], exact_splits, percentage_splits)
+        except (ValueError, ArithmeticError):
+            # Reported by expected_balances; skipped the same way here.
+            continue
+        _add_deltas(totals, ledger, compute_deltas(payer_id, shares))
+    for payer_id, payee_id, amount in Settlement.objects.filter(
+            group_id=group_id, payer_id__in=pair, payee_id__in=pair).values_list('payer_id', 'payee_id', 'amount'):
+        _add_deltas(totals, ledger, [(payee_id, payer_id, amount)])
+    return totals[(ledger, low_id, high_id)]
+
+
+def _confirm_drift(drift):
+    confirmed = []
+    for ledger, low_id, high_id, _, _ in drift:
+        stored = Balance.objects.in_group(None if ledger == UNGROUPED else ledger).select_for_update().filter(
+            from_user_id=low_id, to_user_id=high_id).values_list('amount', flat=True).first() or 0
+        wanted = pair_balance(ledger, low_id, high_id)
+        if stored != wanted:
+            confirmed.append((ledger, low_id, high_id, stored, wanted))
+    return confirmed
+
+
+def confirm_drift(drift):
+    """Re-check drifted pairs against the current history and return the ones that still disagree.
+
+    expected_balances and balance_drift read at different moments, so a pair
+    that an expense or settlement changed in between looks drifted without
+    being so. Each pair is recomputed from its own history inside one
+    transaction, which on SQLite's IMMEDIATE mode holds the write lock.
+    """
+    with transaction.atomic():
+        return _confirm_drift(drift)
+
+
+def correct_drift(drift):
+    """Bring drifted pairs to their expected amounts and return the pairs corrected.
+
+    Every pair is re-checked with _confirm_drift in the correcting transaction,
+    so a write that landed during the recompute is never reversed. Corrections
+    go through the normal upsert path, so they are logged as balance events
+    and the event log still replays to the Balance table.
+    """
+    with transaction.atomic():
+        drift = _confirm_drift(drift)
+        corrections = defaultdict(list)
+        for ledger, low_id, high_id, stored, wanted in drift:
+            corrections[None if ledger == UNGROUPED else ledger].append((low_id, high_id, wanted - stored))
+        for group_id, deltas in corrections.items():
+            apply_balance_deltas(deltas, group_id=group_id)
+        invalidate_ledger_on_commit(
+            {user_id for _, low_id, high_id, _, _ in drift for user_id in (low_id, high_id)}, corrections)
+    return drift
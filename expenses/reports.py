@@ -0,0 +1,151 @@
+import csv
+import io
+import zlib
+from itertools import groupby
+
+from django.db import models
+
+from .ledger import group_expense_totals
+from .models import User, Expense, Balance
+from .money import from_cents
+from .splits import compute_shares
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+
+def _grouped(balances, key):
+    return groupby(balances.iterator(chunk_size=CHUNK_SIZE), key=lambda pair: pair[key])
+
+
+def _next_group(groups):
+    return next(groups, (None, ()))
+
+
+def _user_totals(group_id):
+    """Yield (user, total_paid, total_participated) in user id order."""
+    if group_id is None:
+        users = User.objects.only('id', 'name').with_expense_totals().order_by('id')
+        for user in users.iterator(chunk_size=CHUNK_SIZE):
+            yield user, user.total_paid, user.total_participated
+        return
+
+    totals = group_expense_totals(group_id)
+    members = User.objects.filter(group_memberships__group_id=group_id).only('id', 'name').order_by('id')
+    for user in members.iterator(chunk_size=CHUNK_SIZE):
+        yield user, *totals[user.id]
+
+
+def balance_sheet_rows(group_id=None):
+    """Yield balance sheet rows walking users and balances in user id order.
+
+    Users and both sides of the Balance table are read through three ordered
+    server-side cursors and merged, so memory only holds one user's balances.
+    Without a group every ledger is included and a pair's groups are netted;
+    with one only that group's members, balances and expenses are read.
+    """
+    yield [
+        'User',
+        'Owes To',
+        'Amount',
+        'Total Paid',
+        'Total Participated In',
+        'Net Balance'
+    ]
+
+    balances = Balance.objects.all() if group_id is None else Balance.objects.filter(group_id=group_id)
+    pairs = balances.net_pairs()
+    owes_groups = _grouped(pairs.order_by('debtor_id', 'creditor_id'), 'debtor_id')
+    owed_groups = _grouped(pairs.order_by('creditor_id', 'debtor_id'), 'creditor_id')
+    owes_user_id, owes = _next_group(owes_groups)
+    owed_user_id, owed = _next_group(owed_groups)
+
+    for user, total_paid, total_participated in _user_totals(group_id):
+        totals = [
+            from_cents(total_paid),
+            from_cents(total_participated),
+            from_cents(total_paid - total_participated)
+        ]
+        has_balances = False
+
+        # A user without a row on one side simply never matches it, so skip
+        # past groups for users who are not listed (e.g. former members).
+        while owes_user_id is not None and owes_user_id < user.id:
+            owes_user_id, owes = _next_group(owes_groups)
+        while owed_user_id is not None and owed_user_id < user.id:
+            owed_user_id, owed = _next_group(owed_groups)
+
+        if owes_user_id == user.id:
+            for pair in owes:
+                has_balances = True
+                yield [pair['debtor_name'], pair['creditor_name'], f"-{from_cents(pair['owed'])}", *totals]
+            owes_user_id, owes = _next_group(owes_groups)
+
+        if owed_user_id == user.id:
+            for pair in owed:
+                has_balances = True
+                yield [pair['creditor_name'], f"(Owed by {pair['debtor_name']})", from_cents(pair['owed']), *totals]
+            owed_user_id, owed = _next_group(owed_groups)
+
+        if not has_balances:
+            yield [user.name, "No outstanding balances", "0", *totals]
+
+        yield []
+
+    expenses = Expense.objects.all() if group_id is None else Expense.objects.filter(group_id=group_id)
+    summary = expenses.aggregate(total=models.Sum('amount'), count=models.Count('id'))
+    yield ["SUMMARY"]
+    yield ["Total Expenses", from_cents(summary['total'] or 0)]
+    yield ["Number of Expenses", summary['count']]
+
+
+def user_statement_rows(user_id):
+    """Yield CSV rows of every expense a user paid for or took part in, oldest first."""
+    expenses = Expense.objects.filter(
+        models.Q(payer_id=user_id) | models.Q(participants=user_id)
+    ).distinct().order_by('id').prefetch_related(
+        models.Prefetch('participants', queryset=User.objects.only('id')))
+
+    yield ["Expense ID", "Date", "Group", "Payer", "Amount", "Split Method", "Your Share", "Net"]
+    paid = owed = 0
+    for expense in expenses.iterator(chunk_size=CHUNK_SIZE):
+        participant_ids = [participant.id for participant in expense.participants.all()]
+        try:
+            share = compute_shares(expense.split_method, expense.amount, participant_ids,
+                                   expense.exact_splits, expense.percentage_splits).get(user_id, 0)
+        except (ValueError, ArithmeticError):
+            share = 0
+        spent = expense.amount if expense.payer_id == user_id else 0
+        paid += spent
+        owed += share
+        yield [expense.id, expense.created_at.isoformat(), expense.group_id or '', expense.payer_id,
+               from_cents(expense.amount), expense.split_method, from_cents(share), from_cents(spent - share)]
+
+    yield []
+    yield ["SUMMARY"]
+    yield ["Total Paid", from_cents(paid)]
+    yield ["Total Share", from_cents(owed)]
+    yield ["Net", from_cents(paid - owed)]
+
+
+def iter_csv(rows):
+    """Encode rows as CSV, yielding chunks of roughly FLUSH_BYTES."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,218 @@
+import logging
+from collections import defaultdict
+
+from django.db import connection, models
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import DailyUserRollup, Expense, ExpenseParticipant, User
+from .money import from_cents
+from .splits import compute_shares, compute_deltas
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = ('paid', 'share', 'lent', 'borrowed', 'expense_count')
+UPSERT_BATCH_SIZE = 100
+BACKFILL_CHUNK_SIZE = 5000
+GRANULARITIES = {
+    'day': models.F('day'),
+    'week': TruncWeek('day'),
+    'month': TruncMonth('day'),
+}
+
+
+def rollup_day(created_at):
+    return timezone.localdate(created_at)
+
+
+def add_rollups(rollups, entry, sign=1):
+    """Add one expense's contribution to {(user_id, day, split_method, counterparty_id): values}.
+
+    entry carries payer_id, amount, participant_ids, deltas, split_method and
+    day, like edits.LedgerEntry. Shares are validated to sum to the amount on
+    write, so the payer's own share is what the deltas leave over.
+    """
+    key = (entry.day, entry.split_method)
+    lent = sum(amount for _, _, amount in entry.deltas)
+    payer_share = entry.amount - lent if entry.payer_id in entry.participant_ids else 0
+    shares = {debtor_id: amount for debtor_id, _, amount in entry.deltas}
+
+    for user_id in {entry.payer_id, *entry.participant_ids}:
+        values = rollups[(user_id, *key, None)]
+        values[4] += sign
+        if user_id == entry.payer_id:
+            values[0] += sign * entry.amount
+            values[1] += sign * payer_share
+            values[2] += sign * lent
+        else:
+            values[1] += sign * shares.get(user_id, 0)
+            values[3] += sign * shares.get(user_id, 0)
+    for debtor_id, creditor_id, amount in entry.deltas:
+        lender = rollups[(creditor_id, *key, debtor_id)]
+        lender[2] += sign * amount
+        lender[4] += sign
+        borrower = rollups[(debtor_id, *key, creditor_id)]
+        borrower[3] += sign * amount
+        borrower[4] += sign
+
+
+def _new_rollups():
+    return defaultdict(lambda: [0] * len(ROLLUP_FIELDS))
+
+
+def _upsert_sql(row_count, with_counterparty):
+    quote = connection.ops.quote_name
+    table = quote(DailyUserRollup._meta.db_table)
+    user, day, split_method, counterparty = (quote(DailyUserRollup._meta.get_field(name).column)
+                                             for name in ('user', 'day', 'split_method', 'counterparty'))
+    fields = [quote(name) for name in ROLLUP_FIELDS]
+    values = ', '.join(['(' + ', '.join(['%s'] * (4 + len(fields))) + ')'] * row_count)
+    # The conflict target has to name the partial unique index it hits.
+    if with_counterparty:
+        target = f"({user}, {day}, {split_method}, {counterparty}) WHERE {counterparty} IS NOT NULL"
+    else:
+        target = f"({user}, {day}, {split_method}) WHERE {counterparty} IS NULL"
+    updates = ', '.join(f"{field} = {table}.{field} + excluded.{field}" for field in fields)
+    return (
+        f"INSERT INTO {table} ({user}, {day}, {split_method}, {counterparty}, {', '.join(fields)}) "
+        f"VALUES {values} ON CONFLICT {target} DO UPDATE SET {updates}"
+    )
+
+
+def write_rollups(rollups):
+    """Add {key: values} to DailyUserRollup with atomic upserts, skipping keys that net to zero."""
+    rows = [(key, values) for key, values in rollups.items() if any(values)]
+    adapt = connection.ops.adapt_datefield_value
+    with connection.cursor() as cursor:
+        for with_counterparty in (False, True):
+            # Keys are written in order to keep lock acquisition ordered.
+            kind_rows = sorted(((key, values) for key, values in rows if (key[3] is not None) == with_counterparty),
+                               key=lambda row: row[0])
+            for start in range(0, len(kind_rows), UPSERT_BATCH_SIZE):
+                batch = kind_rows[start:start + UPSERT_BATCH_SIZE]
+                params = [value for (user_id, day, split_method, counterparty_id), values in batch
+                          for value in (user_id, adapt(day), split_method, counterparty_id, *values)]
+                cursor.execute(_upsert_sql(len(batch), with_counterparty), params)
+    return len(rows)
+
+
+def record_rollups(entries, removed=()):
+    """Add entries to the daily rollups and take removed ones out. Must run in the writing transaction."""
+    rollups = _new_rollups()
+    for entry in entries:
+        add_rollups(rollups, entry)
+    for entry in removed:
+        add_rollups(rollups, entry, sign=-1)
+    written = write_rollups(rollups)
+    logger.info(f"Updated {written} daily rollups")
+
+
+def expected_rollups(chunk_size=BACKFILL_CHUNK_SIZE, errors=None):
+    """Recompute every rollup from Expense, walking expenses by id in chunks.
+
+    Expenses whose split cannot be computed are skipped and, when errors is
+    a list, reported there as (expense_id, message).
+    """
+    from .edits import LedgerEntry
+
+    rollups = _new_rollups()
+    fields = ('id', 'group_id', 'payer_id', 'amount', 'split_method', 'exact_splits', 'percentage_splits',
+              'created_at')
+    last_id = 0
+    while True:
+        rows = list(Expense.objects.filter(id__gt=last_id).order_by('id').values_list(*fields)[:chunk_size])
+        if not rows:
+            return rollups
+        participants = defaultdict(list)
+        for expense_id, user_id in ExpenseParticipant.objects.filter(
+                expense_id__gte=rows[0][0], expense_id__lte=rows[-1][0]).values_list('expense_id', 'user_id'):
+            participants[expense_id].append(user_id)
+        for expense_id, group_id, payer_id, amount, split_method, exact_splits, percentage_splits, created_at in rows:
+            try:
+                shares = compute_shares(split_method, amount, participants[expense_id], exact_splits,
+                                        percentage_splits)
+            except (ValueError, ArithmeticError) as e:
+                if errors is not None:
+                    errors.append((expense_id, str(e)))
+                continue
+            add_rollups(rollups, LedgerEntry(group_id, payer_id, amount, participants[expense_id],
+                                             compute_deltas(payer_id, shares), split_method, rollup_day(created_at)))
+        last_id = rows[-1][0]
+
+
+def _amounts(values, *fields):
+    return {field: from_cents(values[field]) for field in fields}
+
+
+def _sums(*fields):
+    # Aliased, since an annotation may not reuse a model field's name.
+    return {f"total_{field}": models.Sum(field) for field in fields}
+
+
+def _totals(row, fields):
+    return {field: row[f"total_{field}"] for field in fields}
+
+
+def statement(user_id, start, end, granularity):
+    """Summarise user_id's rollups for days start..end (inclusive) into periods.
+
+    Sums happen in the database per period, so the cost follows the number
+    of stored days rather than the number of expenses. Week periods start on
+    Monday and month periods on the 1st, even when that is before start.
+    """
+    rollups = DailyUserRollup.objects.filter(user_id=user_id, day__gte=start, day__lte=end).annotate(
+        period=GRANULARITIES[granularity]).order_by()
+
+    periods = defaultdict(lambda: {'values': dict.fromkeys(ROLLUP_FIELDS, 0), 'by_split_method': {},
+                                   'counterparties': []})
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    own_rows = rollups.filter(counterparty__isnull=True).values('period', 'split_method').annotate(
+        **_sums(*ROLLUP_FIELDS))
+    for row in own_rows:
+        values = _totals(row, ROLLUP_FIELDS)
+        if not any(values.values()):
+            # Left behind by deleted expenses.
+            continue
+        entry = periods[row['period']]
+        for field in ROLLUP_FIELDS:
+            entry['values'][field] += values[field]
+            totals[field] += values[field]
+        entry['by_split_method'][row['split_method']] = {
+            **_amounts(values, 'paid', 'share'), 'expense_count': values['expense_count']}
+
+    counterparty_rows = [
+        {'period': row['period'], 'counterparty_id': row['counterparty_id'],
+         **_totals(row, ('lent', 'borrowed', 'expense_count'))}
+        for row in rollups.filter(counterparty__isnull=False).values('period', 'counterparty_id').annotate(
+            **_sums('lent', 'borrowed', 'expense_count')).order_by('period', 'counterparty_id')
+    ]
+    names = dict(User.objects.filter(id__in={row['counterparty_id'] for row in counterparty_rows}).values_list(
+        'id', 'name'))
+    for row in counterparty_rows:
+        if not row['lent'] and not row['borrowed']:
+            continue
+        periods[row['period']]['counterparties'].append({
+            'user_id': row['counterparty_id'],
+            'name': names.get(row['counterparty_id']),
+            **_amounts(row, 'lent', 'borrowed'),
+            'net': from_cents(row['lent'] - row['borrowed']),
+            'expense_count': row['expense_count'],
+        })
+
+    def summary(values):
+        return {**_amounts(values, 'paid', 'share', 'lent', 'borrowed'),
+                'net': from_cents(values['lent'] - values['borrowed']),
+                'expense_count': values['expense_count']}
+
+    return {
+        'user_id': user_id,
+        'from': start,
+        'to': end,
+        'granularity': granularity,
+        'totals': summary(totals),
+        'periods': [
+            {'start': day, **summary(entry['values']), 'by_split_method': entry['by_split_method'],
+             'counterparties': entry['counterparties']}
+            for day, entry in sorted(periods.items())
+        ],
+    }
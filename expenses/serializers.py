@@ -1,56 +1,272 @@
+from decimal import Decimal, InvalidOperation
+from django.urls import reverse
 from rest_framework import serializers
-from .models import User, Expense
+from .models import User, Expense, Group, GroupMembership, ReportJob, Settlement
+from .money import to_cents, from_cents
 import logging
+
+
+class CentsField(serializers.DecimalField):
+    """Accepts and renders major units while the model stores integer cents."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', 17)
+        kwargs.setdefault('decimal_places', 2)
+        kwargs.setdefault('coerce_to_string', False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        return to_cents(super().to_internal_value(data))
+
+    def to_representation(self, value):
+        return super().to_representation(from_cents(value))
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'name', 'email', 'mobile']
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    members = serializers.PrimaryKeyRelatedField(many=True, queryset=User.objects.all(), required=False)
+
+    class Meta:
+        model = Group
+        fields = ['id', 'name', 'members', 'created_at']
         
         
 logger = logging.getLogger(__name__)
 
+
+class UserIdField(serializers.PrimaryKeyRelatedField):
+    """Accepts a user id without looking it up; ExpenseSerializer.validate resolves every id in one query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
 class ExpenseSerializer(serializers.ModelSerializer):
-    participants = serializers.PrimaryKeyRelatedField(many=True, queryset=User.objects.all(), required=True)
+    payer = UserIdField(queryset=User.objects.all())
+    participants = UserIdField(many=True, queryset=User.objects.all(), required=True)
+    amount = CentsField()
     
     class Meta:
         model = Expense
-        fields = ['id', 'payer', 'participants', 'amount', 'split_method', 'exact_splits', 'percentage_splits']
+        fields = ['id', 'group', 'payer', 'participants', 'amount', 'split_method', 'exact_splits', 'percentage_splits']
 
     def validate(self, data):
-        logger.info(f"Validating expense data: {data}")
-        
+        logger.debug(f"Validating expense data: {data}")
+        if self.instance is not None:
+            # Partial updates are validated as the whole expense they produce.
+            data = {
+                'group': self.instance.group,
+                'payer': self.instance.payer_id,
+                'participants': list(self.instance.participants.values_list('id', flat=True)),
+                'amount': self.instance.amount,
+                'split_method': self.instance.split_method,
+                'exact_splits': self.instance.exact_splits,
+                'percentage_splits': self.instance.percentage_splits,
+                **data
+            }
+
+        if data['amount'] <= 0:
+            raise serializers.ValidationError({"amount": "Amount must be greater than 0"})
+
+        if data['split_method'] not in ['equal', 'exact', 'percentage']:
+            raise serializers.ValidationError({"split_method": "Invalid split method"})
+
+        validate_split_totals(data)
+        participant_ids = list(dict.fromkeys(data['participants']))
+        validate_split_keys(data, participant_ids)
+
+        # Split keys are a subset of the participants, so this covers every id.
+        users = User.objects.in_bulk({data['payer'], *participant_ids})
+        if data['payer'] not in users:
+            raise serializers.ValidationError({"payer": "Payer user does not exist"})
+        missing_ids = set(participant_ids) - set(users)
+        if missing_ids:
+            raise serializers.ValidationError({"participants": f"Users with IDs {missing_ids} do not exist"})
+
+        if data.get('group'):
+            member_ids = set(GroupMembership.objects.filter(
+                group=data['group'], user_id__in=users).values_list('user_id', flat=True))
+            validate_group_members(data['payer'], participant_ids, member_ids)
+
+        data['payer'] = users[data['payer']]
+        data['participants'] = [users[participant_id] for participant_id in participant_ids]
+        return data
+
+
+def expense_rows(expenses):
+    """Render expenses like ExpenseSerializer without DRF's per-field machinery.
+
+    For list endpoints: expects expense_list_queryset() rows, with the
+    participants prefetched.
+    """
+    return [
+        {
+            'id': expense.id,
+            'group': expense.group_id,
+            'payer': expense.payer_id,
+            'participants': [participant.id for participant in expense.participants.all()],
+            'amount': from_cents(expense.amount),
+            'split_method': expense.split_method,
+            'exact_splits': expense.exact_splits,
+            'percentage_splits': expense.percentage_splits,
+        }
+        for expense in expenses
+    ]
+
+
+def validate_group_members(payer_id, participant_ids, member_ids):
+    outsiders = {payer_id, *participant_ids} - member_ids
+    if outsiders:
+        raise serializers.ValidationError({"group": f"Users with IDs {outsiders} are not members of this group"})
+
+
+def validate_split_keys(data, participant_ids):
+    """Exact and percentage splits may only name participants of the expense."""
+    split_field = {'exact': 'exact_splits', 'percentage': 'percentage_splits'}.get(data['split_method'])
+    if split_field is None:
+        return
+    participant_ids = set(participant_ids)
+    for key in data[split_field]:
+        if not str(key).isdigit() or int(key) not in participant_ids:
+            raise serializers.ValidationError({split_field: f"User with ID {key} is not a participant"})
+
+
+def validate_split_totals(data):
+    if data['split_method'] == 'exact':
+        if not data.get('exact_splits'):
+            raise serializers.ValidationError({"exact_splits": "Exact splits are required"})
+        try:
+            total = sum(to_cents(amount) for amount in data['exact_splits'].values())
+        except InvalidOperation:
+            raise serializers.ValidationError({"exact_splits": "Exact splits must be numbers"})
+        if total != data['amount']:
+            raise serializers.ValidationError({"exact_splits": "Sum of exact splits must equal total amount"})
+
+    if data['split_method'] == 'percentage':
+        if not data.get('percentage_splits'):
+            raise serializers.ValidationError({"percentage_splits": "Percentage splits are required"})
         try:
-            payer = User.objects.get(id=data['payer'].id)
-            logger.info(f"Payer validated: {payer.id}")
-        except User.DoesNotExist:
+            percentages = [Decimal(str(percentage)) for percentage in data['percentage_splits'].values()]
+            if not all(percentage.is_finite() for percentage in percentages):
+                raise InvalidOperation
+            total = sum(percentages)
+        except InvalidOperation:
+            raise serializers.ValidationError({"percentage_splits": "Percentages must be numbers"})
+        if total != 100:
+            raise serializers.ValidationError({"percentage_splits": "Percentages must sum to 100"})
+
+
+class ExpenseBulkItemSerializer(serializers.Serializer):
+    """Validates one item of a bulk upload against users prefetched into context['users'].
+
+    Items in a group are checked against the {group_id: member_ids} map in
+    context['members'].
+    """
+    group = serializers.IntegerField(required=False, allow_null=True)
+    payer = serializers.IntegerField()
+    participants = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    amount = CentsField()
+    split_method = serializers.ChoiceField(choices=Expense.SPLIT_METHODS)
+    exact_splits = serializers.DictField(required=False, allow_null=True)
+    percentage_splits = serializers.DictField(required=False, allow_null=True)
+
+    def validate(self, data):
+        users = self.context['users']
+
+        if data['payer'] not in users:
             raise serializers.ValidationError({"payer": "Payer user does not exist"})
 
-        participant_ids = [p.id for p in data['participants']]
-        logger.info(f"Validating participants: {participant_ids}")
-        
-        existing_participants = User.objects.filter(id__in=participant_ids)
-        if len(existing_participants) != len(participant_ids):
-            missing_ids = set(participant_ids) - set(p.id for p in existing_participants)
+        missing_ids = set(data['participants']) - set(users)
+        if missing_ids:
             raise serializers.ValidationError({"participants": f"Users with IDs {missing_ids} do not exist"})
 
         if data['amount'] <= 0:
             raise serializers.ValidationError({"amount": "Amount must be greater than 0"})
 
-        if data['split_method'] not in ['equal', 'exact', 'percentage']:
-            raise serializers.ValidationError({"split_method": "Invalid split method"})
+        validate_split_totals(data)
+        validate_split_keys(data, data['participants'])
+
+        if data.get('group') is not None:
+            if data['group'] not in self.context['members']:
+                raise serializers.ValidationError({"group": "Group does not exist"})
+            validate_group_members(data['payer'], data['participants'], self.context['members'][data['group']])
+
+        return data
+
+
+class SettlementSerializer(serializers.ModelSerializer):
+    """Validates a settlement against users prefetched into context['users'].
+
+    Settlements in a group are checked against the {group_id: member_ids}
+    map in context['members'].
+    """
+    group = serializers.IntegerField(source='group_id', required=False, allow_null=True)
+    payer = serializers.IntegerField(source='payer_id')
+    payee = serializers.IntegerField(source='payee_id')
+    amount = CentsField()
+
+    class Meta:
+        model = Settlement
+        fields = ['id', 'group', 'payer', 'payee', 'amount', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate(self, data):
+        users = self.context['users']
+        for field, user_id in (('payer', data['payer_id']), ('payee', data['payee_id'])):
+            if user_id not in users:
+                raise serializers.ValidationError({field: f"User with ID {user_id} does not exist"})
+        if data['payer_id'] == data['payee_id']:
+            raise serializers.ValidationError({"payee": "Payer and payee must be different users"})
+        if data['amount'] <= 0:
+            raise serializers.ValidationError({"amount": "Amount must be greater than 0"})
+
+        if data.get('group_id') is not None:
+            if data['group_id'] not in self.context['members']:
+                raise serializers.ValidationError({"group": "Group does not exist"})
+            validate_group_members(data['payer_id'], [data['payee_id']], self.context['members'][data['group_id']])
+        return data
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'kind', 'params', 'status', 'result', 'error', 'download',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_download(self, job):
+        if job.status != ReportJob.DONE or not job.result_path:
+            return None
+        return reverse('report-download', kwargs={'pk': job.id})
+
+    def validate(self, data):
+        params = data.get('params') or {}
+        if not isinstance(params, dict):
+            raise serializers.ValidationError({"params": "Params must be an object"})
 
-        if data['split_method'] == 'exact':
-            if not data.get('exact_splits'):
-                raise serializers.ValidationError({"exact_splits": "Exact splits are required"})
-            total = sum(float(amount) for amount in data['exact_splits'].values())
-            if abs(total - data['amount']) > 0.01: 
-                raise serializers.ValidationError({"exact_splits": "Sum of exact splits must equal total amount"})
-
-        if data['split_method'] == 'percentage':
-            if not data.get('percentage_splits'):
-                raise serializers.ValidationError({"percentage_splits": "Percentage splits are required"})
-            total = sum(float(percentage) for percentage in data['percentage_splits'].values())
-            if abs(total - 100) > 0.01:
-                raise serializers.ValidationError({"percentage_splits": "Percentages must sum to 100"})
-
-        return data
\ No newline at end of file
+        if data['kind'] == ReportJob.USER_STATEMENT:
+            user_id = params.get('user_id')
+            if isinstance(user_id, bool) or not isinstance(user_id, int):
+                raise serializers.ValidationError({"params": "user_id is required"})
+            if not User.objects.filter(id=user_id).exists():
+                raise serializers.ValidationError({"params": f"User with ID {user_id} not found"})
+            data['params'] = {'user_id': user_id}
+        elif data['kind'] == ReportJob.BALANCE_SHEET:
+            group_id = params.get('group')
+            if group_id is not None and not Group.objects.filter(id=group_id).exists():
+                raise serializers.ValidationError({"params": f"Group with ID {group_id} not found"})
+            data['params'] = {'group': group_id} if group_id is not None else {}
+        else:
+            data['params'] = {'fix': bool(params.get('fix', False))}
+        return data
@@ -0,0 +1,99 @@
+import heapq
+import logging
+from array import array
+
+from collections import defaultdict
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .balances import apply_balance_deltas, balance_events, record_balance_events
+from .cache import invalidate_ledger_on_commit
+from .models import Balance, Settlement
+
+logger = logging.getLogger(__name__)
+
+
+def net_positions(balances=None):
+    """Return (user_ids, nets) arrays sorted by user id using one grouped query.
+
+    Nets are in cents. A positive net means the user is owed money overall, a
+    negative net means they owe money. ``balances`` narrows the Balance
+    queryset if given.
+    """
+    balances = Balance.objects.all() if balances is None else balances
+    owed = balances.values_list('to_user_id').annotate(total=Sum('amount')).order_by()
+    owes = balances.values_list('from_user_id').annotate(total=-Sum('amount')).order_by()
+
+    user_ids = array('q')
+    nets = array('q')
+    for user_id, total in owed.union(owes, all=True).order_by('to_user_id').iterator(chunk_size=10000):
+        if user_ids and user_ids[-1] == user_id:
+            nets[-1] += total
+        else:
+            user_ids.append(user_id)
+            nets.append(total)
+    return user_ids, nets
+
+
+def settlement_plan(user_ids, nets):
+    """Greedily match the largest debtor with the largest creditor.
+
+    Produces at most n - 1 transfers for n users with a non-zero position and
+    runs in O(n log n). Yields (from_user_id, to_user_id, amount) tuples.
+    """
+    creditors = []
+    debtors = []
+    for index, net in enumerate(nets):
+        if net > 0:
+            creditors.append((-net, index))
+        elif net < 0:
+            debtors.append((net, index))
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        yield user_ids[debtor], user_ids[creditor], amount
+
+        credit += amount
+        debt += amount
+        if credit:
+            heapq.heappush(creditors, (credit, creditor))
+        if debt:
+            heapq.heappush(debtors, (debt, debtor))
+
+
+def settlement_delta(settlement):
+    """A repayment makes the payee owe the payer, cancelling the payer's debt."""
+    return settlement.payee_id, settlement.payer_id, settlement.amount
+
+
+def record_settlements(settlements):
+    """Save unsaved Settlement rows and move their Balance pairs. Must run in a transaction.
+
+    Pairs are netted per ledger and written with the same atomic upserts
+    expenses use, so a whole plan costs one upsert per ledger batch. Every
+    pair change is logged as a balance event attributed to its settlement.
+    """
+    settlements = Settlement.objects.bulk_create(settlements, batch_size=1000)
+    deltas_by_group = defaultdict(list)
+    for settlement in settlements:
+        deltas_by_group[settlement.group_id].append(settlement_delta(settlement))
+    for group_id, deltas in deltas_by_group.items():
+        apply_balance_deltas(deltas, group_id=group_id, log_events=False)
+    created_at = timezone.now()
+    record_balance_events([
+        event
+        for settlement in settlements
+        for event in balance_events([settlement_delta(settlement)], settlement.group_id,
+                                    created_at=created_at, settlement_id=settlement.id)
+    ])
+    invalidate_ledger_on_commit(
+        [user_id for settlement in settlements for user_id in (settlement.payer_id, settlement.payee_id)],
+        deltas_by_group
+    )
+    logger.info(f"Recorded {len(settlements)} settlements across {len(deltas_by_group)} ledgers")
+    return settlements
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .cache import invalidate_split_previews_on_commit
+from .models import Expense, ExpenseParticipant
+
+
+@receiver(post_save, sender=Expense)
+def expense_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_split_previews_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, **kwargs):
+    invalidate_split_previews_on_commit([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ExpenseParticipant)
+def participant_changed(sender, instance, **kwargs):
+    invalidate_split_previews_on_commit([instance.expense_id])
+
+
+@receiver(m2m_changed, sender=ExpenseParticipant)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_split_previews_on_commit([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_split_previews_on_commit(pk_set)
+    elif action == 'pre_clear':
+        invalidate_split_previews_on_commit(instance.shared_expenses.values_list('id', flat=True))
@@ -0,0 +1,59 @@
+import logging
+from decimal import Decimal
+
+from .money import to_cents
+
+logger = logging.getLogger(__name__)
+
+
+def distribute_remainder(floors, fractions, total):
+    """Hand out the cents lost to flooring, largest fraction first, ties by user id."""
+    shares = dict(floors)
+    leftover = total - sum(shares.values())
+    for participant_id in sorted(fractions, key=lambda pid: (-fractions[pid], pid))[:leftover]:
+        shares[participant_id] += 1
+    return shares
+
+
+def compute_shares(split_method, amount, participant_ids, exact_splits=None, percentage_splits=None):
+    """Return a {user_id: share_in_cents} mapping without touching the database.
+
+    ``amount`` is in cents. Equal and percentage shares always sum exactly to
+    ``amount``; leftover cents go to participants in a deterministic order.
+    """
+    if split_method == 'equal':
+        participant_ids = sorted(set(participant_ids))
+        if not participant_ids:
+            raise ValueError("No participants found for the expense")
+        per_person, remainder = divmod(amount, len(participant_ids))
+        return {
+            participant_id: per_person + (1 if index < remainder else 0)
+            for index, participant_id in enumerate(participant_ids)
+        }
+
+    if split_method == 'exact':
+        if not exact_splits:
+            raise ValueError("Exact splits data is required")
+        return {int(participant_id): to_cents(exact_amount) for participant_id, exact_amount in exact_splits.items()}
+
+    if split_method == 'percentage':
+        if not percentage_splits:
+            raise ValueError("Percentage splits data is required")
+        floors = {}
+        fractions = {}
+        for participant_id, percentage in percentage_splits.items():
+            owed = amount * Decimal(str(percentage)) / 100
+            floors[int(participant_id)] = int(owed)
+            fractions[int(participant_id)] = owed - int(owed)
+        return distribute_remainder(floors, fractions, amount)
+
+    raise ValueError(f"Invalid split method: {split_method}")
+
+
+def compute_deltas(payer_id, shares):
+    """Turn shares into (debtor_id, creditor_id, amount) deltas, skipping the payer's own share."""
+    return [
+        (participant_id, payer_id, share)
+        for participant_id, share in shares.items()
+        if participant_id != payer_id and share
+    ]
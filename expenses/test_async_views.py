@@ -0,0 +1,60 @@
+import json
+
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .models import User
+
+
+class AsyncReadViewsTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.carol = User.objects.create(name="Carol", email="carol@example.com", mobile="1122334455")
+        for payer, participants, amount in [
+            (self.alice, [self.alice, self.bob, self.carol], 100),
+            (self.bob, [self.alice, self.bob], 45.5),
+            (self.carol, [self.alice], 12),
+        ]:
+            response = self.client.post(reverse('expense-create'), {
+                "payer": payer.id,
+                "participants": [participant.id for participant in participants],
+                "amount": amount,
+                "split_method": "equal"
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    async def _assert_same(self, sync_name, async_name, query=None, **kwargs):
+        expected = await self.async_client.get(reverse(sync_name, kwargs=kwargs), query)
+        response = await self.async_client.get(reverse(async_name, kwargs=kwargs), query)
+        self.assertEqual(response.status_code, expected.status_code)
+        # Next links point at each endpoint's own URL.
+        self.assertEqual(
+            json.loads(response.content.decode().replace('/async/', '/')),
+            json.loads(expected.content))
+        return response
+
+    async def test_balance_matches_sync_view(self):
+        for user in (self.alice, self.bob, self.carol):
+            await self._assert_same('get-balance', 'async-get-balance', user_id=user.id)
+        response = await self._assert_same('get-balance', 'async-get-balance', user_id=999)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_user_expenses_match_sync_view(self):
+        await self._assert_same('user-expenses', 'async-user-expenses', user_id=self.alice.id)
+        await self._assert_same('user-expenses', 'async-user-expenses', {'limit': 1}, user_id=self.bob.id)
+        response = await self._assert_same('user-expenses', 'async-user-expenses', user_id=999)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_overall_matches_sync_view(self):
+        response = await self._assert_same('overall-expenses', 'async-overall-expenses', {'limit': 2})
+        self.assertIsNotNone(json.loads(response.content)['user_summaries']['next'])
+
+    async def test_expense_list_matches_sync_view(self):
+        await self._assert_same('expense-detail', 'async-expense-list', {'limit': 2})
+        await self._assert_same('expense-detail', 'async-expense-list', {'payer': self.bob.id})
+        response = await self._assert_same('expense-detail', 'async-expense-list', {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self._assert_same('expense-detail', 'async-expense-list', {'created_after': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,60 @@
+import csv
+import gzip
+import io
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .models import User, Expense, Balance
+
+
+class DownloadBalanceSheetTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.charlie = User.objects.create(name="Charlie", email="charlie@example.com", mobile="1122334455")
+
+        expense = Expense.objects.create(payer=self.alice, amount=10000, split_method='equal')
+        expense.participants.add(self.alice, self.bob)
+        expense.split_expense()
+        call_command('rebuild_ledger_summary', stdout=io.StringIO())
+
+    def _rows(self, response):
+        content = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return list(csv.reader(io.StringIO(content.decode())))
+
+    def test_streams_rows_per_user(self):
+        response = self.client.get(reverse('download-balance-sheet'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        rows = self._rows(response)
+        self.assertEqual(rows[0][0], 'User')
+        self.assertIn(['Alice', '(Owed by Bob)', '50.00', '100.00', '100.00', '0.00'], rows)
+        self.assertIn(['Bob', 'Alice', '-50.00', '0.00', '100.00', '-100.00'], rows)
+        self.assertIn(['Charlie', 'No outstanding balances', '0', '0.00', '0.00', '0.00'], rows)
+        self.assertEqual(rows[-2:], [['Total Expenses', '100.00'], ['Number of Expenses', '1']])
+
+    def test_gzip_content_encoding(self):
+        plain = self._rows(self.client.get(reverse('download-balance-sheet')))
+        response = self.client.get(reverse('download-balance-sheet'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(self._rows(response), plain)
+
+    def test_query_count_is_constant(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                b''.join(self.client.get(reverse('download-balance-sheet')).streaming_content)
+            return len(context.captured_queries)
+
+        before = count_queries()
+        for i in range(20):
+            user = User.objects.create(name=f"User {i}", email=f"user{i}@example.com", mobile=f"{i:010d}")
+            Balance.objects.create(from_user=self.alice, to_user=user, amount=-100 * (i + 1))
+        self.assertEqual(count_queries(), before)
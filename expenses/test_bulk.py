@@ -0,0 +1,98 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .models import User, Expense, Balance
+from .balances import owed_amount
+
+
+class ExpenseBulkCreateTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.user2 = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.user3 = User.objects.create(name="Charlie", email="charlie@example.com", mobile="1122334455")
+
+    def test_bulk_create_nets_balances(self):
+        data = [
+            {
+                "payer": self.user1.id,
+                "participants": [self.user1.id, self.user2.id, self.user3.id],
+                "amount": 300,
+                "split_method": "equal"
+            },
+            {
+                "payer": self.user2.id,
+                "participants": [self.user1.id, self.user2.id],
+                "amount": 100,
+                "split_method": "exact",
+                "exact_splits": {str(self.user1.id): 40, str(self.user2.id): 60}
+            },
+            {
+                "payer": self.user3.id,
+                "participants": [self.user1.id],
+                "amount": 50,
+                "split_method": "percentage",
+                "percentage_splits": {str(self.user1.id): 100}
+            },
+        ]
+        response = self.client.post(reverse('expense-bulk-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 3)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(Expense.objects.count(), 3)
+        self.assertEqual(Expense.participants.through.objects.count(), 6)
+
+        # Bob owed Alice 100 and Alice owed Bob 40, so only 60 remains.
+        self.assertEqual(owed_amount(self.user2.id, self.user1.id), 6000)
+        self.assertEqual(owed_amount(self.user3.id, self.user1.id), 5000)
+        self.assertEqual(Balance.objects.count(), 2)
+
+    def test_bulk_create_reports_per_item_errors(self):
+        data = [
+            {
+                "payer": self.user1.id,
+                "participants": [self.user2.id],
+                "amount": 80,
+                "split_method": "equal"
+            },
+            {
+                "payer": 999,
+                "participants": [self.user2.id],
+                "amount": 10,
+                "split_method": "equal"
+            },
+            {
+                "payer": self.user1.id,
+                "participants": [self.user2.id],
+                "amount": 10,
+                "split_method": "exact",
+                "exact_splits": {str(self.user2.id): 5}
+            },
+        ]
+        response = self.client.post(reverse('expense-bulk-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['index'] for item in response.data['created']], [0])
+        self.assertEqual([item['index'] for item in response.data['errors']], [1, 2])
+        self.assertEqual(Expense.objects.count(), 1)
+        self.assertEqual(owed_amount(self.user2.id, self.user1.id), 8000)
+
+    def test_non_finite_splits_are_item_errors(self):
+        valid = {"payer": self.user1.id, "participants": [self.user2.id], "amount": 10, "split_method": "equal"}
+        data = [
+            valid,
+            {**valid, "split_method": "exact", "exact_splits": {str(self.user2.id): "NaN"}},
+            {**valid, "split_method": "exact", "exact_splits": {str(self.user2.id): "Infinity"}},
+            {**valid, "split_method": "percentage", "percentage_splits": {str(self.user2.id): "NaN"}},
+        ]
+        response = self.client.post(reverse('expense-bulk-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['index'] for item in response.data['created']], [0])
+        self.assertEqual([item['index'] for item in response.data['errors']], [1, 2, 3])
+
+        response = self.client.post(reverse('expense-create'), data[1], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['exact_splits'], ["Exact splits must be numbers"])
+
+    def test_bulk_create_rejects_empty_batch(self):
+        response = self.client.post(reverse('expense-bulk-create'), [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
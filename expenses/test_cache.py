@@ -0,0 +1,65 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .cache import reset_cache_stats
+from .models import User
+
+
+class LedgerCacheTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        reset_cache_stats()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.carol = User.objects.create(name="Carol", email="carol@example.com", mobile="1122334455")
+
+    def _create_expense(self, payer, participants, amount):
+        data = {
+            "payer": payer.id,
+            "participants": [participant.id for participant in participants],
+            "amount": amount,
+            "split_method": "equal"
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('expense-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_repeated_reads_are_served_from_cache(self):
+        url = reverse('get-balance', kwargs={'user_id': self.bob.id})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.get(reverse('overall-expenses'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('overall-expenses'))
+
+    def test_write_invalidates_affected_users_and_global_summary(self):
+        bob_url = reverse('get-balance', kwargs={'user_id': self.bob.id})
+        carol_url = reverse('user-expenses', kwargs={'user_id': self.carol.id})
+        self.assertEqual(self.client.get(bob_url).data, [])
+        self.client.get(carol_url)
+        self.assertEqual(self.client.get(reverse('overall-expenses')).data['expense_count'], 0)
+
+        self._create_expense(self.alice, [self.alice, self.bob], 100)
+
+        self.assertEqual(self.client.get(bob_url).data, [{"to_user": "Alice", "amount": 50}])
+        self.assertEqual(self.client.get(reverse('overall-expenses')).data['expense_count'], 1)
+        # Carol took no part, so her entry is still valid.
+        with self.assertNumQueries(0):
+            self.client.get(carol_url)
+
+    def test_stats_endpoint_counts_hits_and_misses(self):
+        url = reverse('get-balance', kwargs={'user_id': self.bob.id})
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url)
+
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.data['get-balance'], {"hits": 2, "misses": 1})
+
+    def test_missing_user_is_not_cached(self):
+        url = reverse('get-balance', kwargs={'user_id': 999})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
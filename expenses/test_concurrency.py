@@ -0,0 +1,75 @@
+import random
+import threading
+
+from django.db import connections
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import User, Expense, Balance, UserLedgerSummary
+from .balances import net_pair_deltas
+from .splits import compute_shares, compute_deltas
+
+THREADS = 16
+EXPENSES_PER_THREAD = 125
+
+
+class ConcurrentExpenseCreationTestCase(TransactionTestCase):
+    def setUp(self):
+        self.users = User.objects.bulk_create([
+            User(name=f"User {i}", email=f"user{i}@example.com", mobile=f"{i:010d}")
+            for i in range(6)
+        ])
+
+    def _payloads(self, seed):
+        rng = random.Random(seed)
+        user_ids = [user.id for user in self.users]
+        payloads = []
+        for _ in range(EXPENSES_PER_THREAD):
+            participants = rng.sample(user_ids, rng.randint(2, len(user_ids)))
+            payloads.append({
+                "payer": rng.choice(user_ids),
+                "participants": participants,
+                "amount": f"{rng.randint(1, 50000) / 100:.2f}",
+                "split_method": "equal"
+            })
+        return payloads
+
+    def test_parallel_expense_creation_loses_no_updates(self):
+        batches = [self._payloads(seed) for seed in range(THREADS)]
+        failures = []
+
+        def submit(payloads):
+            client = APIClient()
+            try:
+                for payload in payloads:
+                    response = client.post(reverse('expense-create'), payload, format='json')
+                    if response.status_code != status.HTTP_201_CREATED:
+                        failures.append(response.data)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit, args=(payloads,)) for payloads in batches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        self.assertEqual(Expense.objects.count(), THREADS * EXPENSES_PER_THREAD)
+
+        deltas = []
+        total_paid = {user.id: 0 for user in self.users}
+        for payloads in batches:
+            for payload in payloads:
+                amount = round(float(payload['amount']) * 100)
+                shares = compute_shares('equal', amount, payload['participants'])
+                deltas.extend(compute_deltas(payload['payer'], shares))
+                total_paid[payload['payer']] += amount
+
+        stored = {
+            (balance.from_user_id, balance.to_user_id): balance.amount
+            for balance in Balance.objects.exclude(amount=0)
+        }
+        self.assertEqual(stored, net_pair_deltas(deltas))
+        self.assertEqual(dict(UserLedgerSummary.objects.values_list('user_id', 'total_paid')), total_paid)
@@ -0,0 +1,112 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .balances import owed_amount
+from .history import replay_balances
+from .models import User, Expense, Group, Balance, BalanceEvent
+
+
+class ExpenseEditTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.carol = User.objects.create(name="Carol", email="carol@example.com", mobile="1122334455")
+        self.expense_id = self._create_expense(self.alice, [self.alice, self.bob, self.carol], 90)
+
+    def _create_expense(self, payer, participants, amount):
+        response = self.client.post(reverse('expense-create'), {
+            "payer": payer.id,
+            "participants": [participant.id for participant in participants],
+            "amount": amount,
+            "split_method": "equal"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def _patch(self, data, expense_id=None):
+        url = reverse('expense-item', kwargs={'expense_id': expense_id or self.expense_id})
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(url, data, format='json')
+
+    def _assert_ledger_consistent(self):
+        call_command('rebuild_ledger_summary', check=True, stdout=io.StringIO())
+        stored = {
+            (group_id, from_user_id, to_user_id): amount
+            for group_id, from_user_id, to_user_id, amount in Balance.objects.exclude(amount=0).values_list(
+                'group_id', 'from_user_id', 'to_user_id', 'amount')
+        }
+        self.assertEqual(replay_balances(timezone.now()), stored)
+
+    def test_patch_applies_only_the_difference(self):
+        response = self._patch({"amount": 120})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['amount'], 120)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 4000)
+        self.assertEqual(owed_amount(self.carol.id, self.alice.id), 4000)
+        self.assertEqual(
+            list(BalanceEvent.objects.filter(expense_id=self.expense_id).values_list('amount', flat=True)),
+            [-3000, -3000, -1000, -1000])
+
+        response = self._patch({"participants": [self.alice.id, self.bob.id]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 6000)
+        self.assertEqual(owed_amount(self.carol.id, self.alice.id), 0)
+
+        split = self.client.get(reverse('expense-split', kwargs={'expense_id': self.expense_id})).data
+        self.assertEqual([share['user_id'] for share in split['shares']], [self.alice.id, self.bob.id])
+        self._assert_ledger_consistent()
+
+    def test_patch_moves_expense_between_ledgers(self):
+        trip = Group.objects.create(name="Trip")
+        trip.members.add(self.alice, self.bob, self.carol)
+        response = self._patch({"group": trip.id, "split_method": "exact",
+                                "exact_splits": {str(self.bob.id): 50, str(self.carol.id): 40}})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 0)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id, group_id=trip.id), 5000)
+        self.assertEqual(owed_amount(self.carol.id, self.alice.id, group_id=trip.id), 4000)
+        self._assert_ledger_consistent()
+
+    def test_invalid_patch_changes_nothing(self):
+        response = self._patch({"split_method": "exact", "exact_splits": {str(self.bob.id): 10}})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Expense.objects.get(id=self.expense_id).split_method, 'equal')
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 3000)
+
+        response = self._patch({"amount": 5}, expense_id=999)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_reverses_balances_and_totals(self):
+        other_id = self._create_expense(self.bob, [self.alice, self.bob], 10)
+        url = reverse('expense-item', kwargs={'expense_id': self.expense_id})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.assertEqual(owed_amount(self.alice.id, self.bob.id), 500)
+        self.assertEqual(owed_amount(self.carol.id, self.alice.id), 0)
+        self.assertTrue(Expense.objects.filter(id=other_id).exists())
+        # The log keeps the deleted expense's id on its events.
+        self.assertEqual(BalanceEvent.objects.filter(expense_id=self.expense_id).count(), 4)
+        overall = self.client.get(reverse('overall-expenses')).data
+        self.assertEqual(overall['expense_count'], 1)
+        self._assert_ledger_consistent()
+
+    def test_cost_does_not_grow_with_ledger_size(self):
+        def count_queries(amount):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self._patch({"amount": amount}).status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        before = count_queries(100)
+        for _ in range(20):
+            self._create_expense(self.bob, [self.alice, self.bob, self.carol], 30)
+        self.assertEqual(count_queries(110), before)
@@ -1,12 +1,18 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from .models import User, Expense, Balance
+from .serializers import ExpenseSerializer, expense_rows
+from .views import expense_list_queryset
 
 
 class UserExpenseAPITestCase(APITestCase):
     def setUp(self):
         self.client = APIClient()
+        cache.clear()
 
         # Create users
         self.user1 = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
@@ -16,14 +22,14 @@ class UserExpenseAPITestCase(APITestCase):
         # Create expenses
         self.expense1 = Expense.objects.create(
             payer=self.user1,
-            amount=100,
+            amount=10000,
             split_method='equal'
         )
         self.expense1.participants.add(self.user2, self.user3)
 
         self.expense2 = Expense.objects.create(
             payer=self.user2,
-            amount=200,
+            amount=20000,
             split_method='exact',
             exact_splits={"1": 50, "3": 150}
         )
@@ -63,7 +69,7 @@ class UserExpenseAPITestCase(APITestCase):
     def test_expense_detail(self):
         response = self.client.get(reverse('expense-detail'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  
+        self.assertEqual(len(response.data['results']), 2)  
 
     def test_get_balance(self):
         self.expense1.split_expense()
@@ -83,10 +89,55 @@ class UserExpenseAPITestCase(APITestCase):
     def test_expense_split_exact(self):
         response = self.client.get(reverse('expense-split', kwargs={'expense_id': self.expense2.id}))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['shares'], [
+            {"user_id": self.user1.id, "amount": 50},
+            {"user_id": self.user3.id, "amount": 150},
+        ])
+        self.assertFalse(Balance.objects.exists())
         self.expense2.split_expense()  
         balance = Balance.objects.get(from_user=self.user1, to_user=self.user2)
         print(balance)
-        self.assertEqual(balance.amount, 100.0) 
+        self.assertEqual(balance.amount, 5000) 
+
+
+class ExpenseSerializerTestCase(APITestCase):
+    def setUp(self):
+        self.users = User.objects.bulk_create([
+            User(name=f"User {i}", email=f"user{i}@example.com", mobile=f"{i:010d}") for i in range(12)
+        ])
+        self.ids = [user.id for user in self.users]
+
+    def test_validation_resolves_users_in_one_query(self):
+        data = {"payer": self.ids[0], "participants": self.ids, "amount": 120, "split_method": "exact",
+                "exact_splits": {str(user_id): 10 for user_id in self.ids}}
+        with CaptureQueriesContext(connection) as context:
+            serializer = ExpenseSerializer(data=data)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(serializer.validated_data['payer'], self.users[0])
+        self.assertEqual(serializer.validated_data['participants'], self.users)
+
+    def test_split_keys_must_be_participants(self):
+        serializer = ExpenseSerializer(data={
+            "payer": self.ids[0], "participants": self.ids[:2], "amount": 100, "split_method": "percentage",
+            "percentage_splits": {str(self.ids[0]): 50, str(self.ids[5]): 50}})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("percentage_splits", serializer.errors)
+
+        serializer = ExpenseSerializer(data={"payer": self.ids[0], "participants": [self.ids[1], 99999],
+                                             "amount": 100, "split_method": "equal"})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("participants", serializer.errors)
+
+    def test_lean_rows_match_serializer(self):
+        group_expense = Expense.objects.create(payer=self.users[0], amount=12345, split_method='percentage',
+                                               percentage_splits={str(self.ids[1]): 100})
+        group_expense.participants.add(self.users[1])
+        plain = Expense.objects.create(payer=self.users[2], amount=500, split_method='equal')
+        plain.participants.add(self.users[2], self.users[3])
+
+        expenses = list(expense_list_queryset().order_by('id'))
+        self.assertEqual(expense_rows(expenses), ExpenseSerializer(expenses, many=True).data)
 
 
 if __name__ == '__main__':
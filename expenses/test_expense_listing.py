@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .models import User, Expense
+
+MOMENT = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class ExpenseListingTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+
+        self.expenses = []
+        for index in range(7):
+            expense = Expense.objects.create(
+                payer=self.alice if index % 2 == 0 else self.bob,
+                amount=100 * (index + 1),
+                split_method='equal' if index < 5 else 'exact',
+                exact_splits={str(self.bob.id): index + 1} if index >= 5 else None,
+            )
+            expense.participants.add(self.alice, self.bob)
+            self.expenses.append(expense)
+        # Several expenses share a timestamp so pages have to break ties on id.
+        Expense.objects.filter(id__in=[e.id for e in self.expenses[:4]]).update(created_at=MOMENT)
+        Expense.objects.filter(id__in=[e.id for e in self.expenses[4:]]).update(
+            created_at=datetime(2024, 4, 1, tzinfo=timezone.utc))
+
+    def _walk(self, url, params, key=None):
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page = response.data[key] if key else response.data
+            seen.extend(item['id'] for item in page['results'])
+            if not page['next']:
+                return seen
+            response = self.client.get(page['next'])
+
+    def test_keyset_pages_cover_every_expense_newest_first(self):
+        seen = self._walk(reverse('expense-detail'), {'limit': 3})
+        expected = [e.id for e in reversed(self.expenses[4:])] + [e.id for e in reversed(self.expenses[:4])]
+        self.assertEqual(seen, expected)
+
+    def test_query_count_is_bounded_per_page(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('expense-detail'), {'limit': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('expense-detail'), {'limit': 7})
+
+    def test_filters(self):
+        response = self.client.get(reverse('expense-detail'), {'payer': self.bob.id})
+        self.assertEqual({item['payer'] for item in response.data['results']}, {self.bob.id})
+
+        response = self.client.get(reverse('expense-detail'), {'split_method': 'exact'})
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.client.get(reverse('expense-detail'), {'created_before': '2024-03-01'})
+        self.assertEqual(len(response.data['results']), 4)
+
+        response = self.client.get(reverse('expense-detail'), {'created_after': '2024-03-02T00:00:00Z'})
+        self.assertEqual(len(response.data['results']), 3)
+
+        response = self.client.get(reverse('expense-detail'), {'split_method': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('expense-detail'), {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_user_expenses_are_paginated_independently(self):
+        url = reverse('user-expenses', kwargs={'user_id': self.alice.id})
+        paid = self._walk(url, {'limit': 2}, key='paid_expenses')
+        self.assertEqual(sorted(paid), [e.id for e in self.expenses if e.payer_id == self.alice.id])
+
+        participated = self._walk(url, {'limit': 2}, key='participated_expenses')
+        self.assertEqual(sorted(participated), [e.id for e in self.expenses])
@@ -0,0 +1,88 @@
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipIf
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from . import exports
+from .models import User, Expense
+
+
+@skipIf(exports.pa is None, "pyarrow is not installed")
+class ParquetExportTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self._create(self.alice, 10, "equal")
+        self._create(self.bob, 30, "exact", exact_splits={str(self.alice.id): 20, str(self.bob.id): 10})
+
+    def _create(self, payer, amount, split_method, **splits):
+        response = self.client.post(reverse('expense-create'), {
+            "payer": payer.id, "participants": [self.alice.id, self.bob.id], "amount": amount,
+            "split_method": split_method, **splits}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def _read(self, table, params=None):
+        response = self.client.get(reverse('parquet-export', kwargs={'table': table}), params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return exports.pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_exports_typed_columns(self):
+        expenses = self._read('expenses')
+        self.assertEqual(expenses.schema, exports.SCHEMAS['expenses'])
+        self.assertEqual(expenses.column('amount_cents').to_pylist(), [1000, 3000])
+        self.assertEqual(expenses.column('split_method').to_pylist(), ['equal', 'exact'])
+
+        shares = self._read('expense_participants').to_pylist()
+        self.assertEqual([(row['user_id'], row['share_cents']) for row in shares],
+                         [(self.alice.id, 500), (self.bob.id, 500), (self.alice.id, 2000), (self.bob.id, 1000)])
+
+        balances = self._read('balances').to_pylist()
+        self.assertEqual(balances, [{'group_id': None, 'debtor_id': self.alice.id, 'creditor_id': self.bob.id,
+                                     'owed_cents': 1500}])
+
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+        self.assertEqual(self._read('expenses', {'created_after': tomorrow}).num_rows, 0)
+
+    def test_errors(self):
+        response = self.client.get(reverse('parquet-export', kwargs={'table': 'users'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('parquet-export', kwargs={'table': 'expenses'}), {'created_after': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch.object(exports, 'pa', None):
+            response = self.client.get(reverse('parquet-export', kwargs={'table': 'expenses'}))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_incremental_snapshot(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+
+        def export(*args):
+            out = io.StringIO()
+            call_command('export_snapshot', '--output-dir', str(directory), '--settle-seconds', '0', *args,
+                         stdout=out)
+            return out.getvalue()
+
+        self.assertIn("Exported 2 new expenses", export())
+        self.assertIn("Exported 0 new expenses", export())
+        new_id = self._create(self.alice, 5, "equal")
+        self.assertIn("Exported 1 new expenses", export())
+
+        dataset = exports.pq.ParquetDataset(directory / 'expenses')
+        self.assertEqual(sorted(dataset.read().column('id').to_pylist()), [*Expense.objects.exclude(
+            id=new_id).values_list('id', flat=True), new_id])
+        manifest = json.loads((directory / 'manifest.json').read_text())
+        self.assertEqual([part['expenses'] for part in manifest['parts']], [2, 1])
+        self.assertEqual(exports.pq.read_table(directory / 'balances.parquet').num_rows, 1)
+
+        self.assertIn("Exported 3 new expenses", export('--full'))
+        self.assertEqual(len(list((directory / 'expenses').glob('*.parquet'))), 1)
@@ -0,0 +1,125 @@
+import csv
+import io
+
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .balances import apply_balance_deltas, owed_amount
+from .models import User, Group, Balance
+
+
+class GroupLedgerTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.carol = User.objects.create(name="Carol", email="carol@example.com", mobile="1122334455")
+
+        response = self.client.post(reverse('group-create'), {
+            "name": "Trip", "members": [self.alice.id, self.bob.id]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.trip = Group.objects.get(id=response.data['id'])
+
+    def _create_expense(self, payer, participants, amount, group=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('expense-create'), {
+                "group": group.id if group else None,
+                "payer": payer.id,
+                "participants": [participant.id for participant in participants],
+                "amount": amount,
+                "split_method": "equal"
+            }, format='json')
+
+    def test_group_and_ungrouped_ledgers_are_separate_rows(self):
+        self.assertEqual(self._create_expense(self.alice, [self.alice, self.bob], 100, self.trip).status_code,
+                         status.HTTP_201_CREATED)
+        self.assertEqual(self._create_expense(self.bob, [self.alice, self.bob], 30).status_code,
+                         status.HTTP_201_CREATED)
+
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id, group_id=self.trip.id), 5000)
+        self.assertEqual(owed_amount(self.alice.id, self.bob.id), 1500)
+        self.assertEqual(Balance.objects.count(), 2)
+
+        # Upserts hit the row of the right ledger.
+        apply_balance_deltas([(self.bob.id, self.alice.id, 100)], group_id=self.trip.id)
+        apply_balance_deltas([(self.bob.id, self.alice.id, 100)])
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id, group_id=self.trip.id), 5100)
+        self.assertEqual(owed_amount(self.alice.id, self.bob.id), 1400)
+
+        # Global reads net the pair across ledgers, group reads do not.
+        response = self.client.get(reverse('get-balance', kwargs={'user_id': self.bob.id}))
+        self.assertEqual(response.data, [{"to_user": "Alice", "amount": 37}])
+        response = self.client.get(reverse('group-balance', kwargs={'group_id': self.trip.id, 'user_id': self.bob.id}))
+        self.assertEqual(response.data, [{"to_user": "Alice", "amount": 51}])
+
+    def test_non_members_are_rejected(self):
+        response = self._create_expense(self.alice, [self.alice, self.carol], 100, self.trip)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('group', response.data)
+
+        response = self.client.get(
+            reverse('group-balance', kwargs={'group_id': self.trip.id, 'user_id': self.carol.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(reverse('group-members', kwargs={'group_id': self.trip.id}),
+                                    {"members": [self.carol.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['members'], [self.alice.id, self.bob.id, self.carol.id])
+        self.assertEqual(self._create_expense(self.alice, [self.alice, self.carol], 100, self.trip).status_code,
+                         status.HTTP_201_CREATED)
+
+    def test_group_overall_only_counts_group_expenses(self):
+        self._create_expense(self.alice, [self.alice, self.bob], 100, self.trip)
+        self._create_expense(self.carol, [self.alice, self.carol], 999)
+
+        overall = self.client.get(reverse('group-overall', kwargs={'group_id': self.trip.id})).data
+        self.assertEqual(overall['total_expenses'], 100)
+        self.assertEqual(overall['expense_count'], 1)
+        self.assertEqual(overall['user_summaries'], [
+            {"user_id": self.alice.id, "name": "Alice", "total_paid": 100, "total_participated": 100},
+            {"user_id": self.bob.id, "name": "Bob", "total_paid": 0, "total_participated": 100},
+        ])
+        self.assertEqual([expense['group'] for expense in overall['recent_expenses']], [self.trip.id])
+
+        # Group reads are cached and bumped by writes to the group.
+        self._create_expense(self.bob, [self.alice], 10, self.trip)
+        overall = self.client.get(reverse('group-overall', kwargs={'group_id': self.trip.id})).data
+        self.assertEqual(overall['expense_count'], 2)
+
+        listing = self.client.get(reverse('expense-detail'), {'group': self.trip.id}).data
+        self.assertEqual(len(listing['results']), 2)
+
+    def test_group_sheet_and_settlement_plan(self):
+        self._create_expense(self.alice, [self.alice, self.bob], 100, self.trip)
+        self._create_expense(self.carol, [self.alice, self.carol], 40)
+
+        response = self.client.get(reverse('group-balance-sheet', kwargs={'group_id': self.trip.id}))
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertIn(['Alice', '(Owed by Bob)', '50.00', '100.00', '100.00', '0.00'], rows)
+        self.assertNotIn('Carol', [row[0] for row in rows if row])
+        self.assertEqual(rows[-2:], [['Total Expenses', '100.00'], ['Number of Expenses', '1']])
+
+        plan = self.client.get(reverse('group-settlement-plan', kwargs={'group_id': self.trip.id})).data
+        self.assertEqual(plan['transfers'], [{"from_user": self.bob.id, "to_user": self.alice.id, "amount": 50}])
+
+        response = self.client.get(reverse('group-overall', kwargs={'group_id': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_create_applies_each_group_ledger(self):
+        response = self.client.post(reverse('expense-bulk-create'), [
+            {"group": self.trip.id, "payer": self.alice.id, "participants": [self.bob.id],
+             "amount": 20, "split_method": "equal"},
+            {"payer": self.alice.id, "participants": [self.bob.id], "amount": 5, "split_method": "equal"},
+            {"group": self.trip.id, "payer": self.alice.id, "participants": [self.carol.id],
+             "amount": 5, "split_method": "equal"},
+            {"group": 999, "payer": self.alice.id, "participants": [self.bob.id],
+             "amount": 5, "split_method": "equal"},
+            # A string id is accepted like an integer one.
+            {"group": str(self.trip.id), "payer": self.alice.id, "participants": [self.bob.id],
+             "amount": 10, "split_method": "equal"},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['index'] for item in response.data['errors']], [2, 3])
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id, group_id=self.trip.id), 3000)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 500)
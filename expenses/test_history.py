@@ -0,0 +1,96 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .balances import apply_balance_deltas
+from .history import replay_balances, take_snapshot
+from .models import User, Balance, BalanceEvent, BalanceSnapshot
+
+
+class BalanceHistoryTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.carol = User.objects.create(name="Carol", email="carol@example.com", mobile="1122334455")
+
+    def _create_expense(self, payer, participants, amount, on):
+        response = self.client.post(reverse('expense-create'), {
+            "payer": payer.id,
+            "participants": [participant.id for participant in participants],
+            "amount": amount,
+            "split_method": "equal"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        BalanceEvent.objects.filter(expense_id=response.data['id']).update(created_at=on)
+        return response.data['id']
+
+    def _stored_balances(self):
+        return {
+            (group_id, from_user_id, to_user_id): amount
+            for group_id, from_user_id, to_user_id, amount in Balance.objects.exclude(amount=0).values_list(
+                'group_id', 'from_user_id', 'to_user_id', 'amount')
+        }
+
+    def test_splits_append_attributed_events(self):
+        expense_id = self._create_expense(self.alice, [self.alice, self.bob, self.carol], 90,
+                                          datetime(2024, 3, 1, tzinfo=timezone.utc))
+        events = BalanceEvent.objects.filter(expense_id=expense_id).order_by('to_user_id')
+        self.assertEqual([(e.from_user_id, e.to_user_id, e.amount) for e in events], [
+            (self.alice.id, self.bob.id, -3000),
+            (self.alice.id, self.carol.id, -3000),
+        ])
+
+        response = self.client.post(reverse('expense-bulk-create'), [
+            {"payer": self.bob.id, "participants": [self.alice.id], "amount": 10, "split_method": "equal"},
+            {"payer": self.bob.id, "participants": [self.alice.id], "amount": 5, "split_method": "equal"},
+        ], format='json')
+        for item, amount in zip(response.data['created'], [1000, 500]):
+            self.assertEqual(list(BalanceEvent.objects.filter(expense_id=item['id']).values_list('amount', flat=True)),
+                             [amount])
+
+    def test_replay_as_of_past_moments(self):
+        self._create_expense(self.alice, [self.alice, self.bob], 100, datetime(2024, 3, 1, tzinfo=timezone.utc))
+        self._create_expense(self.bob, [self.alice, self.bob], 40, datetime(2024, 3, 10, tzinfo=timezone.utc))
+
+        pair = (None, self.alice.id, self.bob.id)
+        self.assertEqual(replay_balances(datetime(2024, 2, 1, tzinfo=timezone.utc)), {})
+        self.assertEqual(replay_balances(datetime(2024, 3, 5, tzinfo=timezone.utc)), {pair: -5000})
+        self.assertEqual(replay_balances(datetime(2024, 3, 11, tzinfo=timezone.utc), pair=(self.bob.id, self.alice.id)),
+                         {pair: -3000})
+        self.assertEqual(replay_balances(django_timezone.now()), self._stored_balances())
+
+        response = self.client.get(reverse('balance-as-of', kwargs={'user_id': self.bob.id}), {'as_of': '2024-03-05'})
+        self.assertEqual(response.data, [{"to_user": "Alice", "amount": 50}])
+        response = self.client.get(reverse('balance-as-of', kwargs={'user_id': self.bob.id}), {'as_of': '2024-02-05'})
+        self.assertEqual(response.data, [])
+        response = self.client.get(reverse('balance-as-of', kwargs={'user_id': self.bob.id}), {'as_of': 'someday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_snapshots_seed_replay(self):
+        self._create_expense(self.alice, [self.alice, self.bob], 100, datetime(2024, 3, 1, tzinfo=timezone.utc))
+        self._create_expense(self.carol, [self.bob, self.carol], 60, datetime(2024, 3, 2, tzinfo=timezone.utc))
+        first = take_snapshot(settle=timedelta(0))
+        self.assertEqual(first.as_of, datetime(2024, 3, 2, tzinfo=timezone.utc))
+        self.assertEqual(first.rows.count(), 2)
+        self.assertIsNone(take_snapshot(settle=timedelta(0)))
+
+        self._create_expense(self.bob, [self.alice, self.bob], 100, datetime(2024, 3, 3, tzinfo=timezone.utc))
+        apply_balance_deltas([(self.bob.id, self.carol.id, 500)])
+        second = take_snapshot(settle=timedelta(0))
+        # Alice and Bob are square again, so the compacted snapshot drops them.
+        self.assertEqual(second.rows.count(), 1)
+        self.assertEqual(replay_balances(django_timezone.now()), self._stored_balances())
+
+        # Replays before the newest snapshot fall back to an older one.
+        with self.assertNumQueries(3):
+            self.assertEqual(replay_balances(datetime(2024, 3, 2, 12, tzinfo=timezone.utc), user_id=self.alice.id),
+                             {(None, self.alice.id, self.bob.id): -5000})
+
+        out = io.StringIO()
+        call_command('snapshot_balances', keep=1, stdout=out)
+        self.assertEqual(list(BalanceSnapshot.objects.values_list('id', flat=True)), [second.id])
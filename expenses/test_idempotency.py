@@ -0,0 +1,67 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .balances import owed_amount
+from .models import User, Expense, BalanceEvent, IdempotencyKey
+
+
+class IdempotencyKeyTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.data = {"payer": self.alice.id, "participants": [self.alice.id, self.bob.id],
+                     "amount": 50, "split_method": "equal"}
+
+    def _post(self, data, key):
+        return self.client.post(reverse('expense-create'), data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self._post(self.data, 'retry-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as context:
+            second = self._post(self.data, 'retry-1')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+        self.assertEqual(Expense.objects.count(), 1)
+        self.assertEqual(BalanceEvent.objects.count(), 1)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 2500)
+
+        # A new key is a new expense.
+        self.assertEqual(self._post(self.data, 'retry-2').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Expense.objects.count(), 2)
+
+    def test_key_reused_for_different_request(self):
+        self._post(self.data, 'reused')
+        response = self._post({**self.data, "amount": 60}, 'reused')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_failed_requests_are_not_stored(self):
+        response = self._post({**self.data, "participants": []}, 'bad')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self._post(self.data, 'bad').status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self._post(self.data, 'x' * 256).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_removes_expired_keys(self):
+        self._post(self.data, 'old')
+        self._post(self.data, 'new')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(days=2))
+
+        out = io.StringIO()
+        call_command('prune_idempotency_keys', '--batch-size', '1', stdout=out)
+        self.assertIn("Pruned 1 idempotency keys", out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
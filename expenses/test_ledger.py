@@ -0,0 +1,63 @@
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .models import User, UserLedgerSummary
+
+
+class UserLedgerSummaryTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+
+    def _create_expense(self, payer, participants, amount):
+        data = {
+            "payer": payer.id,
+            "participants": [participant.id for participant in participants],
+            "amount": amount,
+            "split_method": "equal"
+        }
+        response = self.client.post(reverse('expense-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_summary_updated_on_create(self):
+        self._create_expense(self.alice, [self.alice, self.bob], 100)
+        self._create_expense(self.bob, [self.alice], 40)
+
+        alice = UserLedgerSummary.objects.get(user=self.alice)
+        self.assertEqual(alice.total_paid, 10000)
+        self.assertEqual(alice.total_participated, 14000)
+        self.assertEqual(alice.expense_count, 2)
+        self.assertEqual(alice.net_balance, -4000)
+
+        bob = UserLedgerSummary.objects.get(user=self.bob)
+        self.assertEqual((bob.total_paid, bob.total_participated, bob.expense_count), (4000, 10000, 2))
+
+        response = self.client.get(reverse('user-expenses', kwargs={'user_id': self.alice.id}))
+        self.assertEqual(response.data['total_paid'], 100)
+        self.assertEqual(response.data['total_participated'], 140)
+
+    def test_summary_updated_on_bulk_create(self):
+        data = [
+            {"payer": self.alice.id, "participants": [self.bob.id], "amount": 10, "split_method": "equal"},
+            {"payer": self.alice.id, "participants": [self.bob.id], "amount": 20, "split_method": "equal"},
+        ]
+        self.client.post(reverse('expense-bulk-create'), data, format='json')
+        self.assertEqual(UserLedgerSummary.objects.get(user=self.alice).total_paid, 3000)
+        self.assertEqual(UserLedgerSummary.objects.get(user=self.bob).expense_count, 2)
+
+    def test_rebuild_command_detects_and_repairs_drift(self):
+        self._create_expense(self.alice, [self.alice, self.bob], 100)
+        call_command('rebuild_ledger_summary', '--check', stdout=io.StringIO())
+
+        UserLedgerSummary.objects.filter(user=self.bob).update(total_participated=1)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_ledger_summary', '--check', stdout=io.StringIO())
+
+        call_command('rebuild_ledger_summary', stdout=io.StringIO())
+        self.assertEqual(UserLedgerSummary.objects.get(user=self.bob).total_participated, 10000)
+        call_command('rebuild_ledger_summary', '--check', stdout=io.StringIO())
@@ -0,0 +1,62 @@
+import io
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from .metrics import reset_metrics
+from .models import User, SlowRequest
+
+
+class RequestMetricsTestCase(APITestCase):
+    def setUp(self):
+        sample_everything = self.settings(METRICS_SAMPLE_RATE=1.0)
+        sample_everything.enable()
+        self.addCleanup(sample_everything.disable)
+        reset_metrics()
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+
+    def test_server_timing_and_prometheus_histograms(self):
+        response = self.client.get(reverse('overall-expenses'))
+        self.assertRegex(response['Server-Timing'], r'^view;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+
+        with self.settings(METRICS_SAMPLE_RATE=0):
+            response = self.client.get(reverse('get-balance', kwargs={'user_id': self.alice.id}))
+        self.assertRegex(response['Server-Timing'], r'^view;dur=[\d.]+$')
+
+        metrics = self.client.get('/metrics')
+        self.assertEqual(metrics['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = metrics.content.decode()
+        self.assertIn('expense_http_requests_total{route="api/expenses/overall/",method="GET",status="200"} 1', body)
+        self.assertIn('expense_http_request_queries_count{route="api/expenses/overall/",method="GET"} 1', body)
+        self.assertIn('expense_http_request_duration_seconds_bucket'
+                      '{route="api/balances/<int:user_id>/",method="GET",le="+Inf"} 1', body)
+        # Unsampled requests get no SQL histogram.
+        self.assertNotIn('expense_http_request_queries_count{route="api/balances/<int:user_id>/"', body)
+
+    async def test_async_views_are_measured_without_a_thread_hop(self):
+        response = await self.async_client.get(reverse('async-get-balance', kwargs={'user_id': self.alice.id}))
+        self.assertEqual(response.status_code, 200)
+        # The recorder sees the ORM queries the async view ran in its executor thread.
+        self.assertRegex(response['Server-Timing'], r'^view;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries"$')
+
+    def test_streaming_response_is_measured_when_consumed(self):
+        response = self.client.get(reverse('download-balance-sheet'))
+        size = len(b''.join(response.streaming_content))
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn(f'expense_http_response_size_bytes_sum{{route="api/balances/download/",method="GET"}} {size}',
+                      body)
+
+    @override_settings(METRICS_SLOW_REQUEST_QUERIES=2)
+    def test_slow_queries_report(self):
+        for _ in range(3):
+            self.client.get(reverse('user-detail', kwargs={'pk': self.alice.id}))
+        self.client.get(reverse('overall-expenses'))
+        self.assertTrue(SlowRequest.objects.exists())
+
+        out = io.StringIO()
+        call_command('slow_queries', '--order-by', 'queries', stdout=out)
+        self.assertIn("GET /api/expenses/overall/", out.getvalue())
+        self.assertIn("slowest", out.getvalue())
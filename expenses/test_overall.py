@@ -0,0 +1,56 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .models import User, Expense
+
+
+class OverallExpensesTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = User.objects.bulk_create([
+            User(name=f"User {i}", email=f"user{i}@example.com", mobile=f"{i:010d}")
+            for i in range(5)
+        ])
+        for index, payer in enumerate(self.users):
+            expense = Expense.objects.create(payer=payer, amount=1000 * (index + 1), split_method='equal')
+            expense.participants.set(self.users[:index + 1])
+        call_command('rebuild_ledger_summary', stdout=io.StringIO())
+
+    def test_totals(self):
+        response = self.client.get(reverse('overall-expenses'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_expenses'], 150)
+        self.assertEqual(response.data['expense_count'], 5)
+
+        summaries = {item['user_id']: item for item in response.data['user_summaries']['results']}
+        self.assertEqual(summaries[self.users[0].id]['total_paid'], 10)
+        # The first user takes part in every expense.
+        self.assertEqual(summaries[self.users[0].id]['total_participated'], 150)
+        self.assertEqual(summaries[self.users[4].id]['total_participated'], 50)
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(4):
+            self.client.get(reverse('overall-expenses'))
+
+        User.objects.bulk_create([
+            User(name=f"Extra {i}", email=f"extra{i}@example.com", mobile=f"9{i:09d}")
+            for i in range(50)
+        ])
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.client.get(reverse('overall-expenses'))
+
+    def test_user_summaries_cursor_pagination(self):
+        response = self.client.get(reverse('overall-expenses'), {'limit': 2})
+        page = response.data['user_summaries']
+        self.assertEqual([item['user_id'] for item in page['results']], [u.id for u in self.users[:2]])
+
+        seen = [item['user_id'] for item in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).data['user_summaries']
+            seen.extend(item['user_id'] for item in page['results'])
+        self.assertEqual(seen, [u.id for u in self.users])
@@ -0,0 +1,135 @@
+import io
+import random
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from .balances import owed_amount
+from .models import User, Expense, ExpenseParticipant, Group, Balance, BalanceEvent
+from .recompute import balance_drift, correct_drift, expected_balances, np
+
+
+def seed_equal_expenses(users, count, seed):
+    rng = random.Random(seed)
+    user_ids = [user.id for user in users]
+    expenses = Expense.objects.bulk_create([
+        Expense(payer_id=rng.choice(user_ids), amount=rng.randint(1, 100000), split_method='equal')
+        for _ in range(count)
+    ])
+    ExpenseParticipant.objects.bulk_create([
+        ExpenseParticipant(expense_id=expense.id, user_id=user_id)
+        for expense in expenses
+        for user_id in rng.sample(user_ids, rng.randint(1, len(user_ids)))
+    ])
+
+
+class RebuildBalancesTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = User.objects.bulk_create([
+            User(name=f"User {i}", email=f"user{i}@example.com", mobile=f"{i:010d}") for i in range(7)
+        ])
+        self.alice, self.bob, self.carol = self.users[:3]
+        trip = Group.objects.create(name="Trip")
+        trip.members.add(self.alice, self.bob, self.carol)
+        for data in [
+            {"payer": self.alice.id, "participants": [self.alice.id, self.bob.id, self.carol.id], "amount": 100},
+            {"payer": self.bob.id, "participants": [self.alice.id, self.carol.id], "amount": 33.33,
+             "group": trip.id},
+            {"payer": self.carol.id, "participants": [self.alice.id, self.bob.id], "amount": 50,
+             "split_method": "exact", "exact_splits": {str(self.alice.id): 20.5, str(self.bob.id): 29.5}},
+            {"payer": self.alice.id, "participants": [self.bob.id, self.carol.id], "amount": 10,
+             "split_method": "percentage", "percentage_splits": {str(self.bob.id): 33.3, str(self.carol.id): 66.7}},
+        ]:
+            response = self.client.post(reverse('expense-create'), {"split_method": "equal", **data}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def _run(self, *args):
+        out = io.StringIO()
+        call_command('rebuild_balances', *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_check_passes_on_consistent_ledger(self):
+        self.assertIn("Balances are consistent", self._run('--check'))
+
+    def test_detects_and_corrects_drift(self):
+        Balance.objects.filter(from_user=self.alice, to_user=self.bob, group__isnull=True).update(amount=1)
+        Balance.objects.filter(group__isnull=False).delete()
+        Balance.objects.create(from_user=self.users[5], to_user=self.users[6], amount=700)
+
+        with self.assertRaises(CommandError):
+            self._run('--check')
+
+        output = self._run()
+        self.assertIn("Corrected 4 balance pairs", output)
+        self.assertIn("Balances are consistent", self._run('--check'))
+        self.assertEqual(owed_amount(self.users[5].id, self.users[6].id), 0)
+
+        # Corrections go through the upsert path and are logged as events.
+        self.assertEqual(BalanceEvent.objects.filter(expense__isnull=True).count(), 4)
+
+    def test_vectorised_and_reference_paths_agree(self):
+        seed_equal_expenses(self.users, 400, seed=7)
+        Expense.objects.create(payer=self.alice, amount=100, split_method='equal')
+
+        reference, reference_errors = expected_balances(chunk_size=64, vectorised=False)
+        self.assertEqual(len(reference_errors), 1)
+        if np is None:
+            self.skipTest("NumPy is not installed")
+        self.assertEqual(expected_balances(chunk_size=64), (reference, reference_errors))
+
+
+class ParallelRebuildBalancesTestCase(TransactionTestCase):
+    def test_workers_match_single_process(self):
+        users = User.objects.bulk_create([
+            User(name=f"User {i}", email=f"user{i}@example.com", mobile=f"{i:010d}") for i in range(10)
+        ])
+        seed_equal_expenses(users, 300, seed=3)
+        self.assertEqual(expected_balances(workers=3, chunk_size=50), expected_balances(chunk_size=50))
+
+
+class ConcurrentRebuildBalancesTestCase(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self._create(10)
+
+    def _create(self, amount):
+        response = self.client.post(reverse('expense-create'), {
+            "payer": self.alice.id, "participants": [self.alice.id, self.bob.id], "amount": amount,
+            "split_method": "equal"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_expense_committed_between_reads_is_not_corrected(self):
+        def expected_then_write(*args):
+            result = expected_balances(*args)
+            # Commits after the history was read, before the stored rows are.
+            self._create(40)
+            return result
+
+        with mock.patch('expenses.management.commands.rebuild_balances.expected_balances',
+                        side_effect=expected_then_write):
+            out = io.StringIO()
+            call_command('rebuild_balances', stdout=out, stderr=io.StringIO())
+        self.assertIn("0 drifted", out.getvalue())
+        self.assertIn("Corrected 0 balance pairs", out.getvalue())
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 2500)
+        self.assertEqual(BalanceEvent.objects.filter(expense__isnull=True).count(), 0)
+
+    def test_correct_drift_rechecks_stale_pairs(self):
+        expected, _ = expected_balances()
+        self._create(40)
+        drift = balance_drift(expected)
+        self.assertEqual(len(drift), 1)
+        self.assertEqual(correct_drift(drift), [])
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 2500)
+
+        Balance.objects.update(amount=1)
+        [(_, _, _, stored, wanted)] = correct_drift(balance_drift(expected_balances()[0]))
+        self.assertEqual((stored, wanted), (1, -2500))
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 2500)
@@ -0,0 +1,139 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .balances import owed_amount
+from .jobs import claim_job, requeue_stale_jobs, run_job
+from .models import User, Balance, ReportJob
+from .recompute import expected_balances
+
+
+class ReportJobTestCase(APITestCase):
+    def setUp(self):
+        self.reports_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.reports_dir)
+        override = override_settings(REPORTS_DIR=self.reports_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        for payer, participants, amount in [(self.alice, [self.alice, self.bob], 50), (self.bob, [self.alice], 10)]:
+            response = self.client.post(reverse('expense-create'), {
+                "payer": payer.id, "participants": [user.id for user in participants],
+                "amount": amount, "split_method": "equal"}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def _submit(self, kind, params=None):
+        response = self.client.post(reverse('report-create'), {"kind": kind, "params": params or {}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED, response.data)
+        self.assertEqual(response['Location'], reverse('report-detail', kwargs={'pk': response.data['id']}))
+        return response.data['id']
+
+    def _run_workers(self):
+        out = io.StringIO()
+        call_command('run_workers', '--processes', '1', '--once', stdout=out)
+        return out.getvalue()
+
+    def test_submit_poll_download(self):
+        sheet_id = self._submit('balance_sheet')
+        statement_id = self._submit('user_statement', {"user_id": self.alice.id})
+
+        poll = self.client.get(reverse('report-detail', kwargs={'pk': sheet_id}))
+        self.assertEqual(poll.data['status'], 'pending')
+        self.assertIsNone(poll.data['download'])
+        early = self.client.get(reverse('report-download', kwargs={'pk': sheet_id}))
+        self.assertEqual(early.status_code, status.HTTP_409_CONFLICT)
+
+        output = self._run_workers()
+        self.assertIn(f"Job {sheet_id}: done", output)
+        self.assertIn(f"Job {statement_id}: done", output)
+
+        poll = self.client.get(reverse('report-detail', kwargs={'pk': sheet_id}))
+        self.assertEqual(poll.data['status'], 'done')
+        sheet = self.client.get(poll.data['download'])
+        self.assertEqual(sheet.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(sheet.streaming_content),
+                         b''.join(self.client.get(reverse('download-balance-sheet')).streaming_content))
+
+        statement = self.client.get(reverse('report-download', kwargs={'pk': statement_id}))
+        lines = b''.join(statement.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "Expense ID,Date,Group,Payer,Amount,Split Method,Your Share,Net")
+        self.assertEqual(len([line for line in lines[1:] if line and line[0].isdigit()]), 2)
+        # Alice paid 50 and owes 25 + 10.
+        self.assertEqual(lines[-1], "Net,15.00")
+
+    def test_invalid_requests(self):
+        for data in [{"kind": "nope"}, {"kind": "user_statement", "params": {}},
+                     {"kind": "user_statement", "params": {"user_id": 999}},
+                     {"kind": "balance_sheet", "params": {"group": 999}}]:
+            response = self.client.post(reverse('report-create'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_ledger_recompute_fixes_drift(self):
+        Balance.objects.filter(from_user=self.alice, to_user=self.bob).update(amount=0)
+        job_id = self._submit('ledger_recompute', {"fix": True})
+        self._run_workers()
+
+        job = self.client.get(reverse('report-detail', kwargs={'pk': job_id})).data
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['drifted'], 1)
+        self.assertEqual(job['result']['corrected'], 1)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 1500)
+
+    def test_ledger_recompute_leaves_concurrent_writes_alone(self):
+        def expected_then_write(**kwargs):
+            result = expected_balances(**kwargs)
+            # A web request commits while the job is between its two reads.
+            response = self.client.post(reverse('expense-create'), {
+                "payer": self.alice.id, "participants": [self.alice.id, self.bob.id], "amount": 40,
+                "split_method": "equal"}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return result
+
+        job_id = self._submit('ledger_recompute', {"fix": True})
+        with mock.patch('expenses.jobs.expected_balances', side_effect=expected_then_write):
+            self.assertEqual(run_job(claim_job()), 'done')
+
+        result = ReportJob.objects.get(id=job_id).result
+        self.assertEqual((result['drifted'], result['corrected']), (0, 0))
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 3500)
+
+    def test_failed_and_stale_jobs(self):
+        job = ReportJob.objects.create(kind='user_statement', params={})
+        self.assertEqual(run_job(claim_job()), 'failed')
+        job.refresh_from_db()
+        self.assertIn("KeyError", job.error)
+
+        stale = ReportJob.objects.create(kind='balance_sheet')
+        self.assertEqual(claim_job(), stale.id)
+        self.assertIsNone(claim_job())
+        # A job the caller is still running is never requeued.
+        self.assertEqual(requeue_stale_jobs(older_than=timedelta(seconds=-1), exclude_ids=[stale.id]), (0, 0))
+        self.assertEqual(requeue_stale_jobs(older_than=timedelta(seconds=-1)), (1, 0))
+        self.assertEqual(claim_job(), stale.id)
+
+    def test_heartbeat_keeps_job_and_lost_lease_keeps_outcome(self):
+        job = ReportJob.objects.create(kind='balance_sheet')
+        claim_job()
+        # A fresh heartbeat keeps a long-running job from counting as stale.
+        ReportJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(requeue_stale_jobs(older_than=timedelta(minutes=5)), (0, 0))
+
+        # Requeued and failed under a slow worker: that worker must not mark it done.
+        ReportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1), attempts=3)
+        self.assertEqual(requeue_stale_jobs(older_than=timedelta(minutes=5)), (0, 1))
+        self.assertEqual(run_job(job.id), 'lost')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.result_path, '')
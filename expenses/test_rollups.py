@@ -0,0 +1,109 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .models import User, Expense, DailyUserRollup
+
+
+class UserStatementTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.carol = User.objects.create(name="Carol", email="carol@example.com", mobile="1112223334")
+        self.equal_id = self._create({"payer": self.alice.id, "participants": [self.alice.id, self.bob.id],
+                                      "amount": 10, "split_method": "equal"})
+        self._create({"payer": self.bob.id, "participants": [self.alice.id, self.carol.id], "amount": 30,
+                      "split_method": "exact",
+                      "exact_splits": {str(self.alice.id): 20, str(self.carol.id): 10}})
+
+    def _create(self, data):
+        response = self.client.post(reverse('expense-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def _statement(self, user, **params):
+        response = self.client.get(reverse('user-statement', kwargs={'user_id': user.id}), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_statement_breaks_down_by_split_method_and_counterparty(self):
+        data = self._statement(self.alice)
+        self.assertEqual(data['granularity'], 'month')
+        self.assertEqual(data['totals'], {
+            'paid': Decimal('10.00'), 'share': Decimal('25.00'), 'lent': Decimal('5.00'),
+            'borrowed': Decimal('20.00'), 'net': Decimal('-15.00'), 'expense_count': 2})
+        [period] = data['periods']
+        self.assertEqual(period['start'], timezone.localdate().replace(day=1))
+        self.assertEqual(period['by_split_method'], {
+            'equal': {'paid': Decimal('10.00'), 'share': Decimal('5.00'), 'expense_count': 1},
+            'exact': {'paid': Decimal('0.00'), 'share': Decimal('20.00'), 'expense_count': 1},
+        })
+        self.assertEqual(period['counterparties'], [{
+            'user_id': self.bob.id, 'name': 'Bob', 'lent': Decimal('5.00'), 'borrowed': Decimal('20.00'),
+            'net': Decimal('-15.00'), 'expense_count': 2}])
+
+        # Carol only shared an expense Bob paid, so Alice is not her counterparty.
+        [period] = self._statement(self.carol, granularity='day')['periods']
+        self.assertEqual(period['start'], timezone.localdate())
+        self.assertEqual([row['user_id'] for row in period['counterparties']], [self.bob.id])
+
+    def test_window_excludes_other_days(self):
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        data = self._statement(self.alice, **{'from': tomorrow, 'to': tomorrow, 'granularity': 'week'})
+        self.assertEqual(data['periods'], [])
+        self.assertEqual(data['totals']['expense_count'], 0)
+
+    def test_edits_and_deletes_move_rollups(self):
+        response = self.client.patch(reverse('expense-item', kwargs={'expense_id': self.equal_id}),
+                                     {"amount": 40}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._statement(self.bob)['totals']['share'], Decimal('20.00'))
+
+        response = self.client.delete(reverse('expense-item', kwargs={'expense_id': self.equal_id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        totals = self._statement(self.alice)['totals']
+        self.assertEqual((totals['paid'], totals['share'], totals['expense_count']),
+                         (Decimal('0.00'), Decimal('20.00'), 1))
+
+    def test_bulk_upload_updates_rollups(self):
+        response = self.client.post(reverse('expense-bulk-create'), {"expenses": [
+            {"payer": self.carol.id, "participants": [self.carol.id, self.alice.id], "amount": 8,
+             "split_method": "equal"},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        [period] = self._statement(self.carol)['periods']
+        self.assertEqual(period['paid'], Decimal('8.00'))
+        self.assertEqual({row['user_id']: row['net'] for row in period['counterparties']},
+                         {self.alice.id: Decimal('4.00'), self.bob.id: Decimal('-10.00')})
+
+    def test_errors(self):
+        url = reverse('user-statement', kwargs={'user_id': self.alice.id})
+        for params in ({'granularity': 'year'}, {'from': 'x'}, {'from': '2024-02-01', 'to': '2024-01-01'}):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('user-statement', kwargs={'user_id': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_backfill_rebuilds_rollups(self):
+        call_command('backfill_rollups', '--check', stdout=io.StringIO())
+        expected = list(DailyUserRollup.objects.order_by('id').values_list(
+            'user_id', 'day', 'split_method', 'counterparty_id', 'paid', 'share', 'lent', 'borrowed',
+            'expense_count'))
+
+        DailyUserRollup.objects.filter(user=self.alice, counterparty__isnull=True).update(paid=0)
+        Expense.objects.filter(id=self.equal_id).update(created_at=timezone.now() - timedelta(days=40))
+        with self.assertRaises(CommandError):
+            call_command('backfill_rollups', '--check', stdout=io.StringIO())
+
+        Expense.objects.filter(id=self.equal_id).update(created_at=timezone.now())
+        call_command('backfill_rollups', stdout=io.StringIO())
+        call_command('backfill_rollups', '--check', stdout=io.StringIO())
+        self.assertCountEqual(DailyUserRollup.objects.values_list(
+            'user_id', 'day', 'split_method', 'counterparty_id', 'paid', 'share', 'lent', 'borrowed',
+            'expense_count'), expected)
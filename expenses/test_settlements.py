@@ -0,0 +1,133 @@
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .balances import owed_amount
+from .models import User, Group, GroupMembership, Balance, BalanceEvent, Settlement, UserLedgerSummary
+from .settlements import net_positions, settlement_plan
+
+
+class SettlementPlanTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.charlie = User.objects.create(name="Charlie", email="charlie@example.com", mobile="1122334455")
+
+        # A chain Alice -> Bob -> Charlie collapses into a single transfer.
+        Balance.objects.create(from_user=self.alice, to_user=self.bob, amount=3000)
+        Balance.objects.create(from_user=self.bob, to_user=self.charlie, amount=3000)
+
+    def test_net_positions(self):
+        user_ids, nets = net_positions()
+        self.assertEqual(
+            dict(zip(user_ids, nets)),
+            {self.alice.id: -3000, self.bob.id: 0, self.charlie.id: 3000}
+        )
+
+    def test_plan_endpoint_simplifies_chain(self):
+        response = self.client.get(reverse('settlement-plan'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['transfer_count'], 1)
+        self.assertEqual(
+            response.data['transfers'][0],
+            {"from_user": self.alice.id, "to_user": self.charlie.id, "amount": 30}
+        )
+
+    def test_plan_clears_every_position(self):
+        user_ids = [1, 2, 3, 4, 5]
+        nets = [-5000, -2500, 1000, 4000, 2500]
+        transfers = list(settlement_plan(user_ids, nets))
+        self.assertLessEqual(len(transfers), len(user_ids) - 1)
+
+        remaining = dict(zip(user_ids, nets))
+        for from_user_id, to_user_id, amount in transfers:
+            remaining[from_user_id] += amount
+            remaining[to_user_id] -= amount
+        self.assertTrue(all(net == 0 for net in remaining.values()))
+
+
+class SettlementCreateTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.charlie = User.objects.create(name="Charlie", email="charlie@example.com", mobile="1122334455")
+        self.group = Group.objects.create(name="Trip")
+        for user in (self.alice, self.bob, self.charlie):
+            GroupMembership.objects.create(group=self.group, user=user)
+        # Bob owes Alice 20 outside the group; in the group Alice owes Bob 10 and Bob owes Charlie 10.
+        self._expense({"payer": self.alice.id, "participants": [self.alice.id, self.bob.id], "amount": 40,
+                       "split_method": "equal"})
+        self._expense({"group": self.group.id, "payer": self.bob.id, "participants": [self.alice.id],
+                       "amount": 10, "split_method": "equal"})
+        self._expense({"group": self.group.id, "payer": self.charlie.id, "participants": [self.bob.id],
+                       "amount": 10, "split_method": "equal"})
+
+    def _expense(self, data):
+        response = self.client.post(reverse('expense-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def _settle(self, data, expected_status=status.HTTP_201_CREATED):
+        response = self.client.post(reverse('settlement-create'), data, format='json')
+        self.assertEqual(response.status_code, expected_status, response.data)
+        return response.data
+
+    def test_settlement_moves_balance_but_not_expense_totals(self):
+        totals = list(UserLedgerSummary.objects.order_by('user_id').values_list('total_paid', 'expense_count'))
+        data = self._settle({"payer": self.bob.id, "payee": self.alice.id, "amount": "15.50"})
+        self.assertEqual((data['payer'], data['payee'], data['amount'], data['group']),
+                         (self.bob.id, self.alice.id, 15.5, None))
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 450)
+        self.assertEqual(
+            list(UserLedgerSummary.objects.order_by('user_id').values_list('total_paid', 'expense_count')), totals)
+        event = BalanceEvent.objects.get(settlement_id=data['id'])
+        self.assertIsNone(event.expense_id)
+
+        # Across ledgers Alice now owes Bob the 10 from the group less the 4.50 left outside it.
+        response = self.client.get(reverse('get-balance', kwargs={'user_id': self.alice.id}))
+        self.assertEqual(response.data, [{"to_user": "Bob", "amount": Decimal('5.50')}])
+
+    def test_bulk_is_all_or_nothing(self):
+        data = self._settle({"settlements": [
+            {"payer": self.bob.id, "payee": self.alice.id, "amount": 5},
+            {"payer": self.bob.id, "payee": self.bob.id, "amount": 5},
+            {"payer": self.bob.id, "payee": 999, "amount": 5},
+            {"group": self.group.id, "payer": self.bob.id, "payee": self.alice.id, "amount": 0},
+        ]}, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in data['errors']], [1, 2, 3])
+        self.assertFalse(Settlement.objects.exists())
+        for body in (5, "settle", None):
+            self._settle(body, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Settlement.objects.exists())
+
+        data = self._settle([
+            {"payer": self.bob.id, "payee": self.alice.id, "amount": 5},
+            {"group": str(self.group.id), "payer": self.alice.id, "payee": self.bob.id, "amount": 10},
+        ])
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 1500)
+        self.assertEqual(owed_amount(self.alice.id, self.bob.id, group_id=self.group.id), 0)
+
+    def test_plan_clears_group_positions(self):
+        data = self._settle({"plan": True, "group": self.group.id})
+        self.assertEqual([(row['payer'], row['payee'], row['amount']) for row in data['settlements']],
+                         [(self.alice.id, self.charlie.id, 10)])
+        user_ids, nets = net_positions(Balance.objects.in_group(self.group.id))
+        self.assertFalse(any(nets))
+        # The ungrouped ledger is untouched.
+        self.assertEqual(owed_amount(self.bob.id, self.alice.id), 2000)
+
+        response = self.client.post(reverse('settlement-create'), {"plan": True, "group": self.group.id},
+                                    format='json')
+        self.assertEqual((response.status_code, response.data['count']), (status.HTTP_200_OK, 0))
+        self.assertEqual(self.client.post(reverse('settlement-create'), {"plan": True, "group": 999},
+                                          format='json').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuild_balances_includes_settlements(self):
+        self._settle({"plan": True, "group": self.group.id})
+        self._settle({"payer": self.bob.id, "payee": self.alice.id, "amount": 20})
+        call_command('rebuild_balances', '--check', stdout=io.StringIO())
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from .cache import get_split_preview
+from .models import User, Expense, Balance
+
+
+class ExpenseSplitPreviewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.alice = User.objects.create(name="Alice", email="alice@example.com", mobile="1234567890")
+        self.bob = User.objects.create(name="Bob", email="bob@example.com", mobile="0987654321")
+        self.expense = Expense.objects.create(payer=self.alice, amount=1001, split_method='equal')
+        self.expense.participants.add(self.alice, self.bob)
+        self.url = reverse('expense-split', kwargs={'expense_id': self.expense.id})
+
+    def test_preview_has_no_side_effects(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['shares'], [
+            {"user_id": self.alice.id, "amount": Decimal("5.01")},
+            {"user_id": self.bob.id, "amount": Decimal("5.00")},
+        ])
+        self.assertEqual(response.data['balance_deltas'], [
+            {"from_user": self.bob.id, "to_user": self.alice.id, "amount": Decimal("5.00")},
+        ])
+        self.client.get(self.url)
+        self.assertFalse(Balance.objects.exists())
+
+    def test_etag_returns_304_without_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_cache_invalidated_on_change(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expense.amount = 2000
+            self.expense.save()
+            # Dropped only on commit, so a concurrent read cannot re-cache the old rows.
+            self.assertIsNotNone(get_split_preview(self.expense.id))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+
+        carol = User.objects.create(name="Carol", email="carol@example.com", mobile="1122334455")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expense.participants.add(carol)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['shares']), 3)
+
+    def test_missing_expense(self):
+        response = self.client.get(reverse('expense-split', kwargs={'expense_id': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from .models import User, Expense, Balance
+from .splits import compute_shares, compute_deltas
+from .balances import owed_amount
+
+
+class ComputeSharesTestCase(TestCase):
+    def test_equal_split(self):
+        self.assertEqual(compute_shares('equal', 90, [1, 2, 3]), {1: 30, 2: 30, 3: 30})
+
+    def test_equal_split_distributes_remainder(self):
+        shares = compute_shares('equal', 10000, [3, 1, 2])
+        self.assertEqual(shares, {1: 3334, 2: 3333, 3: 3333})
+        self.assertEqual(sum(shares.values()), 10000)
+
+    def test_exact_split_converts_to_cents(self):
+        self.assertEqual(compute_shares('exact', 10000, [], exact_splits={"1": 40.25, "2": "59.75"}), {1: 4025, 2: 5975})
+
+    def test_percentage_split(self):
+        self.assertEqual(compute_shares('percentage', 200, [], percentage_splits={"1": 25, "2": 75}), {1: 50, 2: 150})
+
+    def test_percentage_split_sums_exactly(self):
+        shares = compute_shares('percentage', 1000, [], percentage_splits={"1": 33.33, "2": 33.33, "3": 33.34})
+        self.assertEqual(shares, {1: 333, 2: 333, 3: 334})
+        shares = compute_shares('percentage', 101, [], percentage_splits={"1": 50, "2": 50})
+        self.assertEqual(shares, {1: 51, 2: 50})
+
+    def test_deltas_skip_payer(self):
+        self.assertEqual(compute_deltas(1, {1: 30, 2: 30, 3: 30}), [(2, 1, 30), (3, 1, 30)])
+
+    def test_missing_splits_raise(self):
+        with self.assertRaises(ValueError):
+            compute_shares('exact', 100, [1])
+        with self.assertRaises(ValueError):
+            compute_shares('equal', 100, [])
+
+
+class SplitExpenseQueryCountTestCase(TestCase):
+    def setUp(self):
+        self.users = User.objects.bulk_create([
+            User(name=f"User {i}", email=f"user{i}@example.com", mobile=f"{i:010d}")
+            for i in range(60)
+        ])
+        self.payer = self.users[0]
+
+    def _split_queries(self, participant_count):
+        expense = Expense.objects.create(payer=self.payer, amount=participant_count * 10, split_method='equal')
+        expense.participants.set(self.users[:participant_count])
+        Balance.objects.all().delete()
+        with CaptureQueriesContext(connection) as context:
+            expense.split_expense()
+        return len(context.captured_queries)
+
+    def test_query_count_is_constant_in_participants(self):
+        small = self._split_queries(5)
+        large = self._split_queries(50)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 6)
+
+    def test_split_expense_nets_existing_reverse_balance(self):
+        Balance.objects.create(from_user=self.payer, to_user=self.users[1], amount=4)
+        expense = Expense.objects.create(payer=self.payer, amount=20, split_method='equal')
+        expense.participants.set([self.payer, self.users[1]])
+        expense.split_expense()
+
+        self.assertEqual(owed_amount(self.users[1].id, self.payer.id), 6)
+        self.assertEqual(Balance.objects.get().amount, -6)
@@ -1,17 +1,48 @@
 from django.urls import path
 from .views import (
-    GetBalance, UserCreateView, UserDetailView, 
-    ExpenseCreateView, ExpenseDetailView, GetExpenseSplit,
-    UserExpensesView, OverallExpensesView, DownloadBalanceSheetView
+    GetBalance, BalanceAsOfView, UserCreateView, UserDetailView, 
+    ExpenseCreateView, ExpenseBulkCreateView, ExpenseDetailView, ExpenseItemView, GetExpenseSplit,
+    UserExpensesView, UserStatementView, OverallExpensesView, DownloadBalanceSheetView,
+    SettlementCreateView, SettlementPlanView, CacheStatsView,
+    GroupCreateView, GroupDetailView, GroupMembersView, GroupOverallView, GroupBalanceView,
+    GroupBalanceSheetView, GroupSettlementPlanView,
+    ReportCreateView, ReportDetailView, ReportDownloadView, ParquetExportView
+)
+from .async_views import (
+    AsyncGetBalance, AsyncUserExpensesView, AsyncOverallExpensesView, AsyncExpenseListView
 )
 urlpatterns = [
     path('users/create/', UserCreateView.as_view(), name='user-create'),
     path('users/<int:pk>/', UserDetailView.as_view(), name='user-detail'),
     path('expenses/create/', ExpenseCreateView.as_view(), name='expense-create'),
+    path('expenses/bulk/', ExpenseBulkCreateView.as_view(), name='expense-bulk-create'),
     path('expenses/', ExpenseDetailView.as_view(), name='expense-detail'),
+    path('expenses/<int:expense_id>/', ExpenseItemView.as_view(), name='expense-item'),
     path('expenses/split/<int:expense_id>/', GetExpenseSplit.as_view(), name='expense-split'),
     path('balances/<int:user_id>/', GetBalance.as_view(), name='get-balance'),
+    path('balances/<int:user_id>/history/', BalanceAsOfView.as_view(), name='balance-as-of'),
     path('users/<int:user_id>/expenses/', UserExpensesView.as_view(), name='user-expenses'),
+    path('users/<int:user_id>/statement/', UserStatementView.as_view(), name='user-statement'),
     path('expenses/overall/', OverallExpensesView.as_view(), name='overall-expenses'),
     path('balances/download/', DownloadBalanceSheetView.as_view(), name='download-balance-sheet'),
+    path('settlements/', SettlementCreateView.as_view(), name='settlement-create'),
+    path('settlements/plan/', SettlementPlanView.as_view(), name='settlement-plan'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('groups/create/', GroupCreateView.as_view(), name='group-create'),
+    path('groups/<int:pk>/', GroupDetailView.as_view(), name='group-detail'),
+    path('groups/<int:group_id>/members/', GroupMembersView.as_view(), name='group-members'),
+    path('groups/<int:group_id>/overall/', GroupOverallView.as_view(), name='group-overall'),
+    path('groups/<int:group_id>/balances/<int:user_id>/', GroupBalanceView.as_view(), name='group-balance'),
+    path('groups/<int:group_id>/balances/download/', GroupBalanceSheetView.as_view(),
+         name='group-balance-sheet'),
+    path('groups/<int:group_id>/settlements/plan/', GroupSettlementPlanView.as_view(),
+         name='group-settlement-plan'),
+    path('reports/', ReportCreateView.as_view(), name='report-create'),
+    path('reports/<int:pk>/', ReportDetailView.as_view(), name='report-detail'),
+    path('reports/<int:pk>/download/', ReportDownloadView.as_view(), name='report-download'),
+    path('exports/<str:table>.parquet', ParquetExportView.as_view(), name='parquet-export'),
+    path('async/balances/<int:user_id>/', AsyncGetBalance.as_view(), name='async-get-balance'),
+    path('async/users/<int:user_id>/expenses/', AsyncUserExpensesView.as_view(), name='async-user-expenses'),
+    path('async/expenses/overall/', AsyncOverallExpensesView.as_view(), name='async-overall-expenses'),
+    path('async/expenses/', AsyncExpenseListView.as_view(), name='async-expense-list'),
 ]
@@ -1,162 +1,200 @@
 from rest_framework import generics
-from .models import User , Expense
-from .serializers import UserSerializer, ExpenseSerializer
+from .models import User , Expense, Group, GroupMembership, ReportJob, Settlement
+from .serializers import (
+    UserSerializer, GroupSerializer, ExpenseSerializer, ExpenseBulkItemSerializer, ReportJobSerializer,
+    SettlementSerializer, expense_rows
+)
+from .splits import compute_shares, compute_deltas
+from .balances import apply_balance_deltas, balance_events, record_balance_events
+from .ledger import record_expense_totals, group_expense_totals
+from .money import from_cents
+from .cache import (
+    get_split_preview, set_split_preview, cached_read, cache_stats,
+    invalidate_ledger_on_commit, user_scope, group_scope, GLOBAL_SCOPE
+)
+from .settlements import net_positions, settlement_plan, record_settlements
+from .pagination import UserSummaryPagination, ExpenseKeysetPagination
+from .filters import filter_expenses, parse_as_of, created_range, statement_window
+from .history import replay_balances
+from .edits import ledger_entry, new_ledger_entry, apply_expense_change, delete_expense
+from .rollups import GRANULARITIES, record_rollups, statement
+from .idempotency import (
+    HEADER as IDEMPOTENCY_HEADER, MAX_KEY_LENGTH as MAX_IDEMPOTENCY_KEY_LENGTH,
+    request_fingerprint, stored_response, remember_response
+)
+from .reports import balance_sheet_rows, iter_csv, iter_gzip
+from .metrics import render_prometheus
+from .jobs import submit_job
+from . import exports
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.db import models
 from rest_framework import  status
 from .models import Balance
-from django.http import HttpResponse
-import csv
-from django.db import transaction  
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.urls import reverse
+from django.utils.http import parse_etags
+from django.db import transaction, IntegrityError
+from django.utils import timezone
 
 import logging
+import os
+from collections import defaultdict
 
 class GetBalance(APIView):
     def get(self, request, user_id):
         try:
-            user = User.objects.get(id=user_id)
+            balance_data = cached_read(
+                'get-balance', user_scope(user_id), request.build_absolute_uri(),
+                lambda: self.get_balance_data(user_id))
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=404)
 
-        balances = Balance.objects.filter(from_user=user)
-
-        balance_data = [
-            {
-                "to_user": balance.to_user.name,  
-                "amount": balance.amount
-            }
-            for balance in balances
-        ]
-        
         return Response(balance_data)
 
+    def get_balance_data(self, user_id):
+        user = User.objects.get(id=user_id)
+        return balance_rows(Balance.objects.owed_by(user.id))
+
 
+def balance_rows(pairs):
+    return [{"to_user": pair['creditor_name'], "amount": from_cents(pair['owed'])} for pair in pairs]
 
 
+class BalanceAsOfView(APIView):
+    """What a user owed just before ?as_of=, replayed from the balance event log."""
+
+    def get(self, request, user_id):
+        if not request.query_params.get('as_of'):
+            return Response({"as_of": "This query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        moment = parse_as_of('as_of', request.query_params['as_of'])
+        group_id = request.query_params.get('group')
+        if group_id is not None and not group_id.isdigit():
+            return Response({"group": "Expected a group id"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            User.objects.only('id').get(id=user_id)
+        except User.DoesNotExist:
+            return Response({"error": "User not found"}, status=404)
+
+        owed = defaultdict(int)
+        for (pair_group_id, from_user_id, to_user_id), amount in replay_balances(moment, user_id=user_id).items():
+            if group_id is not None and pair_group_id != int(group_id):
+                continue
+            other_id = to_user_id if from_user_id == user_id else from_user_id
+            owed[other_id] += amount if from_user_id == user_id else -amount
+
+        creditors = User.objects.only('name').in_bulk([other_id for other_id, amount in owed.items() if amount > 0])
+        return Response([
+            {"to_user": creditors[other_id].name, "amount": from_cents(owed[other_id])}
+            for other_id in sorted(creditors)
+        ])
+
 
 logger = logging.getLogger(__name__)
 
 class UserExpensesView(APIView):
     def get(self, request, user_id):
         try:
-            user = User.objects.get(id=user_id)
-            paid_expenses = Expense.objects.filter(payer=user)
-            participated_expenses = Expense.objects.filter(participants=user)
-            
-            paid_data = ExpenseSerializer(paid_expenses, many=True).data
-            participated_data = ExpenseSerializer(participated_expenses, many=True).data
-            
-            response_data = {
-                "paid_expenses": paid_data,
-                "participated_expenses": participated_data,
-                "total_paid": sum(expense.amount for expense in paid_expenses),
-                "total_participated": sum(expense.amount for expense in participated_expenses)
-            }
-            
-            return Response(response_data)
+            response_data = cached_read(
+                'user-expenses', user_scope(user_id), request.build_absolute_uri(),
+                lambda: self.get_expenses_data(request, user_id))
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=404)
 
+        return Response(response_data)
+
+    def get_expenses_data(self, request, user_id):
+        user = User.objects.with_expense_totals().get(id=user_id)
+
+        expenses = filter_expenses(expense_list_queryset(), request.query_params)
+        paid_pages = ExpenseKeysetPagination(cursor_query_param='paid_cursor')
+        paid_expenses = paid_pages.paginate_queryset(expenses.filter(payer=user), request)
+        participated_pages = ExpenseKeysetPagination(cursor_query_param='participated_cursor')
+        participated_expenses = participated_pages.paginate_queryset(expenses.filter(participants=user), request)
+
+        response_data = {
+            "paid_expenses": paid_pages.get_page(expense_rows(paid_expenses)),
+            "participated_expenses": participated_pages.get_page(
+                expense_rows(participated_expenses)),
+            "total_paid": from_cents(user.total_paid),
+            "total_participated": from_cents(user.total_participated)
+        }
+        return response_data
+
+class UserStatementView(APIView):
+    """Per-period spend for ?from=&to=&granularity=day|week|month, answered from the daily rollups."""
+
+    def get(self, request, user_id):
+        start, end, granularity = statement_window(request.query_params, GRANULARITIES)
+        try:
+            response_data = cached_read(
+                'user-statement', user_scope(user_id), request.build_absolute_uri(),
+                lambda: self.get_statement_data(user_id, start, end, granularity))
+        except User.DoesNotExist:
+            return Response({"error": "User not found"}, status=404)
+
+        return Response(response_data)
+
+    def get_statement_data(self, user_id, start, end, granularity):
+        User.objects.only('id').get(id=user_id)
+        return statement(user_id, start, end, granularity)
+
 class OverallExpensesView(APIView):
     def get(self, request):
-        expenses = Expense.objects.all()
-        total_amount = sum(expense.amount for expense in expenses)
-        
-        users = User.objects.all()
-        user_summaries = []
-        
-        for user in users:
-            paid = Expense.objects.filter(payer=user)
-            participated = Expense.objects.filter(participants=user)
-            
-            user_summary = {
+        response_data = cached_read(
+            'overall-expenses', GLOBAL_SCOPE, request.build_absolute_uri(),
+            lambda: self.get_overall_data(request))
+        return Response(response_data)
+
+    def get_overall_data(self, request):
+        totals = Expense.objects.aggregate(
+            total_amount=models.Sum('amount'), expense_count=models.Count('id'))
+
+        paginator = UserSummaryPagination()
+        users = paginator.paginate_queryset(
+            User.objects.only('id', 'name').with_expense_totals(), request, view=self)
+        user_summaries = [
+            {
                 "user_id": user.id,
                 "name": user.name,
-                "total_paid": sum(expense.amount for expense in paid),
-                "total_participated": sum(expense.amount for expense in participated)
+                "total_paid": from_cents(user.total_paid),
+                "total_participated": from_cents(user.total_participated)
             }
-            user_summaries.append(user_summary)
+            for user in users
+        ]
         
+        recent_expenses = Expense.objects.prefetch_related('participants').order_by('-id')[:5]
         response_data = {
-            "total_expenses": total_amount,
-            "expense_count": expenses.count(),
-            "user_summaries": user_summaries,
-            "recent_expenses": ExpenseSerializer(expenses.order_by('-id')[:5], many=True).data
+            "total_expenses": from_cents(totals['total_amount'] or 0),
+            "expense_count": totals['expense_count'],
+            "user_summaries": {
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "results": user_summaries
+            },
+            "recent_expenses": expense_rows(recent_expenses)
         }
-        
-        return Response(response_data)
+        return response_data
+
+def balance_sheet_response(request, rows):
+    chunks = iter_csv(rows)
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    if use_gzip:
+        chunks = iter_gzip(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="balance_sheet.csv"'
+    response['Vary'] = 'Accept-Encoding'
+    if use_gzip:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
 
-# views.py
 class DownloadBalanceSheetView(APIView):
     def get(self, request):
         try:
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="balance_sheet.csv"'
-            
-            writer = csv.writer(response)
-            
-            writer.writerow([
-                'User', 
-                'Owes To', 
-                'Amount', 
-                'Total Paid', 
-                'Total Participated In',
-                'Net Balance'
-            ])
-            
-            users = User.objects.all()
-            
-            for user in users:
-                owes = Balance.objects.filter(from_user=user)
-                owed = Balance.objects.filter(to_user=user)
-                
-                total_paid = Expense.objects.filter(payer=user).aggregate(
-                    total=models.Sum('amount'))['total'] or 0
-                total_participated = Expense.objects.filter(
-                    participants=user).aggregate(total=models.Sum('amount'))['total'] or 0
-                
-                if owes.exists() or owed.exists():
-                    for balance in owes:
-                        writer.writerow([
-                            balance.from_user.name,
-                            balance.to_user.name,
-                            f"-{balance.amount}", 
-                            total_paid,
-                            total_participated,
-                            total_paid - total_participated
-                        ])
-                    
-                    for balance in owed:
-                        writer.writerow([
-                            balance.to_user.name,
-                            f"(Owed by {balance.from_user.name})",
-                            balance.amount, 
-                            total_paid,
-                            total_participated,
-                            total_paid - total_participated
-                        ])
-                else:
-                    writer.writerow([
-                        user.name,
-                        "No outstanding balances",
-                        "0",
-                        total_paid,
-                        total_participated,
-                        total_paid - total_participated
-                    ])
-                
-                writer.writerow([])
-            
-            writer.writerow(["SUMMARY"])
-            writer.writerow(["Total Expenses", 
-                           Expense.objects.aggregate(
-                               total= models.Sum('amount'))['total'] or 0])
-            writer.writerow(["Number of Expenses", 
-                           Expense.objects.count()])
-            
-            return response
-            
+            return balance_sheet_response(request, balance_sheet_rows())
         except Exception as e:
             logger.error(f"Error generating balance sheet: {str(e)}")
             return Response(
@@ -181,16 +219,46 @@ class ExpenseCreateView(generics.CreateAPIView):
 
     def create(self, request, *args, **kwargs):
         logger.info(f"Received expense creation request with data: {request.data}")
-        
+
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is not None:
+            if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+                return Response(
+                    {"error": f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            fingerprint = request_fingerprint(request)
+            replay = stored_response(idempotency_key, fingerprint)
+            if replay is not None:
+                return replay
+
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             try:
                 with transaction.atomic():
                     expense = serializer.save()
                     logger.info(f"Expense created with ID: {expense.id}")
-                    expense.split_expense()
+                    deltas = expense.split_expense()
+                    participant_ids = [participant.id for participant in serializer.validated_data['participants']]
+                    record_expense_totals([(expense.payer_id, expense.amount, participant_ids)])
+                    record_rollups([new_ledger_entry(expense, participant_ids, deltas)])
+                    invalidate_ledger_on_commit(
+                        [expense.payer_id, *participant_ids, *(user_id for user_id, _, _ in deltas)],
+                        [expense.group_id])
                     logger.info("Expense split successfully")
+                    if idempotency_key is not None:
+                        remember_response(idempotency_key, fingerprint, status.HTTP_201_CREATED, serializer.data)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
+            except IntegrityError as e:
+                # A concurrent retry with the same key committed first; this one rolled back.
+                replay = stored_response(idempotency_key, fingerprint) if idempotency_key is not None else None
+                if replay is not None:
+                    return replay
+                logger.error(f"Error creating expense: {str(e)}")
+                return Response(
+                    {"error": str(e), "detail": "Failed to create expense. Please check the user IDs and try again."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             except Exception as e:
                 logger.error(f"Error creating expense: {str(e)}")
                 return Response(
@@ -200,16 +268,496 @@ class ExpenseCreateView(generics.CreateAPIView):
         logger.error(f"Serializer validation failed: {serializer.errors}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+MAX_BULK_EXPENSES = 50000
+
+
+def _referenced_user_ids(item):
+    if not isinstance(item, dict):
+        return set()
+    raw_ids = [item.get('payer')]
+    if isinstance(item.get('participants'), list):
+        raw_ids.extend(item['participants'])
+    for field in ('exact_splits', 'percentage_splits'):
+        if isinstance(item.get(field), dict):
+            raw_ids.extend(item[field].keys())
+    return {int(raw_id) for raw_id in raw_ids if str(raw_id).isdigit()}
+
+
+def _referenced_group_ids(items):
+    # Ids may arrive as strings; IntegerField accepts "3" as 3, so prefetch it too.
+    return {int(item['group']) for item in items if isinstance(item, dict) and str(item.get('group')).isdigit()}
+
+
+def _group_members(group_ids):
+    """Return {group_id: member_ids} for the existing groups among group_ids."""
+    members = {group_id: set() for group_id in Group.objects.filter(id__in=group_ids).values_list('id', flat=True)}
+    for group_id, user_id in GroupMembership.objects.filter(group_id__in=members).values_list('group_id', 'user_id'):
+        members[group_id].add(user_id)
+    return members
+
+
+class ExpenseBulkCreateView(APIView):
+    def post(self, request):
+        items = request.data.get('expenses') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Expected a non-empty list of expenses"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_EXPENSES:
+            return Response(
+                {"error": f"At most {MAX_BULK_EXPENSES} expenses can be uploaded at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_ids = set()
+        for item in items:
+            user_ids |= _referenced_user_ids(item)
+        users = User.objects.in_bulk(user_ids)
+        members = _group_members(_referenced_group_ids(items))
+
+        valid_items = []
+        errors = []
+        for index, item in enumerate(items):
+            serializer = ExpenseBulkItemSerializer(data=item, context={'users': users, 'members': members})
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+                continue
+            data = serializer.validated_data
+            try:
+                shares = compute_shares(
+                    data['split_method'], data['amount'], data['participants'],
+                    data.get('exact_splits'), data.get('percentage_splits')
+                )
+            except ValueError as e:
+                errors.append({"index": index, "errors": {"non_field_errors": [str(e)]}})
+                continue
+            valid_items.append((index, data, compute_deltas(data['payer'], shares)))
+
+        created = []
+        if valid_items:
+            try:
+                with transaction.atomic():
+                    expenses = Expense.objects.bulk_create([
+                        Expense(
+                            group_id=data.get('group'),
+                            payer_id=data['payer'],
+                            amount=data['amount'],
+                            split_method=data['split_method'],
+                            exact_splits=data.get('exact_splits'),
+                            percentage_splits=data.get('percentage_splits'),
+                        )
+                        for _, data, _ in valid_items
+                    ], batch_size=1000)
+
+                    Participant = Expense.participants.through
+                    Participant.objects.bulk_create([
+                        Participant(expense_id=expense.id, user_id=user_id)
+                        for expense, (_, data, _) in zip(expenses, valid_items)
+                        for user_id in dict.fromkeys(data['participants'])
+                    ], batch_size=1000)
+
+                    deltas_by_group = defaultdict(list)
+                    for _, data, deltas in valid_items:
+                        deltas_by_group[data.get('group')].extend(deltas)
+                    for group_id, deltas in deltas_by_group.items():
+                        apply_balance_deltas(deltas, group_id=group_id, log_events=False)
+                    created_at = timezone.now()
+                    record_balance_events([
+                        event
+                        for expense, (_, data, deltas) in zip(expenses, valid_items)
+                        for event in balance_events(deltas, data.get('group'), expense.id, created_at)
+                    ])
+                    record_expense_totals(
+                        (data['payer'], data['amount'], data['participants']) for _, data, _ in valid_items
+                    )
+                    record_rollups(
+                        new_ledger_entry(expense, data['participants'], deltas)
+                        for expense, (_, data, deltas) in zip(expenses, valid_items)
+                    )
+                    invalidate_ledger_on_commit((
+                        user_id
+                        for _, data, deltas in valid_items
+                        for user_id in [data['payer'], *data['participants'], *(debtor for debtor, _, _ in deltas)]
+                    ), deltas_by_group)
+            except Exception as e:
+                logger.error(f"Error in bulk expense upload: {str(e)}")
+                return Response(
+                    {"error": str(e), "detail": "Failed to create expenses."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            created = [
+                {"index": index, "id": expense.id}
+                for expense, (index, _, _) in zip(expenses, valid_items)
+            ]
+
+        logger.info(f"Bulk expense upload: {len(created)} created, {len(errors)} rejected")
+        return Response(
+            {"created": created, "errors": errors},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+
+def expense_list_queryset():
+    return Expense.objects.only(
+        'id', 'group_id', 'payer_id', 'amount', 'split_method', 'exact_splits', 'percentage_splits', 'created_at'
+    ).prefetch_related(models.Prefetch('participants', queryset=User.objects.only('id')))
+
+
 class ExpenseDetailView(generics.ListAPIView):
-    queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
+    pagination_class = ExpenseKeysetPagination
 
-class GetExpenseSplit(APIView):
+    def get_queryset(self):
+        return filter_expenses(expense_list_queryset(), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(expense_rows(page))
+
+class ExpenseItemView(APIView):
     def get(self, request, expense_id):
         try:
-            expense = Expense.objects.get(id=expense_id)
+            expense = expense_list_queryset().get(id=expense_id)
         except Expense.DoesNotExist:
             return Response({"error": "Expense not found"}, status=404)
-        
-        split_data = expense.split_expense()
-        return Response(split_data)
+        return Response(expense_rows([expense])[0])
+
+    def patch(self, request, expense_id):
+        try:
+            with transaction.atomic():
+                expense = Expense.objects.select_for_update().get(id=expense_id)
+                old = ledger_entry(expense)
+                serializer = ExpenseSerializer(expense, data=request.data, partial=True)
+                if not serializer.is_valid():
+                    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                expense = serializer.save()
+                apply_expense_change(expense.id, old=old, new=ledger_entry(expense))
+        except Expense.DoesNotExist:
+            return Response({"error": "Expense not found"}, status=404)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Expense {expense_id} updated")
+        return Response(serializer.data)
+
+    def delete(self, request, expense_id):
+        try:
+            with transaction.atomic():
+                delete_expense(Expense.objects.select_for_update().get(id=expense_id))
+        except Expense.DoesNotExist:
+            return Response({"error": "Expense not found"}, status=404)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Expense {expense_id} deleted")
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class GetExpenseSplit(APIView):
+    def get(self, request, expense_id):
+        cached = get_split_preview(expense_id)
+        if cached is None:
+            try:
+                expense = Expense.objects.get(id=expense_id)
+            except Expense.DoesNotExist:
+                return Response({"error": "Expense not found"}, status=404)
+
+            try:
+                shares, deltas = expense.split_preview()
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            cached = set_split_preview(expense_id, {
+                "expense_id": expense.id,
+                "payer": expense.payer_id,
+                "amount": from_cents(expense.amount),
+                "split_method": expense.split_method,
+                "shares": [
+                    {"user_id": user_id, "amount": from_cents(share)}
+                    for user_id, share in sorted(shares.items())
+                ],
+                "balance_deltas": [
+                    {"from_user": debtor_id, "to_user": creditor_id, "amount": from_cents(amount)}
+                    for debtor_id, creditor_id, amount in deltas
+                ]
+            })
+
+        etag, split_data = cached
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(split_data)
+        response['ETag'] = etag
+        return response
+
+
+class SettlementPlanView(APIView):
+    def get(self, request):
+        user_ids, nets = net_positions()
+        transfers = [
+            {"from_user": from_user_id, "to_user": to_user_id, "amount": from_cents(amount)}
+            for from_user_id, to_user_id, amount in settlement_plan(user_ids, nets)
+        ]
+        return Response({
+            "transfers": transfers,
+            "transfer_count": len(transfers)
+        })
+
+
+MAX_BULK_SETTLEMENTS = 50000
+
+
+class SettlementCreateView(APIView):
+    """Record repayments: one object, a list (or {"settlements": [...]}), or {"plan": true, "group": id}.
+
+    A list is applied all or nothing. The plan form records the current
+    settlement plan of one ledger, the ungrouped one when group is null.
+    """
+
+    def post(self, request):
+        if isinstance(request.data, dict) and request.data.get('plan'):
+            return self.apply_plan(request.data.get('group'))
+
+        if isinstance(request.data, list):
+            bulk, items = True, request.data
+        elif not isinstance(request.data, dict):
+            return Response({"error": "Expected a settlement object or a list of settlements"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        elif 'settlements' in request.data:
+            bulk, items = True, request.data['settlements']
+        else:
+            bulk, items = False, [request.data]
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Expected a non-empty list of settlements"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_SETTLEMENTS:
+            return Response(
+                {"error": f"At most {MAX_BULK_SETTLEMENTS} settlements can be recorded at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_ids = {
+            int(item[field]) for item in items if isinstance(item, dict)
+            for field in ('payer', 'payee') if str(item.get(field)).isdigit()
+        }
+        context = {
+            'users': User.objects.only('id').in_bulk(user_ids),
+            'members': _group_members(_referenced_group_ids(items)),
+        }
+        settlements = []
+        errors = []
+        for index, item in enumerate(items):
+            serializer = SettlementSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+                continue
+            settlements.append(Settlement(**serializer.validated_data))
+        if errors:
+            return Response({"errors": errors} if bulk else errors[0]['errors'], status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            settlements = record_settlements(settlements)
+        if not bulk:
+            return Response(SettlementSerializer(settlements[0]).data, status=status.HTTP_201_CREATED)
+        return Response({"settlements": SettlementSerializer(settlements, many=True).data,
+                         "count": len(settlements)}, status=status.HTTP_201_CREATED)
+
+    def apply_plan(self, group_id):
+        if group_id is not None:
+            if not str(group_id).isdigit():
+                return Response({"group": "Expected a group id"}, status=status.HTTP_400_BAD_REQUEST)
+            group_id = int(group_id)
+            if not Group.objects.filter(id=group_id).exists():
+                return Response({"error": "Group not found"}, status=404)
+
+        with transaction.atomic():
+            user_ids, nets = net_positions(Balance.objects.in_group(group_id))
+            settlements = record_settlements([
+                Settlement(group_id=group_id, payer_id=from_user_id, payee_id=to_user_id, amount=amount)
+                for from_user_id, to_user_id, amount in settlement_plan(user_ids, nets)
+            ])
+        return Response({"settlements": SettlementSerializer(settlements, many=True).data,
+                         "count": len(settlements)},
+                        status=status.HTTP_201_CREATED if settlements else status.HTTP_200_OK)
+
+
+class CacheStatsView(APIView):
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class MetricsView(View):
+    """Per-route request histograms of this process, for a Prometheus scrape."""
+
+    def get(self, request):
+        return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Group Views
+class GroupCreateView(generics.CreateAPIView):
+    queryset = Group.objects.all()
+    serializer_class = GroupSerializer
+
+
+class GroupDetailView(generics.RetrieveAPIView):
+    queryset = Group.objects.prefetch_related(models.Prefetch('members', queryset=User.objects.only('id')))
+    serializer_class = GroupSerializer
+
+
+class GroupMembersView(APIView):
+    def post(self, request, group_id):
+        try:
+            group = Group.objects.get(id=group_id)
+        except Group.DoesNotExist:
+            return Response({"error": "Group not found"}, status=404)
+
+        user_ids = request.data.get('members') if isinstance(request.data, dict) else None
+        if not isinstance(user_ids, list) or not all(isinstance(user_id, int) for user_id in user_ids):
+            return Response({"members": "Expected a list of user ids"}, status=status.HTTP_400_BAD_REQUEST)
+        missing_ids = set(user_ids) - set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        if missing_ids:
+            return Response({"members": f"Users with IDs {missing_ids} do not exist"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            GroupMembership.objects.bulk_create(
+                [GroupMembership(group=group, user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+            invalidate_ledger_on_commit(user_ids, [group.id])
+        return Response(GroupSerializer(GroupDetailView.queryset.get(id=group.id)).data)
+
+
+class GroupOverallView(APIView):
+    def get(self, request, group_id):
+        try:
+            response_data = cached_read(
+                'group-overall', group_scope(group_id), request.build_absolute_uri(),
+                lambda: self.get_overall_data(group_id))
+        except Group.DoesNotExist:
+            return Response({"error": "Group not found"}, status=404)
+        return Response(response_data)
+
+    def get_overall_data(self, group_id):
+        group = Group.objects.get(id=group_id)
+        expenses = Expense.objects.filter(group_id=group_id)
+        totals = expenses.aggregate(total_amount=models.Sum('amount'), expense_count=models.Count('id'))
+        user_totals = group_expense_totals(group_id)
+        members = group.members.only('id', 'name').order_by('id')
+
+        recent_expenses = expense_list_queryset().filter(group_id=group_id).order_by('-created_at', '-id')[:5]
+        return {
+            "group_id": group.id,
+            "name": group.name,
+            "total_expenses": from_cents(totals['total_amount'] or 0),
+            "expense_count": totals['expense_count'],
+            "user_summaries": [
+                {
+                    "user_id": user.id,
+                    "name": user.name,
+                    "total_paid": from_cents(user_totals[user.id][0]),
+                    "total_participated": from_cents(user_totals[user.id][1])
+                }
+                for user in members
+            ],
+            "recent_expenses": expense_rows(recent_expenses)
+        }
+
+
+class GroupBalanceView(APIView):
+    def get(self, request, group_id, user_id):
+        try:
+            balance_data = cached_read(
+                'group-balance', group_scope(group_id), request.build_absolute_uri(),
+                lambda: self.get_balance_data(group_id, user_id))
+        except GroupMembership.DoesNotExist:
+            return Response({"error": "User is not a member of this group"}, status=404)
+        return Response(balance_data)
+
+    def get_balance_data(self, group_id, user_id):
+        if not GroupMembership.objects.filter(group_id=group_id, user_id=user_id).exists():
+            raise GroupMembership.DoesNotExist
+        return balance_rows(Balance.objects.filter(group_id=group_id).owed_by(user_id))
+
+
+class GroupBalanceSheetView(APIView):
+    def get(self, request, group_id):
+        if not Group.objects.filter(id=group_id).exists():
+            return Response({"error": "Group not found"}, status=404)
+        return balance_sheet_response(request, balance_sheet_rows(group_id))
+
+
+class GroupSettlementPlanView(APIView):
+    def get(self, request, group_id):
+        if not Group.objects.filter(id=group_id).exists():
+            return Response({"error": "Group not found"}, status=404)
+        user_ids, nets = net_positions(Balance.objects.filter(group_id=group_id))
+        transfers = [
+            {"from_user": from_user_id, "to_user": to_user_id, "amount": from_cents(amount)}
+            for from_user_id, to_user_id, amount in settlement_plan(user_ids, nets)
+        ]
+        return Response({
+            "transfers": transfers,
+            "transfer_count": len(transfers)
+        })
+
+
+# Report Views
+class ReportCreateView(generics.CreateAPIView):
+    """Queue a report; `manage.py run_workers` runs it outside the web workers."""
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        job = submit_job(serializer.validated_data['kind'], serializer.validated_data['params'])
+        response = Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('report-detail', kwargs={'pk': job.id})
+        return response
+
+
+class ReportDetailView(generics.RetrieveAPIView):
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+
+
+class ReportDownloadView(APIView):
+    def get(self, request, pk):
+        try:
+            job = ReportJob.objects.get(id=pk)
+        except ReportJob.DoesNotExist:
+            return Response({"error": "Report not found"}, status=404)
+        if job.status != ReportJob.DONE or not job.result_path:
+            return Response({"error": "Report is not ready", "status": job.status}, status=status.HTTP_409_CONFLICT)
+        try:
+            report = open(job.result_path, 'rb')
+        except FileNotFoundError:
+            return Response({"error": "Report file has been removed"}, status=status.HTTP_410_GONE)
+        return FileResponse(report, as_attachment=True, filename=os.path.basename(job.result_path),
+                            content_type='text/csv')
+
+
+# Export Views
+class ParquetExportView(APIView):
+    """Stream a table as Parquet for analytics tools.
+
+    expenses and expense_participants accept created_after/created_before;
+    balances accepts group.
+    """
+    TABLES = ('expenses', 'expense_participants', 'balances')
+
+    def get(self, request, table):
+        if table not in self.TABLES:
+            return Response({"error": f"Unknown export {table}"}, status=404)
+        if exports.pa is None:
+            return Response({"error": "Parquet export requires pyarrow (pip install pyarrow)"},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        if table == 'balances':
+            group = request.query_params.get('group')
+            if group is not None and not group.isdigit():
+                return Response({"group": "Expected a group id"}, status=status.HTTP_400_BAD_REQUEST)
+            tables = exports.balance_tables(int(group) if group else None)
+        else:
+            since, until = created_range(request.query_params)
+            tables = (exports.expense_tables if table == 'expenses' else exports.participant_tables)(since, until)
+
+        response = StreamingHttpResponse(exports.iter_parquet(table, tables),
+                                         content_type='application/vnd.apache.parquet')
+        response['Content-Disposition'] = f'attachment; filename="{table}.parquet"'
+        return response